@@ -1,90 +1,163 @@
-from flask import Flask, request, jsonify, send_from_directory, make_response
+import time
+_import_started = time.perf_counter()
+
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, send_from_directory, make_response, stream_with_context
 from flask_cors import CORS
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo import ReturnDocument
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.local import LocalProxy
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from bson.objectid import ObjectId
 import os
-import time
-import base64
-
-
-def serialize_doc(doc: dict):
-    """Recursively convert ObjectId values in a dict to strings so jsonify works."""
-    if not isinstance(doc, dict):
-        return doc
-    for k, v in list(doc.items()):
-        if isinstance(v, ObjectId):
-            doc[k] = str(v)
-        elif isinstance(v, list):
-            new_list = []
-            for item in v:
-                if isinstance(item, ObjectId):
-                    new_list.append(str(item))
-                elif isinstance(item, dict):
-                    new_list.append(serialize_doc(item))
-                else:
-                    new_list.append(item)
-            doc[k] = new_list
-        elif isinstance(v, dict):
-            doc[k] = serialize_doc(v)
-    return doc
-
-app = Flask(__name__)
-# Explicitly allow common methods (including DELETE and OPTIONS) for API routes to avoid browser preflight 405 errors
-CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]}})
-
-client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
-db = client["internlink"]
-
-# Ensure unique email indexes
-try:
-    db.users.create_index("email", unique=True)
-    db.companies.create_index("email", unique=True)
-except Exception:
-    pass
-
-# Seed a default admin user (if not present) so an admin can log in during development.
-def seed_admin_user():
-    admin_email = os.getenv("ADMIN_EMAIL", "admin@internlink.local")
-    admin_password = os.getenv("ADMIN_PASSWORD", "adminpass")
-    try:
-        existing = db.users.find_one({"email": admin_email})
-        if not existing:
-            hashed = generate_password_hash(admin_password)
-            admin_doc = {
-                "fullName": "Platform Admin",
-                "email": admin_email,
-                "password": hashed,
-                "userType": "admin",
-                "isAdmin": True
-            }
-            db.users.insert_one(admin_doc)
-            print(f"Seeded admin user: {admin_email}")
-    except Exception as e:
-        print("Failed to seed admin user:", e)
+import re
+import mimetypes
+import itertools
+import io
+import csv
+import hmac
+
+from pagination import paginate, parse_limit, PaginationError
+from search import check_relevance_args, internship_search_filter, search_internships
+from database import LazyDatabase
+import bootstrap
+import stats
+import storage
+import passwords
+from encoder import BSONJSONProvider, dumps_bytes
+from response_cache import ResponseCache, cached_view
+from snapshots import InternshipSnapshots
+from profiles import StudentProfiles
+import metrics
+import slowlog
+import bulk
+import recommend
+import events
+import delta
+import resume_text
+
+
+def default_config():
+    """App settings read from the environment; `create_app(config)` overrides any of them."""
+    wait_queue_timeout = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    return {
+        "MONGO_URI": os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        "MONGO_DB_NAME": os.getenv("MONGO_DB_NAME", "internlink"),
+        "MONGO_MAX_POOL_SIZE": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "MONGO_MIN_POOL_SIZE": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": int(wait_queue_timeout) if wait_queue_timeout else None,
+        # ceiling for every request body, chunked ones included; uploads narrow it per request
+        "MAX_CONTENT_LENGTH": storage.max_request_bytes(base64_encoded=True),
+    }
 
-# run seeding at startup
-seed_admin_user()
 
-@app.route("/api/users", methods=["POST"])
+def mongo_pool_options(config):
+    return {"maxPoolSize": config["MONGO_MAX_POOL_SIZE"], "minPoolSize": config["MONGO_MIN_POOL_SIZE"],
+            "waitQueueTimeoutMS": config["MONGO_WAIT_QUEUE_TIMEOUT_MS"]}
+
+
+class AppResources:
+    """What one app owns: its database handle and the in-process caches and workers built on it.
+
+    Stored in `app.extensions['internlink']`, so two apps built with different configs share nothing
+    but the process-wide request metrics and the SSE bus.
+    """
+
+    def __init__(self, config):
+        self.db = LazyDatabase()
+        # slow find/aggregate/count commands on this database are logged to `slow_queries` with their plans
+        self.slow_queries = slowlog.SlowQueryRecorder()
+        self.db.configure(config["MONGO_URI"], config["MONGO_DB_NAME"],
+                          event_listeners=[metrics.listener, self.slow_queries], **mongo_pool_options(config))
+        self.slow_queries.attach(self.db)
+        # listing responses are reused until a write bumps one of the collections they were built from
+        self.listing_cache = ResponseCache(self.db)
+        self.internship_snapshots = InternshipSnapshots(self.db)
+        self.student_profiles = StudentProfiles(self.db)
+        # listings embed these, so writes seen through the shared generations drop them too
+        self.listing_cache.generations.on_advance('internships', self.internship_snapshots.clear)
+        self.listing_cache.generations.on_advance('users', self.student_profiles.clear)
+        self.recommender = recommend.Recommender(self.db)
+        # resume text is extracted after upload_resume answers, on a bounded background pool
+        self.resume_indexer = resume_text.ResumeIndexer(self.db)
+        # with several workers, status changes reach SSE clients through a change stream (see events.py)
+        self.event_source = events.ChangeStreamSource(self.db) if events.EVENTS_SOURCE == 'changestream' else None
+
+
+def resources(app=None):
+    """The AppResources of `app` (default: the app handling the current request or CLI command)."""
+    return (app or current_app).extensions['internlink']
+
+
+def create_app(config=None):
+    """Build a Flask app serving the API.
+
+    No connection is opened here: each process creates its MongoClient on first use (see
+    database.py), so the app can be built before gunicorn forks its workers. Indexes and the
+    admin seed are created by the one-shot bootstrap command (bootstrap.py), not at startup.
+    Nothing is built at import time: WSGI servers call `create_app()` (see wsgi.py).
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+    # ObjectId/datetime values are encoded by the JSON provider itself (orjson when available)
+    app.json = BSONJSONProvider(app)
+    # Explicitly allow common methods (including DELETE and OPTIONS) for API routes to avoid browser preflight 405 errors
+    CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+                                     "expose_headers": ["X-Total-Count", "X-Next-Cursor", "ETag"]}})
+    # per-endpoint request/Mongo command metrics, served at /api/admin/metrics
+    metrics.init_app(app)
+
+    owned = app.extensions['internlink'] = AppResources(app.config)
+    metrics.registry.register_cache('listing_responses', owned.listing_cache.stats)
+    metrics.registry.register_cache('internship_snapshots', owned.internship_snapshots.stats)
+    metrics.registry.register_cache('student_profiles', owned.student_profiles.stats)
+
+    app.register_blueprint(api)
+    app.cli.add_command(bootstrap.bootstrap_command)
+    metrics.registry.set_startup('create_app', time.perf_counter() - started)
+    # importing this module (and its dependencies) plus create_app: the per-worker cold start
+    metrics.registry.set_startup('total', time.perf_counter() - _import_started)
+    return app
+
+
+api = Blueprint("api", __name__)
+
+# the views below use these names; each resolves to the resources of the app serving the request
+db = LocalProxy(lambda: resources().db)
+listing_cache = LocalProxy(lambda: resources().listing_cache)
+internship_snapshots = LocalProxy(lambda: resources().internship_snapshots)
+student_profiles = LocalProxy(lambda: resources().student_profiles)
+recommender = LocalProxy(lambda: resources().recommender)
+resume_indexer = LocalProxy(lambda: resources().resume_indexer)
+
+@api.route("/api/users", methods=["POST"])
 def add_user():
     data = request.json
     role = data.get("userType")
     if not data.get("email") or not data.get("password"):
         return jsonify({"msg": "Missing email or password"}), 400
 
-    # Hash password before storing
+    # Hash password before storing (on the hashing pool, see passwords.py)
     data_to_store = data.copy()
-    data_to_store["password"] = generate_password_hash(data["password"])
+    try:
+        data_to_store["password"] = passwords.hash_password(data["password"])
+    except passwords.PasswordHashBusy:
+        return jsonify({"msg": "Server busy, try again"}), 503
 
+    data_to_store["updatedAt"] = delta.now()
     try:
         if role == "company":
             # Insert into companies collection
             result = db.companies.insert_one(data_to_store)
+            stats.bump(db, companies=1)
         else:
-            result = db.users.ins
-            ert_one(data_to_store)
+            result = db.users.insert_one(data_to_store)
+            stats.bump(db, users=1, activeStudents=int(stats.is_student(role)))
+            listing_cache.bump('users')
+            # the email may be cached as "no profile"
+            student_profiles.invalidate(data_to_store.get("email"))
     except Exception as e:
         # Handle duplicate key error
         if 'duplicate key' in str(e).lower():
@@ -99,7 +172,7 @@ def add_user():
     }
     return jsonify({"msg": "User created", "user": created}), 201
 
-@app.route("/api/login", methods=["POST"])
+@api.route("/api/login", methods=["POST"])
 def login():
     data = request.json
     email = data.get("email")
@@ -108,7 +181,20 @@ def login():
     collection = db.users if role != "company" else db.companies
 
     user = collection.find_one({"email": email})
-    if user and check_password_hash(user["password"], password):
+    try:
+        valid = bool(user) and passwords.verify_password(user.get("password"), password)
+    except passwords.PasswordHashBusy:
+        return jsonify({"msg": "Server busy, try again"}), 503
+    if valid and passwords.needs_rehash(user["password"]):
+        # hashed with an older method/cost: upgrade it now that we have the plaintext;
+        # conditional on the old hash so a concurrent password change is not overwritten
+        try:
+            # not stamped with updatedAt: the hash is never part of a list response
+            collection.update_one({"_id": user["_id"], "password": user["password"]},
+                                  {"$set": {"password": passwords.hash_password(password)}})
+        except passwords.PasswordHashBusy:
+            pass  # retried on a later login
+    if valid:
         # Return safe user fields
         safe_user = {k: v for k, v in user.items() if k not in ("password",)}
         if safe_user.get("_id"):
@@ -118,7 +204,7 @@ def login():
         return jsonify({"msg": "Invalid credentials"}), 401
 
 # Internships endpoints
-@app.route('/api/internships', methods=['POST'])
+@api.route('/api/internships', methods=['POST'])
 def create_internship():
     data = request.json
     required = ['title', 'company', 'companyEmail']
@@ -126,36 +212,72 @@ def create_internship():
         return jsonify({'msg': 'Missing required fields'}), 400
     data_to_store = data.copy()
     data_to_store['posted'] = data_to_store.get('posted') or ''
+    data_to_store['updatedAt'] = delta.now()
     try:
         res = db.internships.insert_one(data_to_store)
+        stats.internship_changed(db, None, data_to_store)
+        recommender.internship_changed(res.inserted_id, data_to_store)
+        listing_cache.bump('internships')
         created = { 'id': str(res.inserted_id), **{k: data_to_store[k] for k in data_to_store if k != 'description' } }
-        # serialize to ensure no ObjectId remains
-        created = serialize_doc(created)
         # notify: nothing here, frontend will fetch
         return jsonify({'msg': 'Internship created', 'internship': created}), 201
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/internships', methods=['GET'])
-def list_internships():
-    company = request.args.get('company') or request.args.get('companyEmail')
-    q = request.args.get('q', '').strip()
+# fields the dashboard counters (stats.py) need from a document's pre-image
+INTERNSHIP_COUNTER_PROJECTION = {'status': 1, 'company': 1, 'companyEmail': 1}
+APPLICATION_COUNTER_PROJECTION = {'status': 1, 'company': 1, 'appliedDate': 1}
+# ... plus the legacy `id` an internship snapshot may be cached under
+INTERNSHIP_PREIMAGE_PROJECTION = {**INTERNSHIP_COUNTER_PROJECTION, 'id': 1}
+# ... plus who gets told about an application change (events.py)
+APPLICATION_EVENT_PROJECTION = {**APPLICATION_COUNTER_PROJECTION, 'studentEmail': 1, 'internshipId': 1}
+COMPANY_EVENT_PROJECTION = {'email': 1, 'companyName': 1, 'company': 1}
+
+# whitelisted `sort` fields for the paginated list endpoints
+INTERNSHIP_SORTS = ('posted', 'title', 'company', 'deadline', 'status')
+APPLICATION_SORTS = ('appliedDate', 'status', 'studentName', 'company')
+USER_SORTS = ('fullName', 'email', 'userType', 'university')
+
+def internship_list_filter(args):
+    """(filter, search terms) for the internship list query parameters."""
+    company = args.get('company') or args.get('companyEmail')
     query = {}
     if company:
         query = {'$or': [{'company': company}, {'companyEmail': company}]}
-    if q:
-        qfilter = {'$or': [{'title': {'$regex': q, '$options': 'i'}}, {'position': {'$regex': q, '$options': 'i'}}, {'company': {'$regex': q, '$options': 'i'}}, {'tags': {'$regex': q, '$options': 'i'}}]}
-        if query:
-            query = {'$and': [query, qfilter]}
+    return query, args.get('q', '').strip()
+
+@api.route('/api/internships', methods=['GET'])
+@cached_view(listing_cache, 'internships')
+def list_internships():
+    query, q = internship_list_filter(request.args)
+    try:
+        since = delta.parse_since(request.args.get('since'))
+    except delta.SinceError as e:
+        return jsonify({'msg': str(e)}), e.status
+    synced_at = delta.synced_at()
+    query = delta.since_filter(query, since)
+    try:
+        if q and not request.args.get('sort'):
+            # relevance-ranked search served by the text index; `limit` returns the top matches
+            check_relevance_args(request.args)
+            docs = search_internships(db.internships, q, query, parse_limit(request.args.get('limit')))
+            headers, next_cursor = {}, None
         else:
-            query = qfilter
-    docs = list(db.internships.find(query))
+            if q:
+                query = internship_search_filter(q, query)
+            docs, headers, next_cursor = paginate(db.internships, query, request.args, INTERNSHIP_SORTS)
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
     for d in docs:
         d['id'] = str(d.pop('_id'))
-        serialize_doc(d)
-    return jsonify({'internships': docs}), 200
-
-@app.route('/api/internships/<internship_id>', methods=['PUT'])
+    body = {'internships': docs, 'syncedAt': synced_at}
+    if since:
+        body['deleted'] = delta.deleted_since(db, 'internships', since, query)
+    if request.args.get('limit'):
+        body['nextCursor'] = next_cursor
+    return jsonify(body), 200, headers
+
+@api.route('/api/internships/<internship_id>', methods=['PUT'])
 def update_internship(internship_id):
     data = request.json or {}
     # only allow these fields to be updated
@@ -163,6 +285,7 @@ def update_internship(internship_id):
     update = {k: v for k, v in data.items() if k in allowed}
     if not update:
         return jsonify({'msg': 'Nothing to update'}), 400
+    update = delta.stamp(update)
     try:
         # try to treat id as ObjectId
         try:
@@ -170,20 +293,22 @@ def update_internship(internship_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': internship_id}
-        res = db.internships.update_one(query, {'$set': update})
-        if res.matched_count == 0:
-            return jsonify({'msg': 'Not found'}), 404
-        doc = db.internships.find_one(query)
+        doc = db.internships.find_one_and_update(query, {'$set': update}, return_document=ReturnDocument.BEFORE)
         if not doc:
-            return jsonify({'msg': 'Not found after update'}), 404
-        # serialize and return
+            return jsonify({'msg': 'Not found'}), 404
+        # the pre-image plus the $set fields is the updated document
+        before = dict(doc)
+        doc.update(update)
+        stats.internship_changed(db, before, doc)
+        listing_cache.bump('internships')
+        internship_snapshots.invalidate_doc(before)
+        recommender.internship_changed(before['_id'], doc)
         doc['id'] = str(doc.pop('_id'))
-        serialize_doc(doc)
         return jsonify({'msg': 'Updated', 'internship': doc}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/internships/<internship_id>/approve', methods=['POST'])
+@api.route('/api/internships/<internship_id>/approve', methods=['POST'])
 def approve_internship(internship_id):
     try:
         try:
@@ -191,14 +316,19 @@ def approve_internship(internship_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': internship_id}
-        res = db.internships.update_one(query, {'$set': {'status': 'Active'}})
-        if res.matched_count == 0:
+        before = db.internships.find_one_and_update(query, {'$set': delta.stamp({'status': 'Active'})}, projection=INTERNSHIP_PREIMAGE_PROJECTION)
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        stats.internship_changed(db, before, {**before, 'status': 'Active'})
+        listing_cache.bump('internships')
+        internship_snapshots.invalidate_doc(before)
+        recommender.status_changed(before['_id'], 'Active')
+        events.internship_status_changed({**before, 'status': 'Active'})
         return jsonify({'msg': 'Approved'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/internships/<internship_id>/reject', methods=['POST'])
+@api.route('/api/internships/<internship_id>/reject', methods=['POST'])
 def reject_internship(internship_id):
     try:
         try:
@@ -206,67 +336,153 @@ def reject_internship(internship_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': internship_id}
-        res = db.internships.update_one(query, {'$set': {'status': 'Rejected'}})
-        if res.matched_count == 0:
+        before = db.internships.find_one_and_update(query, {'$set': delta.stamp({'status': 'Rejected'})}, projection=INTERNSHIP_PREIMAGE_PROJECTION)
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        stats.internship_changed(db, before, {**before, 'status': 'Rejected'})
+        listing_cache.bump('internships')
+        internship_snapshots.invalidate_doc(before)
+        recommender.status_changed(before['_id'], 'Rejected')
+        events.internship_status_changed({**before, 'status': 'Rejected'})
         return jsonify({'msg': 'Rejected'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
+MODERATION_STATUSES = {'approve': 'Active', 'reject': 'Rejected'}
+
+def _id_or_string_query(value):
+    try:
+        return {'_id': ObjectId(value)}
+    except Exception:
+        return {'_id': value}
+
+@api.route('/api/internships/moderation', methods=['POST'])
+def bulk_moderate_internships():
+    """Approve/reject many internships in one write.
+
+    Body: {"items": [{"id": ..., "action": "approve"|"reject"}, ...]} or {"ids": [...], "action": ...}.
+    """
+    try:
+        pairs = bulk.parse_items(request.get_json(silent=True), 'action')
+    except bulk.BulkRequestError as e:
+        return jsonify({'msg': str(e)}), 400
+    try:
+        outcome = bulk.apply_updates(db.internships, pairs, 'status', resolve=_id_or_string_query,
+                                     keys=lambda d: {str(d['_id'])}, target=MODERATION_STATUSES.get,
+                                     extra={'updatedAt': delta.now()}, projection=INTERNSHIP_PREIMAGE_PROJECTION)
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+    if outcome.exact:
+        stats.internships_changed(db, outcome.changes)
+    else:
+        stats.discard(db, {k for pair in outcome.touched for d in pair for k in stats.company_internship_keys(d)})
+    if outcome.touched:
+        listing_cache.bump('internships')
+    for before, _ in outcome.touched:
+        internship_snapshots.invalidate_doc(before)
+    for before, after in outcome.changes:
+        recommender.status_changed(before['_id'], after['status'])
+        events.internship_status_changed(after)
+    return jsonify(outcome.response()), 200
+
+@api.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-Sent Events for one dashboard: `company` (name or email, repeatable), `studentEmail` or `admin=1`.
+
+    Pushes application, internship approval and verification changes as they happen (see events.py).
+    """
+    topics = events.subscription_topics(request.args)
+    if not topics:
+        return jsonify({'msg': 'Missing company, studentEmail or admin parameter'}), 400
+    source = resources().event_source
+    if source is not None:
+        source.start()
+    subscription = events.bus.subscribe(events.Subscription(topics), request.headers.get('Last-Event-ID'))
+    return Response(events.stream(subscription), mimetype='text/event-stream', headers=events.STREAM_HEADERS)
+
+@api.route('/api/recommendations', methods=['GET'])
+def recommend_internships():
+    """Active internships ranked for a student (`email`) by skills, course, university and location.
+
+    Internships the student already applied to are left out; `limit` defaults to 20.
+    """
+    email = request.args.get('email') or request.args.get('studentEmail')
+    if not email:
+        return jsonify({'msg': 'Missing email parameter'}), 400
+    try:
+        limit = parse_limit(request.args.get('limit')) or recommend.DEFAULT_RECOMMENDATIONS
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
+    try:
+        user = db.users.find_one({'email': email}, recommend.PROFILE_PROJECTION)
+        if not user:
+            return jsonify({'msg': 'Not found'}), 404
+        applied = db.applications.distinct('internshipId', {'studentEmail': email})
+        ranked = recommender.recommend(user, limit, exclude=applied)
+        docs = {d['_id']: d for d in db.internships.find({'_id': {'$in': [i for i, _ in ranked]}})}
+        out = []
+        for internship_id, score in ranked:
+            doc = docs.get(internship_id)
+            if doc:
+                doc['id'] = str(doc.pop('_id'))
+                doc['score'] = round(score, 4)
+                out.append(doc)
+        return jsonify({'recommendations': out}), 200
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+
 # Applications endpoints
-@app.route('/api/applications', methods=['POST'])
+@api.route('/api/applications', methods=['POST'])
 def create_application():
     data = request.json
     required = ['internshipId', 'studentEmail', 'studentName', 'company']
     if not all(k in data and data[k] for k in required):
         return jsonify({'msg': 'Missing required fields'}), 400
-    data_to_store = data.copy()
-    # ensure we have an applied date so frontend can show "Applied On"
-    if not data_to_store.get('appliedDate') and not data_to_store.get('applied'):
-        data_to_store['appliedDate'] = __import__('datetime').datetime.utcnow().isoformat()
-    data_to_store['status'] = data_to_store.get('status') or 'In Review'
+    data_to_store = new_application_doc(data)
     # If an internshipId is provided, try to embed a snapshot of that internship
     try:
-        iid = data_to_store.get('internshipId')
-        if iid:
-            internship_doc = None
-            try:
-                internship_doc = db.internships.find_one({'_id': ObjectId(iid)})
-            except Exception:
-                internship_doc = db.internships.find_one({'_id': iid}) or db.internships.find_one({'id': str(iid)})
-            if internship_doc:
-                # build a small snapshot that's safe to store in application
-                snap = {
-                    'id': str(internship_doc.get('_id') or internship_doc.get('id') or ''),
-                    'position': internship_doc.get('position') or internship_doc.get('title') or '',
-                    'title': internship_doc.get('title') or '',
-                    'company': internship_doc.get('company') or internship_doc.get('companyName') or '',
-                    'stipend': internship_doc.get('stipend') or internship_doc.get('salary') or internship_doc.get('remuneration') or '',
-                    'location': internship_doc.get('location') or internship_doc.get('city') or '',
-                    'duration': internship_doc.get('duration') or internship_doc.get('period') or '',
-                    'deadline': internship_doc.get('deadline') or '',
-                    'tags': internship_doc.get('tags') or internship_doc.get('skills') or []
-                }
-                data_to_store['internship'] = snap
-                # prefer using snapshot values to fill top-level fields for backwards compatibility
-                data_to_store['internshipTitle'] = data_to_store.get('internshipTitle') or snap['position'] or snap['title']
-                data_to_store['company'] = data_to_store.get('company') or snap['company']
-                data_to_store['stipend'] = data_to_store.get('stipend') or snap['stipend']
+        snap = internship_snapshots.get(data_to_store.get('internshipId'))
+        if snap:
+            attach_internship_snapshot(data_to_store, snap)
     except Exception:
         pass
     try:
         res = db.applications.insert_one(data_to_store)
+        stats.application_changed(db, None, data_to_store)
+        listing_cache.bump('applications')
+        events.application_changed('created', data_to_store)
         created = { 'id': str(res.inserted_id), **data_to_store }
-        created = serialize_doc(created)
         return jsonify({'msg': 'Application created', 'application': created}), 201
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/applications', methods=['GET'])
-def list_applications():
-    company = request.args.get('company') or request.args.get('companyEmail')
-    student = request.args.get('studentEmail')
-    internshipId = request.args.get('internshipId')
+def new_application_doc(data):
+    """The application document to insert for a create request (before the internship snapshot)."""
+    data_to_store = data.copy()
+    # ensure we have an applied date so frontend can show "Applied On"
+    if not data_to_store.get('appliedDate') and not data_to_store.get('applied'):
+        data_to_store['appliedDate'] = __import__('datetime').datetime.utcnow().isoformat()
+    data_to_store['status'] = data_to_store.get('status') or 'In Review'
+    data_to_store['updatedAt'] = delta.now()
+    return data_to_store
+
+def attach_internship_snapshot(data_to_store, snap):
+    # a small snapshot that's safe to store in the application
+    data_to_store['internship'] = snap
+    # prefer using snapshot values to fill top-level fields for backwards compatibility
+    data_to_store['internshipTitle'] = data_to_store.get('internshipTitle') or snap['position'] or snap['title']
+    data_to_store['company'] = data_to_store.get('company') or snap['company']
+    data_to_store['stipend'] = data_to_store.get('stipend') or snap['stipend']
+
+def application_filter(args):
+    """Mongo filter for the application list/export query parameters.
+
+    Both routes take company (or companyEmail), studentEmail, internshipId and status.
+    """
+    company = args.get('company') or args.get('companyEmail')
+    student = args.get('studentEmail')
+    internshipId = args.get('internshipId')
+    status = args.get('status')
     query = {}
     if company:
         query['company'] = company
@@ -277,43 +493,96 @@ def list_applications():
             query['internshipId'] = int(internshipId)
         except Exception:
             query['internshipId'] = internshipId
-    docs = list(db.applications.find(query))
-    out = []
+    if status:
+        query['status'] = status
+    return query
+
+@api.route('/api/applications', methods=['GET'])
+# responses embed student profiles and internship snapshots, so writes to those invalidate too
+@cached_view(listing_cache, 'applications', 'internships', 'users')
+def list_applications():
+    query = application_filter(request.args)
+    try:
+        since = delta.parse_since(request.args.get('since'))
+    except delta.SinceError as e:
+        return jsonify({'msg': str(e)}), e.status
+    synced_at = delta.synced_at()
+    try:
+        docs, headers, next_cursor = paginate(db.applications, delta.since_filter(query, since), request.args,
+                                              APPLICATION_SORTS)
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
     for d in docs:
         d['id'] = str(d.pop('_id'))
-        # try to enrich missing student fields from users collection
-        enrich_application_with_user(d)
-        # If application has an internshipId but no embedded snapshot, try to fetch and attach snapshot
-        try:
-            if not d.get('internship'):
-                iid = d.get('internshipId')
-                if iid:
-                    internship_doc = None
-                    try:
-                        internship_doc = db.internships.find_one({'_id': ObjectId(iid)})
-                    except Exception:
-                        internship_doc = db.internships.find_one({'_id': iid}) or db.internships.find_one({'id': str(iid)})
-                    if internship_doc:
-                        snap = {
-                            'id': str(internship_doc.get('_id') or internship_doc.get('id') or ''),
-                            'position': internship_doc.get('position') or internship_doc.get('title') or '',
-                            'title': internship_doc.get('title') or '',
-                            'company': internship_doc.get('company') or internship_doc.get('companyName') or '',
-                            'stipend': internship_doc.get('stipend') or internship_doc.get('salary') or internship_doc.get('remuneration') or '',
-                            'location': internship_doc.get('location') or internship_doc.get('city') or '',
-                            'duration': internship_doc.get('duration') or internship_doc.get('period') or '',
-                            'deadline': internship_doc.get('deadline') or '',
-                            'tags': internship_doc.get('tags') or internship_doc.get('skills') or []
-                        }
-                        d['internship'] = snap
-                        d['stipend'] = d.get('stipend') or snap['stipend']
-        except Exception:
-            pass
-        serialize_doc(d)
-        out.append(d)
-    return jsonify({'applications': out}), 200
+    # enrich student profile fields and internship snapshots with a fixed number of queries
+    enrich_applications(docs)
+    body = {'applications': docs, 'syncedAt': synced_at}
+    if since:
+        body['deleted'] = delta.deleted_since(db, 'applications', since, query)
+    if request.args.get('limit'):
+        body['nextCursor'] = next_cursor
+    return jsonify(body), 200, headers
+
+# rows enriched per round-trip while exporting; also the cursor batch size
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+EXPORT_CSV_COLUMNS = ['id', 'studentName', 'studentEmail', 'phone', 'university', 'course', 'year',
+                      'internshipId', 'internshipTitle', 'company', 'status', 'appliedDate', 'stipend']
+
+def _iter_application_batches(query):
+    cursor = db.applications.find(query).sort('_id', 1).batch_size(EXPORT_BATCH_SIZE)
+    try:
+        while True:
+            batch = list(itertools.islice(cursor, EXPORT_BATCH_SIZE))
+            if not batch:
+                return
+            for d in batch:
+                d['id'] = str(d.pop('_id'))
+            enrich_applications(batch)
+            yield batch
+    finally:
+        cursor.close()
+
+def _export_ndjson(query):
+    for batch in _iter_application_batches(query):
+        yield b''.join(dumps_bytes(d) + b'\n' for d in batch)
+
+def _export_csv(query):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for batch in _iter_application_batches(query):
+        for d in batch:
+            d['internshipTitle'] = d.get('internshipTitle') or (d.get('internship') or {}).get('position') or ''
+            writer.writerow(d)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+@api.route('/api/applications/export', methods=['GET'])
+def export_applications():
+    """Stream applications as NDJSON (default) or CSV (`format=csv`) with the list_applications filters.
+
+    Rows are read from a server-side cursor and enriched in batches of EXPORT_BATCH_SIZE, so memory stays
+    flat and the first bytes go out as soon as the first batch is ready.
+    """
+    query = application_filter(request.args)
+    fmt = (request.args.get('format') or 'ndjson').lower()
+    if fmt == 'csv':
+        body, mimetype, ext = _export_csv(query), 'text/csv', 'csv'
+    elif fmt in ('ndjson', 'jsonl'):
+        body, mimetype, ext = _export_ndjson(query), 'application/x-ndjson', 'ndjson'
+    else:
+        return jsonify({'msg': 'Unsupported format'}), 400
+    # the rows are read while streaming, which needs this app's resources
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename=applications.{ext}'
+    # let proxies pass chunks straight through instead of buffering the whole export
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
 
-@app.route('/api/applications/<app_id>', methods=['PUT'])
+@api.route('/api/applications/<app_id>', methods=['PUT'])
 def update_application(app_id):
     data = request.json
     update = {}
@@ -321,15 +590,53 @@ def update_application(app_id):
         update['status'] = data['status']
     if not update:
         return jsonify({'msg': 'Nothing to update'}), 400
+    update = delta.stamp(update)
     try:
-        res = db.applications.update_one({'_id': ObjectId(app_id)}, {'$set': update})
-        if res.matched_count == 0:
+        before = db.applications.find_one_and_update({'_id': ObjectId(app_id)}, {'$set': update}, projection=APPLICATION_EVENT_PROJECTION)
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        stats.application_changed(db, before, {**before, **update})
+        listing_cache.bump('applications')
+        events.application_changed('updated', {**before, **update})
         return jsonify({'msg': 'Updated'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/applications/<app_id>', methods=['GET'])
+def _application_id_query(value):
+    try:
+        return {'_id': ObjectId(value)}
+    except Exception:
+        return None
+
+@api.route('/api/applications/status', methods=['POST'])
+def bulk_update_applications():
+    """Set the status of many applications in one write.
+
+    Body: {"items": [{"id": ..., "status": ...}, ...]} or {"ids": [...], "status": ...}.
+    """
+    try:
+        pairs = bulk.parse_items(request.get_json(silent=True), 'status')
+    except bulk.BulkRequestError as e:
+        return jsonify({'msg': str(e)}), 400
+    try:
+        outcome = bulk.apply_updates(db.applications, pairs, 'status', resolve=_application_id_query,
+                                     keys=lambda d: {str(d['_id'])},
+                                     target=lambda v: v if isinstance(v, str) and v else None,
+                                     extra={'updatedAt': delta.now()}, projection=APPLICATION_EVENT_PROJECTION)
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+    if outcome.exact:
+        stats.applications_changed(db, outcome.changes)
+    else:
+        stats.discard(db, {k for pair in outcome.touched for d in pair for k in stats.company_application_keys(d)})
+        stats.discard_rollups(db)
+    if outcome.touched:
+        listing_cache.bump('applications')
+    for _, after in outcome.changes:
+        events.application_changed('updated', after)
+    return jsonify(outcome.response()), 200
+
+@api.route('/api/applications/<app_id>', methods=['GET'])
 def get_application(app_id):
     try:
         try:
@@ -341,56 +648,43 @@ def get_application(app_id):
         if not doc:
             return jsonify({'msg': 'Not found'}), 404
         doc['id'] = str(doc.pop('_id'))
-        # enrich with user profile if missing
-        enrich_application_with_user(doc)
-        # If no embedded internship snapshot, attach one and set stipend
-        try:
-            if not doc.get('internship'):
-                iid = doc.get('internshipId')
-                if iid:
-                    internship_doc = None
-                    try:
-                        internship_doc = db.internships.find_one({'_id': ObjectId(iid)})
-                    except Exception:
-                        internship_doc = db.internships.find_one({'_id': iid}) or db.internships.find_one({'id': str(iid)})
-                    if internship_doc:
-                        snap = {
-                            'id': str(internship_doc.get('_id') or internship_doc.get('id') or ''),
-                            'position': internship_doc.get('position') or internship_doc.get('title') or '',
-                            'title': internship_doc.get('title') or '',
-                            'company': internship_doc.get('company') or internship_doc.get('companyName') or '',
-                            'stipend': internship_doc.get('stipend') or internship_doc.get('salary') or internship_doc.get('remuneration') or '',
-                            'location': internship_doc.get('location') or internship_doc.get('city') or '',
-                            'duration': internship_doc.get('duration') or internship_doc.get('period') or '',
-                            'deadline': internship_doc.get('deadline') or '',
-                            'tags': internship_doc.get('tags') or internship_doc.get('skills') or []
-                        }
-                        doc['internship'] = snap
-                        doc['stipend'] = doc.get('stipend') or snap['stipend']
-        except Exception:
-            pass
-        serialize_doc(doc)
+        # enrich with user profile and internship snapshot if missing (same path as list_applications)
+        enrich_applications([doc])
         return jsonify({'application': doc}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/users', methods=['GET'])
+@api.route('/api/users', methods=['GET'])
 def list_users():
     q = request.args.get('q', '').strip()
     query = {}
     if q:
         # search in name or email
-        query = {'$or': [{'fullName': {'$regex': q, '$options': 'i'}}, {'email': {'$regex': q, '$options': 'i'}}]}
-    docs = list(db.users.find(query))
+        pattern = re.escape(q)
+        query = {'$or': [{'fullName': {'$regex': pattern, '$options': 'i'}}, {'email': {'$regex': pattern, '$options': 'i'}}]}
+    try:
+        since = delta.parse_since(request.args.get('since'))
+    except delta.SinceError as e:
+        return jsonify({'msg': str(e)}), e.status
+    synced_at = delta.synced_at()
+    try:
+        docs, headers, next_cursor = paginate(db.users, delta.since_filter(query, since), request.args, USER_SORTS,
+                                              projection={'password': 0})
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
     users = []
-    for u in docs:
-        safe = {k: v for k, v in u.items() if k != 'password'}
+    for safe in docs:
         if safe.get('_id'):
             safe['id'] = str(safe.pop('_id'))
-        users.append(serialize_doc(safe))
-    return jsonify({'users': users}), 200
-
-@app.route('/api/users/<user_id>', methods=['DELETE'])
+        users.append(safe)
+    body = {'users': users, 'syncedAt': synced_at}
+    if since:
+        body['deleted'] = delta.deleted_since(db, 'users', since, query)
+    if request.args.get('limit'):
+        body['nextCursor'] = next_cursor
+    return jsonify(body), 200, headers
+
+@api.route('/api/users/<user_id>', methods=['DELETE'])
 def delete_user(user_id):
     try:
         try:
@@ -398,17 +692,24 @@ def delete_user(user_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': user_id}
-        res = db.users.delete_one(query)
-        if res.deleted_count == 0:
+        deleted = db.users.find_one_and_delete(query, projection={'userType': 1, 'email': 1})
+        if deleted:
+            stats.bump(db, users=-1, activeStudents=-int(stats.is_student(deleted.get('userType'))))
+            delta.record_deletion(db, 'users', deleted)
+            listing_cache.bump('users')
+            student_profiles.invalidate(deleted.get('email'))
+        else:
             # try companies collection
-            res2 = db.companies.delete_one(query)
-            if res2.deleted_count == 0:
+            deleted = db.companies.find_one_and_delete(query, projection={'_id': 1})
+            if not deleted:
                 return jsonify({'msg': 'Not found'}), 404
+            delta.record_deletion(db, 'companies', deleted)
+            stats.bump(db, companies=-1)
         return jsonify({'msg': 'Deleted'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/users/<user_id>/suspend', methods=['POST'])
+@api.route('/api/users/<user_id>/suspend', methods=['POST'])
 def suspend_user(user_id):
     try:
         try:
@@ -416,14 +717,15 @@ def suspend_user(user_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': user_id}
-        res = db.users.update_one(query, {'$set': {'status': 'Suspended'}})
-        if res.matched_count == 0:
+        before = db.users.find_one_and_update(query, {'$set': delta.stamp({'status': 'Suspended'})}, projection={'email': 1})
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        student_profiles.invalidate(before.get('email'))
         return jsonify({'msg': 'Suspended'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/users/<user_id>/activate', methods=['POST'])
+@api.route('/api/users/<user_id>/activate', methods=['POST'])
 def activate_user(user_id):
     try:
         try:
@@ -431,115 +733,127 @@ def activate_user(user_id):
             query = {'_id': oid}
         except Exception:
             query = {'_id': user_id}
-        res = db.users.update_one(query, {'$set': {'status': 'Active'}})
-        if res.matched_count == 0:
+        before = db.users.find_one_and_update(query, {'$set': delta.stamp({'status': 'Active'})}, projection={'email': 1})
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        student_profiles.invalidate(before.get('email'))
         return jsonify({'msg': 'Activated'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/admin/analytics', methods=['GET'])
+@api.route('/api/admin/analytics', methods=['GET'])
 def admin_analytics():
+    """Counters come from the materialized stats document; the response is cached briefly (see stats.py)."""
     try:
-        total_users = db.users.count_documents({})
-        total_companies = db.companies.count_documents({})
-        total_internships = db.internships.count_documents({})
-        pending_approvals = db.internships.count_documents({'status': 'Pending Approval'})
-        total_applications = db.applications.count_documents({})
-        active_students = db.users.count_documents({'userType': {'$in': [None, 'student', '']}})
-
-        # application status breakdown
-        selected_count = db.applications.count_documents({'status': 'Selected'})
-        in_review_count = db.applications.count_documents({'status': {'$in': ['In Review', 'Pending', None]}})
-        rejected_count = db.applications.count_documents({'status': 'Rejected'})
-
-        # top universities (from student profiles)
-        try:
-            pipeline = [
-                {'$match': {'university': {'$exists': True, '$ne': ''}}},
-                {'$group': {'_id': '$university', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}},
-                {'$limit': 6}
-            ]
-            uni_aggr = list(db.users.aggregate(pipeline))
-            top_universities = [{'university': u['_id'], 'count': u['count']} for u in uni_aggr]
-        except Exception:
-            top_universities = []
-
-        # top companies by internships posted
-        try:
-            pipeline = [
-                {'$match': {'company': {'$exists': True, '$ne': ''}}},
-                {'$group': {'_id': '$company', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}},
-                {'$limit': 6}
-            ]
-            comp_aggr = list(db.internships.aggregate(pipeline))
-            top_companies = [{'company': c['_id'], 'count': c['count']} for c in comp_aggr]
-        except Exception:
-            top_companies = []
-
-        res = {
-            'totalUsers': total_users + total_companies,
-            'activeStudents': active_students,
-            'activeCompanies': total_companies,
-            'totalInternships': total_internships,
-            'pendingApprovals': pending_approvals,
-            'thisMonthApplications': total_applications,
-            'applicationStatusCounts': {
-                'selected': selected_count,
-                'inReview': in_review_count,
-                'rejected': rejected_count,
-                'total': total_applications
-            },
-            'topUniversities': top_universities,
-            'topCompanies': top_companies
-        }
-        return jsonify(res), 200
+        return jsonify(stats.get_admin_analytics(db)), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
     
 
-@app.route('/api/company/overview', methods=['GET'])
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+def diagnostics_allowed():
+    """Metrics and the slow-query log require `Authorization: Bearer $METRICS_TOKEN`; without a token configured both are disabled.
+
+    The client address is not trusted: behind a reverse proxy every request comes from localhost.
+    """
+    if not METRICS_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}')
+
+@api.route('/api/admin/metrics', methods=['GET'])
+def admin_metrics():
+    """Prometheus scrape endpoint."""
+    if not diagnostics_allowed():
+        return jsonify({'msg': 'Forbidden'}), 403
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/admin/slow-queries', methods=['GET'])
+def admin_slow_queries():
+    """Logged slow queries grouped by query shape, worst total time first (`limit`, default 20)."""
+    if not diagnostics_allowed():
+        return jsonify({'msg': 'Forbidden'}), 403
+    try:
+        limit = parse_limit(request.args.get('limit')) or 20
+        return jsonify({'thresholdMs': resources().slow_queries.threshold_ms, 'offenders': slowlog.top_offenders(db, limit)}), 200
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+
+@api.route('/api/company/overview', methods=['GET'])
 def company_overview():
-    """Return aggregated overview stats for a company (pass company name or email as query param `company`)."""
+    """Return aggregated overview stats for a company (pass company name or email as query param `company`).
+
+    Served from the per-company counter document maintained on write (see stats.py).
+    """
     company = request.args.get('company') or request.args.get('companyEmail')
     if not company:
         return jsonify({'msg': 'Missing company parameter'}), 400
     try:
-        # internships for this company
-        query = {'$or': [{'company': company}, {'companyEmail': company}]}
-        internships = list(db.internships.find(query))
-        total_internships = len(internships)
-        active_internships = sum(1 for i in internships if (i.get('status') or '').lower() == 'active')
-        pending_internships = sum(1 for i in internships if (i.get('status') or '').lower() in ('pending approval', 'pending'))
-
-        # applications for this company
-        app_query = {'company': company}
-        total_applications = db.applications.count_documents(app_query)
-        selected_count = db.applications.count_documents({'company': company, 'status': 'Selected'})
-        in_review_count = db.applications.count_documents({'company': company, 'status': {'$in': ['In Review', 'Pending', None]}})
-        rejected_count = db.applications.count_documents({'company': company, 'status': 'Rejected'})
-
-        res = {
-            'company': company,
-            'totalInternships': total_internships,
-            'activeInternships': active_internships,
-            'pendingInternships': pending_internships,
-            'totalApplications': total_applications,
-            'applicationStatusCounts': {
-                'selected': selected_count,
-                'inReview': in_review_count,
-                'rejected': rejected_count,
-                'total': total_applications
-            }
-        }
-        return jsonify(res), 200
+        return jsonify(stats.get_company_overview(db, company)), 200
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+
+@api.route('/api/analytics/applications', methods=['GET'])
+def application_trend():
+    """Applications per day by status for the last `days` days (default 30), for `company` or the whole platform.
+
+    Read from the per-day rollups maintained on write (see stats.py), one small document per day.
+    """
+    company = request.args.get('company') or None
+    try:
+        days = int(request.args.get('days') or stats.DEFAULT_TREND_DAYS)
+    except ValueError:
+        return jsonify({'msg': 'days must be an integer'}), 400
+    if not 1 <= days <= stats.MAX_TREND_DAYS:
+        return jsonify({'msg': f'days must be between 1 and {stats.MAX_TREND_DAYS}'}), 400
+    try:
+        daily = stats.application_trend(db, company, days)
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
+    totals = {k: sum(d[k] for d in daily) for k in stats.ROLLUP_FIELDS}
+    return jsonify({'company': company, 'days': days, 'daily': daily, 'totals': totals}), 200
     
 
-@app.route('/api/companies/by-email', methods=['GET'])
+@api.route('/api/company/applicants/search', methods=['GET'])
+def search_company_applicants():
+    """Rank the students who applied to `company` by how well their resume text matches `q`.
+
+    Resumes are searched through the `resume_text` index (see resume_text.py); each result
+    carries the student's applications to this company. `limit` defaults to 20.
+    """
+    company = request.args.get('company')
+    q = (request.args.get('q') or '').strip()
+    if not company or not q:
+        return jsonify({'msg': 'Missing company or q parameter'}), 400
+    try:
+        limit = parse_limit(request.args.get('limit')) or resume_text.DEFAULT_APPLICANT_RESULTS
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
+    try:
+        ranked = resume_text.search_applicants(db, company, q, limit)
+        emails = [r['_id'] for r in ranked]
+        profiles = student_profiles.get_many(emails)
+        resumes = {r['email']: r for r in db.resumes.find({'email': {'$in': emails}},
+                                                             {'_id': 0, 'email': 1, 'resumeUrl': 1})}
+        applications = {}
+        for a in db.applications.find({'company': company, 'studentEmail': {'$in': emails}},
+                                      {'studentEmail': 1, 'internshipId': 1, 'status': 1, 'appliedDate': 1}):
+            a['id'] = str(a.pop('_id'))
+            applications.setdefault(a.pop('studentEmail'), []).append(a)
+        out = []
+        for r in ranked:
+            email, profile = r['_id'], profiles.get(r['_id']) or {}
+            out.append({'studentEmail': email, 'studentName': profile.get('fullName') or profile.get('name') or '',
+                        'score': round(r['score'], 4), 'resumeUrl': (resumes.get(email) or {}).get('resumeUrl'),
+                        'applications': applications.get(email, [])})
+        return jsonify({'applicants': out}), 200
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+
+
+@api.route('/api/companies/by-email', methods=['GET'])
 def get_company_by_email():
     email = request.args.get('email')
     if not email:
@@ -549,13 +863,12 @@ def get_company_by_email():
         if not doc:
             return jsonify({'msg': 'Not found'}), 404
         doc['id'] = str(doc.pop('_id'))
-        serialize_doc(doc)
         return jsonify({'company': doc}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 
-@app.route('/api/company/verify', methods=['POST'])
+@api.route('/api/company/verify', methods=['POST'])
 def request_company_verification():
     """Accept multipart/form-data (document file) or JSON. Save uploaded file to backend/uploads and store full URL in company doc."""
     try:
@@ -563,18 +876,16 @@ def request_company_verification():
         email = None
         linkedin = None
         document_url = None
+        retained = None  # the stored file this request holds a reference to
         if request.content_type and request.content_type.startswith('multipart/'):
+            storage.limit_request_body(request)
             email = request.form.get('email')
             linkedin = request.form.get('linkedin')
             file = request.files.get('document')
             if file:
-                uploads_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-                os.makedirs(uploads_dir, exist_ok=True)
-                filename = secure_filename(file.filename) or f'doc_{int(time.time())}'
-                filename = f"{int(time.time())}_{filename}"
-                save_path = os.path.join(uploads_dir, filename)
-                file.save(save_path)
-                document_url = request.host_url.rstrip('/') + f'/uploads/{filename}'
+                pending = storage.spool_file_storage(file)
+                retained = storage.retain(db, pending, storage.extension_for(secure_filename(file.filename)))
+                document_url = request.host_url.rstrip('/') + f'/uploads/{retained}'
         else:
             data = request.json or {}
             email = data.get('email')
@@ -582,38 +893,96 @@ def request_company_verification():
             document_url = data.get('documentUrl')
 
         if not email or not linkedin:
+            storage.release(db, retained)
             return jsonify({'msg': 'Missing email or linkedin'}), 400
+        if document_url and not retained and storage.filename_from_url(document_url):
+            # a previously uploaded file: this company references it too, so take a reference;
+            # legacy uploads have no refcount and are stored as given, as before
+            retained = storage.filename_from_url(document_url)
+            if not storage.retain_stored(db, retained):
+                retained = None
 
         now = __import__('datetime').datetime.utcnow().isoformat()
         update = {
             'linkedin': linkedin,
             'verificationStatus': 'Pending',
-            'verificationRequestedAt': now
+            'verificationRequestedAt': now,
+            'updatedAt': delta.now()
         }
         if document_url:
             update['verificationDocumentUrl'] = document_url
 
-        res = db.companies.update_one({'email': email}, {'$set': update}, upsert=False)
-        if res.matched_count == 0:
-            res2 = db.users.update_one({'email': email}, {'$set': update}, upsert=False)
-            if res2.matched_count == 0:
+        projection = {'verificationDocumentUrl': 1}
+        before = db.companies.find_one_and_update({'email': email}, {'$set': update}, projection=projection)
+        if before is None:
+            before = db.users.find_one_and_update({'email': email}, {'$set': update}, projection=projection)
+            if before is None:
+                storage.release(db, retained)
                 return jsonify({'msg': 'Company not found'}), 404
+        if document_url:
+            # the previous document is no longer referenced by this company (if it is the same
+            # file, this drops the extra reference taken above)
+            storage.release(db, storage.filename_from_url(before.get('verificationDocumentUrl')))
 
         return jsonify({'msg': 'Verification requested', 'email': email}), 200
+    except (storage.UploadTooLarge, RequestEntityTooLarge):
+        return jsonify({'msg': 'File too large', 'maxBytes': storage.MAX_UPLOAD_BYTES}), 413
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 
-@app.route('/uploads/<path:filename>', methods=['GET'])
+# Optional proxy offload for /uploads: "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd).
+# The worker still answers conditional requests, but the proxy streams (and range-serves) the bytes.
+UPLOAD_SENDFILE = os.getenv('UPLOAD_SENDFILE', '').lower()
+UPLOAD_ACCEL_PREFIX = os.getenv('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+# content-addressed names never change content, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def _upload_cache_headers(resp, sha):
+    if sha:
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.no_cache = True
+    return resp
+
+def _offloaded_upload(filename, sha):
+    path = safe_join(storage.UPLOADS_DIR, filename)
+    if not path or not os.path.isfile(path):
+        return jsonify({'msg': 'Not found'}), 404
+    resp = make_response('', 200)
+    resp.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if UPLOAD_SENDFILE == 'x-accel-redirect':
+        resp.headers['X-Accel-Redirect'] = UPLOAD_ACCEL_PREFIX.rstrip('/') + '/' + filename
+    else:
+        resp.headers['X-Sendfile'] = os.path.abspath(path)
+    if sha:
+        resp.set_etag(sha)
+    else:
+        st = os.stat(path)
+        resp.set_etag(f'{int(st.st_mtime)}-{st.st_size}', weak=True)
+    _upload_cache_headers(resp, sha)
+    return resp.make_conditional(request)
+
+@api.route('/uploads/<path:filename>', methods=['GET'])
 def serve_upload(filename):
-    uploads_dir = os.path.join(os.path.dirname(__file__), 'uploads')
+    """Serve an uploaded file with a strong ETag (its SHA-256 for content-addressed names),
+    conditional GET (304) and byte ranges (206) for PDF viewers."""
+    sha = storage.content_hash(filename)
     try:
-        return send_from_directory(uploads_dir, filename, as_attachment=False)
+        if UPLOAD_SENDFILE in ('x-accel-redirect', 'x-sendfile'):
+            return _offloaded_upload(filename, sha)
+        resp = send_from_directory(storage.UPLOADS_DIR, filename, as_attachment=False,
+                                   conditional=True, etag=sha or True,
+                                   max_age=IMMUTABLE_MAX_AGE if sha else None)
+        return _upload_cache_headers(resp, sha)
     except Exception as e:
         return jsonify({'msg': 'Not found', 'error': str(e)}), 404
 
 # New: get resume metadata by email. Returns {'resume': { ... }} or 404.
-@app.route('/api/resume', methods=['GET'])
+@api.route('/api/resume', methods=['GET'])
 def get_resume_by_email():
     email = request.args.get('email')
     if not email:
@@ -622,15 +991,13 @@ def get_resume_by_email():
         doc = db.resumes.find_one({'email': email})
         if not doc:
             return jsonify({'msg': 'Not found'}), 404
-        # convert ObjectId and nested types
         doc['id'] = str(doc.pop('_id')) if doc.get('_id') else doc.get('id')
-        serialize_doc(doc)
         return jsonify({'resume': doc}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 # Explicitly handle preflight for upload endpoint in case automatic handling misses it
-@app.route('/api/upload_resume', methods=['OPTIONS'])
+@api.route('/api/upload_resume', methods=['OPTIONS'])
 def upload_resume_options():
     resp = make_response('', 204)
     resp.headers['Access-Control-Allow-Origin'] = '*'
@@ -639,13 +1006,13 @@ def upload_resume_options():
     return resp
 
 
-@app.route('/api/admin/verifications', methods=['GET'])
+@api.route('/api/admin/verifications', methods=['GET'])
 def admin_list_verifications():
     try:
         docs = list(db.companies.find({'verificationStatus': 'Pending'}))
         out = []
         for d in docs:
-            safe = serialize_doc({k: v for k, v in d.items()})
+            safe = dict(d)
             if safe.get('_id'):
                 safe['id'] = str(safe.pop('_id'))
             # map representative fields for frontend convenience
@@ -664,7 +1031,7 @@ def admin_list_verifications():
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 
-@app.route('/api/admin/verifications/<company_id>/<action>', methods=['POST'])
+@api.route('/api/admin/verifications/<company_id>/<action>', methods=['POST'])
 def admin_process_verification(company_id, action):
     if action not in ('approve', 'reject'):
         return jsonify({'msg': 'Invalid action'}), 400
@@ -679,16 +1046,46 @@ def admin_process_verification(company_id, action):
             query = {'$or': [{'email': company_id}, {'id': company_id}]}
         new_status = 'Verified' if action == 'approve' else 'Rejected'
         now = __import__('datetime').datetime.utcnow().isoformat()
-        update = {'verificationStatus': new_status, 'verificationReviewedAt': now}
-        res = db.companies.update_one(query, {'$set': update})
-        if res.matched_count == 0:
+        update = delta.stamp({'verificationStatus': new_status, 'verificationReviewedAt': now})
+        before = db.companies.find_one_and_update(query, {'$set': update}, projection=COMPANY_EVENT_PROJECTION)
+        if not before:
             return jsonify({'msg': 'Not found'}), 404
+        events.verification_changed({**before, **update})
         return jsonify({'msg': 'OK', 'status': new_status}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 
-@app.route('/api/users/by-email', methods=['PUT'])
+VERIFICATION_STATUSES = {'approve': 'Verified', 'reject': 'Rejected'}
+
+def _company_id_query(value):
+    try:
+        return {'_id': ObjectId(value)}
+    except Exception:
+        return {'$or': [{'email': value}, {'id': value}]}
+
+@api.route('/api/admin/verifications/bulk', methods=['POST'])
+def admin_bulk_process_verifications():
+    """Approve/reject many verification requests in one write (same body as the internship moderation)."""
+    try:
+        pairs = bulk.parse_items(request.get_json(silent=True), 'action')
+    except bulk.BulkRequestError as e:
+        return jsonify({'msg': str(e)}), 400
+    now = __import__('datetime').datetime.utcnow().isoformat()
+    try:
+        # reviews are re-recorded even when the status does not change, like the single endpoint
+        outcome = bulk.apply_updates(db.companies, pairs, 'verificationStatus', resolve=_company_id_query,
+                                     keys=lambda d: {str(d['_id']), d.get('email'), d.get('id')} - {None},
+                                     target=VERIFICATION_STATUSES.get, extra=delta.stamp({'verificationReviewedAt': now}),
+                                     projection={**COMPANY_EVENT_PROJECTION, 'id': 1}, skip_unchanged=False)
+    except Exception as e:
+        return jsonify({'msg': 'Error', 'error': str(e)}), 500
+    for _, after in outcome.changes:
+        events.verification_changed(after)
+    return jsonify(outcome.response()), 200
+
+
+@api.route('/api/users/by-email', methods=['PUT'])
 def update_user_by_email():
     data = request.json or {}
     email = data.get('email')
@@ -698,51 +1095,82 @@ def update_user_by_email():
     update = {k: v for k, v in data.items() if k in allowed}
     if not update:
         return jsonify({'msg': 'Nothing to update'}), 400
+    update = delta.stamp(update)
     try:
         res = db.companies.update_one({'email': email}, {'$set': update})
         if res.matched_count == 0:
             res2 = db.users.update_one({'email': email}, {'$set': update})
             if res2.matched_count == 0:
                 return jsonify({'msg': 'Not found'}), 404
+            listing_cache.bump('users')
+            student_profiles.invalidate(email)
         # return the updated document from companies if present else users
         doc = db.companies.find_one({'email': email}) or db.users.find_one({'email': email})
         if not doc:
             return jsonify({'msg': 'Not found post-update'}), 404
         doc['id'] = str(doc.pop('_id'))
-        serialize_doc(doc)
         return jsonify({'msg': 'Updated', 'user': doc}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-def enrich_application_with_user(doc: dict):
-    """If application document lacks student profile fields, try to enrich from users collection by email."""
+def _apply_user_profile(doc: dict, user: dict):
+    # copy common fields if missing
+    if not doc.get('studentName'):
+        doc['studentName'] = user.get('fullName') or user.get('name')
+    if not doc.get('studentEmail'):
+        doc['studentEmail'] = user.get('email')
+    if not doc.get('phone'):
+        doc['phone'] = user.get('phone')
+    if not doc.get('university'):
+        doc['university'] = user.get('university')
+    if not doc.get('course'):
+        doc['course'] = user.get('course')
+    if not doc.get('year'):
+        doc['year'] = user.get('yearOfStudy') or user.get('year')
+
+def enrichment_keys(docs):
+    """(student emails, internshipIds) a batch of applications needs looked up."""
+    emails = [d.get('studentEmail') or d.get('email') for d in docs]
+    # only rows without an embedded snapshot need an internship lookup
+    internship_ids = [d.get('internshipId') for d in docs if not d.get('internship') and d.get('internshipId')]
+    return emails, internship_ids
+
+def apply_enrichment(docs, users, internships):
+    """Join {email: user} profiles and {internshipId: snapshot} onto the documents."""
+    for d in docs:
+        user = users.get(d.get('studentEmail') or d.get('email'))
+        if user:
+            _apply_user_profile(d, user)
+    for d in docs:
+        if d.get('internship') or not d.get('internshipId'):
+            continue
+        snap = internships.get(d.get('internshipId'))
+        if snap:
+            d['internship'] = snap
+            d['stipend'] = d.get('stipend') or snap['stipend']
+
+def enrich_applications(docs):
+    """Fill missing student profile fields and internship snapshots on a batch of application documents.
+
+    Issues at most one users query and one internships query (only for profiles and snapshots not cached)
+    regardless of how many documents are passed, then joins in memory.
+    """
+    docs = [d for d in docs if isinstance(d, dict)]
+    if not docs:
+        return docs
+    emails, internship_ids = enrichment_keys(docs)
     try:
-        if not isinstance(doc, dict):
-            return doc
-        student_email = doc.get('studentEmail') or doc.get('email')
-        if not student_email:
-            return doc
-        user = db.users.find_one({'email': student_email})
-        if not user:
-            return doc
-        # copy common fields if missing
-        if not doc.get('studentName'):
-            doc['studentName'] = user.get('fullName') or user.get('name')
-        if not doc.get('studentEmail'):
-            doc['studentEmail'] = user.get('email')
-        if not doc.get('phone'):
-            doc['phone'] = user.get('phone')
-        if not doc.get('university'):
-            doc['university'] = user.get('university')
-        if not doc.get('course'):
-            doc['course'] = user.get('course')
-        if not doc.get('year'):
-            doc['year'] = user.get('yearOfStudy') or user.get('year')
+        users = student_profiles.get_many(emails)
     except Exception:
-        pass
-    return doc
+        users = {}
+    try:
+        internships = internship_snapshots.get_many(internship_ids)
+    except Exception:
+        internships = {}
+    apply_enrichment(docs, users, internships)
+    return docs
 
-@app.route('/api/applications/<app_id>', methods=['DELETE'])
+@api.route('/api/applications/<app_id>', methods=['DELETE'])
 def delete_application(app_id):
     """Delete an application by id. Accepts either ObjectId hex string or raw string id."""
     try:
@@ -753,36 +1181,40 @@ def delete_application(app_id):
         except Exception:
             # fallback: match by id field or string id
             query = {'$or': [{'_id': app_id}, {'id': app_id}]}
-        res = db.applications.delete_one(query)
-        if res.deleted_count == 0:
+        deleted = db.applications.find_one_and_delete(query, projection=APPLICATION_EVENT_PROJECTION)
+        if not deleted:
             # maybe it was stored with string _id; try matching by id field explicitly
             try:
-                res2 = db.applications.delete_one({'id': app_id})
-                if res2.deleted_count == 0:
+                deleted = db.applications.find_one_and_delete({'id': app_id}, projection=APPLICATION_EVENT_PROJECTION)
+                if not deleted:
                     return jsonify({'msg': 'Not found'}), 404
             except Exception:
                 return jsonify({'msg': 'Not found'}), 404
+        stats.application_changed(db, deleted, None)
+        listing_cache.bump('applications')
+        events.application_changed('deleted', deleted)
+        delta.record_deletion(db, 'applications', deleted)
         return jsonify({'msg': 'Deleted'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
-@app.route('/api/upload_resume', methods=['POST', 'OPTIONS'])
+@api.route('/api/upload_resume', methods=['POST', 'OPTIONS'])
 def upload_resume():
     """Accept multipart/form-data (file + email) or JSON with dataUrl. Save file to backend/uploads and store resume metadata in a separate `resumes` collection."""
     try:
         # multipart form upload
         if request.content_type and request.content_type.startswith('multipart/'):
+            storage.limit_request_body(request)
             email = request.form.get('email')
             file = request.files.get('resume')
             if not email or not file:
                 return jsonify({'msg': 'Missing email or file'}), 400
 
-            uploads_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-            os.makedirs(uploads_dir, exist_ok=True)
-            filename = secure_filename(file.filename) or f'resume_{int(time.time())}'
-            filename = f"{int(time.time())}_{filename}"
-            save_path = os.path.join(uploads_dir, filename)
-            file.save(save_path)
+            # copied in fixed-size chunks, hashed and size-checked on the way to disk
+            pending = storage.spool_file_storage(file)
+            size, sha256 = pending.size, pending.sha256
+            # stored once per content hash; re-uploading the same file reuses it
+            filename = storage.retain(db, pending, storage.extension_for(secure_filename(file.filename)))
             url = request.host_url.rstrip('/') + f'/uploads/{filename}'
 
             # persist metadata in separate resumes collection (upsert by email)
@@ -792,58 +1224,61 @@ def upload_resume():
                     'resumeFilename': file.filename,
                     'storedFilename': filename,
                     'resumeUrl': url,
+                    'size': size,
+                    'sha256': sha256,
                     'uploadedAt': __import__('datetime').datetime.utcnow().isoformat()
                 }
-                db.resumes.update_one({'email': email}, {'$set': resume_doc}, upsert=True)
+                previous = db.resumes.find_one_and_update({'email': email}, {'$set': resume_doc}, upsert=True, projection={'storedFilename': 1})
+                if previous:
+                    storage.release(db, previous.get('storedFilename'))
+                resume_indexer.submit(resume_doc)
             except Exception:
                 pass
 
             return jsonify({'msg': 'Uploaded', 'url': url}), 200
 
-        # JSON/base64 upload fallback
-        data = request.json or {}
+        # JSON/base64 upload fallback: parsed and decoded straight off the request stream
+        storage.limit_request_body(request, base64_encoded=True)
+        data, pending = storage.receive_json_data_url(request.stream)
         email = data.get('email')
-        dataUrl = data.get('dataUrl') or data.get('data') or ''
-        if not email or not dataUrl:
+        if not email or not pending:
+            if pending:
+                pending.discard()
             return jsonify({'msg': 'Missing email or data'}), 400
 
-        parts = dataUrl.split(',', 1)
-        if len(parts) == 2 and parts[0].startswith('data:'):
-            meta, b64 = parts
-            try:
-                blob = base64.b64decode(b64)
-            except Exception:
-                return jsonify({'msg': 'Invalid base64 data'}), 400
-
-            ext = 'pdf'
-            if 'officedocument' in meta or 'word' in meta:
-                ext = 'docx'
-            filename = f"{int(time.time())}_resume.{ext}"
-            uploads_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-            os.makedirs(uploads_dir, exist_ok=True)
-            save_path = os.path.join(uploads_dir, filename)
-            with open(save_path, 'wb') as fh:
-                fh.write(blob)
-            url = request.host_url.rstrip('/') + f'/uploads/{filename}'
-            try:
-                resume_doc = {
-                    'email': email,
-                    'resumeFilename': filename,
-                    'storedFilename': filename,
-                    'resumeUrl': url,
-                    'uploadedAt': __import__('datetime').datetime.utcnow().isoformat()
-                }
-                db.resumes.update_one({'email': email}, {'$set': resume_doc}, upsert=True)
-            except Exception:
-                pass
-            return jsonify({'msg': 'Uploaded', 'url': url}), 200
-
-        return jsonify({'msg': 'Unsupported data format'}), 400
+        meta = pending.meta
+        ext = 'pdf'
+        if 'officedocument' in meta or 'word' in meta:
+            ext = 'docx'
+        size, sha256 = pending.size, pending.sha256
+        filename = storage.retain(db, pending, f'.{ext}')
+        url = request.host_url.rstrip('/') + f'/uploads/{filename}'
+        try:
+            resume_doc = {
+                'email': email,
+                'resumeFilename': f'resume.{ext}',
+                'storedFilename': filename,
+                'resumeUrl': url,
+                'size': size,
+                'sha256': sha256,
+                'uploadedAt': __import__('datetime').datetime.utcnow().isoformat()
+            }
+            previous = db.resumes.find_one_and_update({'email': email}, {'$set': resume_doc}, upsert=True, projection={'storedFilename': 1})
+            if previous:
+                storage.release(db, previous.get('storedFilename'))
+            resume_indexer.submit(resume_doc)
+        except Exception:
+            pass
+        return jsonify({'msg': 'Uploaded', 'url': url}), 200
+    except (storage.UploadTooLarge, RequestEntityTooLarge):
+        return jsonify({'msg': 'File too large', 'maxBytes': storage.MAX_UPLOAD_BYTES}), 413
+    except storage.InvalidUpload as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 
-@app.route('/api/upload_resume', methods=['DELETE', 'OPTIONS'])
+@api.route('/api/upload_resume', methods=['DELETE', 'OPTIONS'])
 def delete_resume():
     """Delete stored resume file (if present) and remove resume metadata from the `resumes` collection."""
     try:
@@ -857,28 +1292,25 @@ def delete_resume():
         if not res_doc:
             return jsonify({'msg': 'Not found'}), 404
 
-        url = res_doc.get('resumeUrl')
-        filename = None
-        if url and '/uploads/' in url:
-            filename = url.split('/uploads/')[-1]
-
-        if filename:
-            uploads_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-            path = os.path.join(uploads_dir, filename)
-            try:
-                if os.path.exists(path):
-                    os.remove(path)
-            except Exception:
-                pass
-
-        # remove metadata document
+        # remove metadata document, then drop its reference to the stored file
         db.resumes.delete_one({'email': email})
+        resume_indexer.remove(email)
+        try:
+            storage.release(db, res_doc.get('storedFilename') or storage.filename_from_url(res_doc.get('resumeUrl')))
+        except Exception:
+            pass
         return jsonify({'msg': 'Deleted'}), 200
     except Exception as e:
         return jsonify({'msg': 'Error', 'error': str(e)}), 500
 
 if __name__ == '__main__':
     # Allow running the server directly: python backend/app.py
+    app = create_app()
+    # Development convenience: create indexes and the admin user here; deployments run bootstrap.py once instead.
+    try:
+        bootstrap.run(resources(app).db)
+    except Exception as e:
+        print("Bootstrap failed:", e)
     # On Windows the auto-reloader can sometimes trigger socket errors (WinError 10038).
     # Disable the reloader in development to avoid the "not a socket" exception while still keeping debug logging.
     # Print registered routes for debugging preflight/route issues
@@ -889,4 +1321,3 @@ if __name__ == '__main__':
     except Exception:
         pass
     app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
-
@@ -0,0 +1,525 @@
+"""Async (ASGI) serving mode.
+
+    uvicorn asgi:app --workers 4          (from backend/; any ASGI server works)
+
+The dashboard's hot paths are served natively on PyMongo's asyncio client, so a request waiting
+on MongoDB holds no thread, and independent queries run concurrently with asyncio.gather:
+
+  GET  /api/internships, /api/applications    (same response cache, ETags and 304s)
+  GET  /api/applications/<id>
+  POST /api/applications
+  GET  /api/admin/analytics, /api/company/overview
+  GET  /api/events                              (Server-Sent Events; an open stream holds no thread)
+
+Every other route (and anything the native handlers do not take, e.g. a non-JSON body or a
+CORS preflight) is passed to the Flask app on a worker thread, so both modes expose the same
+API with the same responses; tests/test_asgi_compat.py checks that for every /api route.
+Counter and cache bookkeeping after a write reuses the sync code (stats.py, response_cache.py)
+on a thread rather than duplicating it.
+"""
+import asyncio
+import contextvars
+import re
+import sys
+import tempfile
+from urllib.parse import parse_qsl, unquote
+
+from bson.objectid import ObjectId
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.http import parse_etags
+
+import app as sync_app
+import delta
+import encoder
+import events
+import stats
+from database import adb
+from pagination import PaginationError, page_plan, page_result, parse_limit, wants_count
+from profiles import PROFILE_PROJECTION, users_by_email_query
+from response_cache import validator_headers
+from search import SCORE_PROJECTION, SCORE_SORT, check_relevance_args, internship_search_filter
+from snapshots import internships_by_ids_query, match_internships
+
+# this module is the ASGI entry point, so it builds the app it serves
+flask_app = sync_app.create_app()
+owned = sync_app.resources(flask_app)
+db = owned.db
+listing_cache = owned.listing_cache
+
+# slow native queries land in the same slow-query log; per-request metrics cover the Flask routes
+adb.configure(flask_app.config["MONGO_URI"], flask_app.config["MONGO_DB_NAME"],
+              event_listeners=[owned.slow_queries], **sync_app.mongo_pool_options(flask_app.config))
+
+# request bodies above this are spooled to disk before being handed to Flask (uploads)
+SPOOL_MAX_MEMORY = 1024 * 1024
+EXPOSED_HEADERS = 'ETag, X-Next-Cursor, X-Total-Count'
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.body = body
+
+    @property
+    def is_json(self):
+        mimetype = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))
+
+
+class Passthrough(Exception):
+    """Raised by a native handler to let the Flask app answer the request instead."""
+
+
+class BodyTooLarge(Exception):
+    """The request body grew past the app's MAX_CONTENT_LENGTH while it was being read."""
+
+
+def json_response(obj, status=200, headers=None):
+    # keys in the Flask app's order, so both modes answer byte for byte alike
+    return status, encoder.dumps_bytes(obj, flask_app.json.sort_keys), dict(headers or {})
+
+
+async def to_list(cursor):
+    return [doc async for doc in cursor]
+
+
+# --- native handlers --------------------------------------------------------------------------
+
+async def paginate(collection, query, args, allowed_sorts, projection=None):
+    """Async twin of pagination.paginate (same queries, same headers)."""
+    headers = {}
+    if wants_count(args):
+        total = await collection.count_documents(query) if query else await collection.estimated_document_count()
+        headers['X-Total-Count'] = str(total)
+    query, sort_spec, limit, field = page_plan(query, args, allowed_sorts)
+    cursor = collection.find(query, projection).sort(sort_spec)
+    if limit is None:
+        return await to_list(cursor), headers, None
+    docs, next_cursor = page_result(await to_list(cursor.limit(limit + 1)), limit, field, headers)
+    return docs, headers, next_cursor
+
+
+async def cached_listing(request, collections, handler):
+    """The async side of ResponseCache.cached: same key, generations, ETag and 304 handling."""
+    key = listing_cache.request_key(request.path, request.args)
+    generations = await asyncio.to_thread(listing_cache.generations.current, collections)
+    etag = listing_cache.etag(key, generations)
+    validators = validator_headers(etag)
+    if parse_etags(request.headers.get('If-None-Match')).contains_weak(etag):
+        return 304, b'', validators
+    entry = listing_cache.get(key, generations)
+    if entry is not None:
+        body, headers = entry
+        return 200, body, {**dict(headers), **validators}
+    status, body, headers = await handler(request)
+    if status == 200:
+        headers.setdefault('Content-Type', 'application/json')
+        listing_cache.put(key, generations, body, headers.items())
+        headers.update(validators)
+    return status, body, headers
+
+
+async def deleted_since(collection, since, list_query):
+    """delta.deleted_since on the async client."""
+    cursor = adb.tombstones.find(delta.tombstone_query(collection, since, list_query), {'docId': 1})
+    ids = delta.deleted_ids(await to_list(cursor))
+    left = delta.left_query(collection, since, list_query)
+    if left is not None:
+        ids = delta.with_left_ids(ids, await to_list(getattr(adb, collection).find(left, {'_id': 1})))
+    return ids
+
+
+async def list_internships(request):
+    query, q = sync_app.internship_list_filter(request.args)
+    try:
+        since = delta.parse_since(request.args.get('since'))
+    except delta.SinceError as e:
+        return json_response({'msg': str(e)}, e.status)
+    synced_at = delta.synced_at()
+    query = delta.since_filter(query, since)
+    try:
+        if q and not request.args.get('sort'):
+            check_relevance_args(request.args)
+            cursor = adb.internships.find(internship_search_filter(q, query), SCORE_PROJECTION).sort(SCORE_SORT)
+            limit = parse_limit(request.args.get('limit'))
+            if limit:
+                cursor = cursor.limit(limit)
+            docs = await to_list(cursor)
+            for d in docs:
+                d.pop('score', None)
+            headers, next_cursor = {}, None
+        else:
+            if q:
+                query = internship_search_filter(q, query)
+            docs, headers, next_cursor = await paginate(adb.internships, query, request.args, sync_app.INTERNSHIP_SORTS)
+    except PaginationError as e:
+        return json_response({'msg': str(e)}, 400)
+    for d in docs:
+        d['id'] = str(d.pop('_id'))
+    body = {'internships': docs, 'syncedAt': synced_at}
+    if since:
+        body['deleted'] = await deleted_since('internships', since, query)
+    if request.args.get('limit'):
+        body['nextCursor'] = next_cursor
+    return json_response(body, 200, headers)
+
+
+async def internship_snapshots(internship_ids):
+    """InternshipSnapshots.get_many with the cache misses read on the async client."""
+    snapshots = owned.internship_snapshots
+    found, missing = snapshots.cached(internship_ids)
+    if missing:
+        version = snapshots.invalidations
+        rows = await to_list(adb.internships.find(internships_by_ids_query(missing)))
+        found.update(snapshots.store(match_internships(missing, rows), version))
+    return found
+
+
+async def student_profiles(emails):
+    """StudentProfiles.get_many with the cache misses read on the async client."""
+    profiles = owned.student_profiles
+    found, missing = profiles.cached(emails)
+    if missing:
+        version = profiles.invalidations
+        rows = await to_list(adb.users.find(users_by_email_query(missing), PROFILE_PROJECTION))
+        found.update(profiles.store(missing, rows, version))
+    return found
+
+
+async def enrich_applications(docs):
+    """Same joins as app.enrich_applications, with the users and internships lookups in parallel."""
+    emails, internship_ids = sync_app.enrichment_keys(docs)
+    users_found, internships_found = await asyncio.gather(student_profiles(emails), internship_snapshots(internship_ids),
+                                                          return_exceptions=True)
+    sync_app.apply_enrichment(docs,
+                              {} if isinstance(users_found, Exception) else users_found,
+                              {} if isinstance(internships_found, Exception) else internships_found)
+    return docs
+
+
+async def list_applications(request):
+    query = sync_app.application_filter(request.args)
+    try:
+        since = delta.parse_since(request.args.get('since'))
+    except delta.SinceError as e:
+        return json_response({'msg': str(e)}, e.status)
+    synced_at = delta.synced_at()
+    try:
+        docs, headers, next_cursor = await paginate(adb.applications, delta.since_filter(query, since), request.args,
+                                                    sync_app.APPLICATION_SORTS)
+    except PaginationError as e:
+        return json_response({'msg': str(e)}, 400)
+    for d in docs:
+        d['id'] = str(d.pop('_id'))
+    await enrich_applications(docs)
+    body = {'applications': docs, 'syncedAt': synced_at}
+    if since:
+        body['deleted'] = await deleted_since('applications', since, query)
+    if request.args.get('limit'):
+        body['nextCursor'] = next_cursor
+    return json_response(body, 200, headers)
+
+
+async def get_application(request, app_id):
+    try:
+        try:
+            query = {'_id': ObjectId(app_id)}
+        except Exception:
+            query = {'_id': app_id}
+        doc = await adb.applications.find_one(query)
+        if not doc:
+            return json_response({'msg': 'Not found'}, 404)
+        doc['id'] = str(doc.pop('_id'))
+        await enrich_applications([doc])
+        return json_response({'application': doc}, 200)
+    except Exception as e:
+        return json_response({'msg': 'Error', 'error': str(e)}, 500)
+
+
+async def create_application(request):
+    if not request.is_json:
+        raise Passthrough()
+    try:
+        data = encoder.loads(request.body)
+    except Exception:
+        raise Passthrough()
+    if not isinstance(data, dict):
+        raise Passthrough()
+    required = ['internshipId', 'studentEmail', 'studentName', 'company']
+    if not all(k in data and data[k] for k in required):
+        return json_response({'msg': 'Missing required fields'}, 400)
+    data_to_store = sync_app.new_application_doc(data)
+    try:
+        iid = data_to_store.get('internshipId')
+        snap = (await internship_snapshots([iid])).get(iid)
+        if snap:
+            sync_app.attach_internship_snapshot(data_to_store, snap)
+    except Exception:
+        pass
+    try:
+        res = await adb.applications.insert_one(data_to_store)
+        await asyncio.gather(asyncio.to_thread(stats.application_changed, db, None, data_to_store),
+                             asyncio.to_thread(listing_cache.bump, 'applications'))
+        events.application_changed('created', data_to_store)
+        created = {'id': str(res.inserted_id), **data_to_store}
+        return json_response({'msg': 'Application created', 'application': created}, 201)
+    except Exception as e:
+        return json_response({'msg': 'Error', 'error': str(e)}, 500)
+
+
+async def admin_analytics(request):
+    """Counters and top-N lists come from their caches (see stats.py); the missing parts are read concurrently."""
+    try:
+        async def counters():
+            doc, this_month = await asyncio.gather(
+                adb.stats.find_one({'_id': stats.STATS_ID}),
+                # may run the one-time rollup backfill, so off the event loop
+                asyncio.to_thread(stats.applications_this_month, db))
+            if not stats.is_built(doc):
+                # first read after a reset: the full recount lives in stats.py
+                return await asyncio.to_thread(stats.admin_counters, db)
+            return {k: doc.get(k, 0) for k in stats.COUNTER_FIELDS}, this_month
+
+        async def top(collection, field):
+            try:
+                return stats.top_list(await to_list(await collection.aggregate(stats.top_pipeline(field))), field)
+            except Exception:
+                return []
+
+        async def top_lists():
+            return tuple(await asyncio.gather(top(adb.users, 'university'), top(adb.internships, 'company')))
+
+        # misses go through the caches' single-flight, shared with the Flask side: one recount at a time
+        (counter_values, this_month), (top_universities, top_companies) = await asyncio.gather(
+            stats.analytics_cache.get_or_compute_async(stats.COUNTERS_KEY, counters),
+            stats.top_lists_cache.get_or_compute_async(stats.TOP_LISTS_KEY, top_lists))
+        return json_response(stats.analytics_response(counter_values, top_universities, top_companies, this_month), 200)
+    except Exception as e:
+        return json_response({'msg': 'Error', 'error': str(e)}, 500)
+
+
+async def company_overview(request):
+    company = request.args.get('company') or request.args.get('companyEmail')
+    if not company:
+        return json_response({'msg': 'Missing company parameter'}, 400)
+    try:
+        doc = await adb.company_stats.find_one({'_id': company})
+        if doc:
+            counters = {k: doc.get(k, 0) for k in stats.COMPANY_COUNTER_FIELDS}
+        else:
+            counters = await asyncio.to_thread(stats.rebuild_company_stats, db, company)
+        return json_response(stats.company_overview_response(company, counters), 200)
+    except Exception as e:
+        return json_response({'msg': 'Error', 'error': str(e)}, 500)
+
+
+ROUTES = [
+    ('GET', re.compile(r'/api/internships'),
+     lambda r: cached_listing(r, ('internships',), list_internships)),
+    ('GET', re.compile(r'/api/applications'),
+     lambda r: cached_listing(r, ('applications', 'internships', 'users'), list_applications)),
+    ('POST', re.compile(r'/api/applications'), create_application),
+    ('GET', re.compile(r'/api/applications/(?P<app_id>(?!export$)[^/]+)'), get_application),
+    ('GET', re.compile(r'/api/admin/analytics'), admin_analytics),
+    ('GET', re.compile(r'/api/company/overview'), company_overview),
+]
+
+
+def match_route(method, path):
+    for route_method, pattern, handler in ROUTES:
+        if route_method == method:
+            m = pattern.fullmatch(path)
+            if m:
+                return handler, {k: unquote(v) for k, v in m.groupdict().items()}
+    return None, None
+
+
+async def event_stream(scope, receive, send):
+    """The /api/events stream on the event loop, woken by the bus from whichever thread publishes."""
+    request = Request(scope, b'')
+    topics = events.subscription_topics(request.args)
+    if not topics:
+        status, payload, headers = json_response({'msg': 'Missing company, studentEmail or admin parameter'}, 400)
+        await send_response(send, status, payload, headers, request)
+        return
+    if owned.event_source is not None:
+        owned.event_source.start()
+    subscription = events.bus.subscribe(events.AsyncSubscription(topics, asyncio.get_running_loop()),
+                                        request.headers.get('Last-Event-ID'))
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.interrupt()
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    headers = Headers({'Content-Type': 'text/event-stream', **events.STREAM_HEADERS})
+    if request.headers.get('Origin'):
+        headers['Access-Control-Allow-Origin'] = '*'
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]})
+        await send({'type': 'http.response.body', 'body': events.OPENING, 'more_body': True})
+        while not disconnected.done():
+            event = await subscription.next_async(events.EVENTS_HEARTBEAT)
+            if disconnected.done():
+                break
+            await send({'type': 'http.response.body', 'body': events.HEARTBEAT if event is None else event.wire,
+                        'more_body': True})
+    finally:
+        disconnected.cancel()
+        events.bus.unsubscribe(subscription)
+
+
+# --- ASGI plumbing ----------------------------------------------------------------------------
+
+async def read_body(receive, spool=False):
+    """Collect the request body, raising BodyTooLarge past MAX_CONTENT_LENGTH (chunked bodies too)."""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) if spool else bytearray()
+    limit = flask_app.config['MAX_CONTENT_LENGTH']
+    received = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        received += len(message.get('body', b''))
+        if limit is not None and received > limit:
+            if spool:
+                body.close()
+            raise BodyTooLarge()
+        if spool:
+            body.write(message.get('body', b''))
+        else:
+            body.extend(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    if spool:
+        body.seek(0)
+        return body
+    return bytes(body)
+
+
+async def send_response(send, status, body, headers, request):
+    headers = Headers(headers)
+    if request.headers.get('Origin'):
+        # what flask-cors sends for origins="*": the request's origin echoed back
+        headers['Access-Control-Allow-Origin'] = request.headers['Origin']
+        headers['Access-Control-Expose-Headers'] = EXPOSED_HEADERS
+        headers['Vary'] = 'Origin'
+    if status != 304:
+        headers.setdefault('Content-Type', 'application/json')
+    headers['Content-Length'] = str(len(body))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # the body is fully spooled, so werkzeug may read chunked (length-less) requests to EOF
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def call_flask(scope, body, send):
+    """Run the Flask app on a worker thread; streamed bodies (the export) are relayed chunk by chunk."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return lambda data: None
+
+    # every step runs in one context: a streamed body (stream_with_context) keeps the request
+    # context in context variables from one chunk to the next
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+
+    def in_context(func, *args):
+        return loop.run_in_executor(None, context.run, func, *args)
+
+    environ = wsgi_environ(scope, body)
+    result = await in_context(flask_app.wsgi_app, environ, start_response)
+    iterator = iter(result)
+    try:
+        first = await in_context(next, iterator, None)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        chunk = first
+        while chunk is not None:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await in_context(next, iterator, None)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        close = getattr(result, 'close', None)
+        if close:
+            await in_context(close)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if adb._client is not None:
+                    await adb._client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'GET' and scope['path'] == '/api/events':
+        await event_stream(scope, receive, send)
+        return
+    handler, params = match_route(scope['method'], scope['path'])
+    try:
+        body = await read_body(receive, spool=handler is None)
+    except BodyTooLarge:
+        status, payload, headers = json_response({'msg': 'Request body too large'}, 413)
+        await send_response(send, status, payload, headers, Request(scope, b''))
+        return
+    if handler is None:
+        await call_flask(scope, body, send)
+        return
+    request = Request(scope, body)
+    try:
+        status, payload, headers = await handler(request, **params)
+    except Passthrough:
+        stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        stream.write(body)
+        stream.seek(0)
+        await call_flask(scope, stream, send)
+        return
+    await send_response(send, status, payload, headers, request)
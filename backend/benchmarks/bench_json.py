@@ -0,0 +1,111 @@
+"""Micro-benchmark: legacy serialize_doc + stdlib jsonify vs. the one-pass response encoder.
+
+Run from backend/:  python benchmarks/bench_json.py [rows] [repeats]
+"""
+import copy
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bson import ObjectId  # noqa: E402
+
+import encoder  # noqa: E402
+
+
+def legacy_serialize_doc(doc):
+    """The recursive walk every endpoint used to run before jsonify."""
+    if not isinstance(doc, dict):
+        return doc
+    for k, v in list(doc.items()):
+        if isinstance(v, ObjectId):
+            doc[k] = str(v)
+        elif isinstance(v, list):
+            new_list = []
+            for item in v:
+                if isinstance(item, ObjectId):
+                    new_list.append(str(item))
+                elif isinstance(item, dict):
+                    new_list.append(legacy_serialize_doc(item))
+                else:
+                    new_list.append(item)
+            doc[k] = new_list
+        elif isinstance(v, dict):
+            doc[k] = legacy_serialize_doc(v)
+    return doc
+
+
+def legacy_encode(docs):
+    out = [legacy_serialize_doc(d) for d in docs]
+    # Flask's default provider: sorted keys, ASCII-only, compact separators
+    return json.dumps({'applications': out}, sort_keys=True, ensure_ascii=True, separators=(',', ':')).encode('utf-8')
+
+
+def stdlib_encode(docs):
+    return encoder._stdlib_dumps_bytes({'applications': docs}, sort_keys=True)
+
+
+def make_applications(n):
+    docs = []
+    for i in range(n):
+        iid = ObjectId()
+        docs.append({
+            'id': str(ObjectId()),
+            'internshipId': str(iid),
+            'studentEmail': f'student{i}@university.edu',
+            'studentName': f'Student Number {i}',
+            'company': f'Company {i % 50}',
+            'internshipTitle': 'Software Engineering Intern',
+            'status': ('In Review', 'Selected', 'Rejected')[i % 3],
+            'appliedDate': datetime.datetime(2024, 1, 1 + i % 28).isoformat(),
+            'phone': '+91 98765 43210',
+            'university': 'State University',
+            'course': 'B.Tech Computer Science',
+            'year': '3',
+            'coverLetter': 'I am excited to apply for this role. ' * 8,
+            'stipend': '15000/month',
+            'internship': {
+                'id': iid,
+                'position': 'Software Engineering Intern',
+                'title': 'Software Engineering Intern',
+                'company': f'Company {i % 50}',
+                'stipend': '15000/month',
+                'location': 'Bengaluru',
+                'duration': '6 months',
+                'deadline': '2024-12-31',
+                'tags': ['python', 'react', 'mongodb', 'flask', 'typescript'],
+            },
+            'reviewers': [ObjectId(), ObjectId()],
+        })
+    return docs
+
+
+def bench(name, fn, rows, repeats):
+    timings = []
+    for _ in range(repeats):
+        docs = make_applications(rows)  # fresh documents: the legacy path mutates them in place
+        start = time.perf_counter()
+        fn(docs)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f'{name:<28} best {best * 1000:8.2f} ms   {rows / best:12,.0f} docs/s')
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f'{rows} application documents, best of {repeats}; active backend: {encoder.BACKEND}')
+    baseline = bench('serialize_doc + json.dumps', legacy_encode, rows, repeats)
+    stdlib = bench('encoder (stdlib fallback)', stdlib_encode, rows, repeats)
+    print(f'  fallback speedup: {baseline / stdlib:.2f}x')
+    if encoder.orjson:
+        fast = bench('encoder (orjson)', lambda docs: encoder.dumps_bytes({'applications': docs}, sort_keys=True), rows, repeats)
+        print(f'  orjson speedup:   {baseline / fast:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
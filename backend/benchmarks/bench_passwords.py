@@ -0,0 +1,61 @@
+"""Benchmark: logins/sec against password hashing pool size.
+
+Each "login" verifies a password the way `/api/login` does, from many request threads at once.
+Workers=0 is the old behaviour (hashing inline in the request thread). Also reports how long a
+trivial request waits behind the burst, which is what the pool is meant to fix.
+
+Run from backend/:  python benchmarks/bench_passwords.py [logins] [threads] [method]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import passwords  # noqa: E402
+
+
+def run(workers, logins, threads, stored, password, method):
+    hasher = passwords.PasswordHasher(method=method, workers=workers, max_pending=max(threads, 1))
+    hasher.verify(stored, password)  # start the pool outside the timing
+    stalls = []
+    done = threading.Event()
+
+    def ticker():
+        # a cheap request that only needs the GIL for a moment
+        while not done.is_set():
+            t0 = time.perf_counter()
+            sum(range(1000))
+            stalls.append(time.perf_counter() - t0)
+            time.sleep(0.005)
+
+    tick = threading.Thread(target=ticker)
+    tick.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        assert all(ex.map(lambda _: hasher.verify(stored, password), range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    tick.join()
+    hasher.shutdown()
+    return logins / elapsed, max(stalls) * 1000 if stalls else 0.0
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    method = sys.argv[3] if len(sys.argv) > 3 else passwords.PASSWORD_HASH_METHOD
+    password = 'correct horse battery staple'
+    stored = passwords.PasswordHasher(method=method, workers=0).hash(password)
+    cpus = os.cpu_count() or 1
+    print(f'{logins} logins from {threads} threads, method={passwords.method_prefix(method)}, {cpus} CPUs')
+    print(f'{"workers":>8} {"logins/s":>10} {"worst stall ms":>15}')
+    for workers in sorted({0, 1, 2, 4, cpus}):
+        rate, stall = run(workers, logins, threads, stored, password, method)
+        print(f'{workers:>8} {rate:>10.1f} {stall:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Load test: concurrent connections each serving mode sustains at a p99 latency target.
+
+Start both servers against the same database, e.g. from backend/:
+
+  gunicorn -w 4 --threads 8 -b :5001 "app:create_app()"
+  uvicorn asgi:app --workers 4 --port 5002
+
+then:
+
+  python benchmarks/load_async.py http://localhost:5001 http://localhost:5002 \
+      [--path /api/applications?limit=50] [--p99-ms 250] [--seconds 10]
+
+Each level opens N keep-alive connections that issue requests back to back for --seconds and
+reports throughput and latency percentiles; the summary is the highest N whose p99 stayed under
+the target. Plain asyncio sockets, so the client is not the bottleneck being measured.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlsplit
+
+LEVELS = (1, 8, 32, 64, 128, 256, 512, 1024)
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    headers = {}
+    for line in head.split(b'\r\n')[1:]:
+        if b':' in line:
+            name, value = line.split(b':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if b'content-length' in headers:
+        await reader.readexactly(int(headers[b'content-length']))
+    elif headers.get(b'transfer-encoding', b'').lower() == b'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get(b'connection', b'').lower() != b'close'
+
+
+async def connection(host, port, request, deadline, latencies, errors):
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if writer is None:
+                # servers without keep-alive pay the reconnect inside the measured latency
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 500:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run_level(url, connections, seconds):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    request = (f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nAccept: application/json\r\n\r\n').encode()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(connection(parts.hostname, parts.port or 80, request, deadline, latencies, errors)
+                           for _ in range(connections)))
+    return latencies, errors
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+async def measure(base_url, path, p99_ms, seconds, levels):
+    print(f'\n{base_url}{path}')
+    print(f'{"conns":>6} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    best = 0
+    for n in levels:
+        latencies, errors = await run_level(base_url + path, n, seconds)
+        latencies.sort()
+        p50, p99 = percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000
+        print(f'{n:>6} {len(latencies) / seconds:>9.1f} {p50:>8.1f} {p99:>8.1f} {len(errors):>7}')
+        if p99 > p99_ms or errors:
+            break
+        best = n
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('sync_url')
+    parser.add_argument('async_url')
+    parser.add_argument('--path', default='/api/applications?limit=50')
+    parser.add_argument('--p99-ms', type=float, default=250)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--levels', default=','.join(map(str, LEVELS)))
+    args = parser.parse_args()
+    levels = [int(n) for n in args.levels.split(',')]
+    results = {}
+    for label, url in (('sync (WSGI)', args.sync_url), ('async (ASGI)', args.async_url)):
+        results[label] = await measure(url.rstrip('/'), args.path, args.p99_ms, args.seconds, levels)
+    print(f'\nconcurrent connections at p99 <= {args.p99_ms:g} ms')
+    for label, best in results.items():
+        print(f'  {label:<14} {best}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
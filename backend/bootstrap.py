@@ -0,0 +1,84 @@
+"""One-shot deployment setup: indexes, capped collections, the seeded admin user, the
+application rollup backfill and a recount of the platform counters.
+
+These used to run at import time in every worker. Run once per deploy instead:
+
+  python bootstrap.py            (from backend/)
+  flask --app app bootstrap
+
+Both exit 1 if an index could not be built. With CHECK_QUERY_PLANS=1 they also explain every
+endpoint query (indexes.QUERY_SHAPES) and exit 1 if one plans a collection scan, so a CI or
+staging deploy fails on a query-shape regression.
+"""
+import os
+import sys
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+
+import passwords
+import slowlog
+import stats
+from indexes import check_query_plans, ensure_indexes
+
+CHECK_QUERY_PLANS = os.getenv('CHECK_QUERY_PLANS', '').lower() in ('1', 'true', 'yes')
+
+
+def seed_admin_user(db):
+    """Create the default admin (ADMIN_EMAIL / ADMIN_PASSWORD) if it does not exist yet."""
+    admin_email = os.getenv("ADMIN_EMAIL", "admin@internlink.local")
+    admin_password = os.getenv("ADMIN_PASSWORD", "adminpass")
+    if db.users.find_one({"email": admin_email}, {"_id": 1}):
+        return False
+    admin_doc = {
+        "fullName": "Platform Admin",
+        "email": admin_email,
+        # hashed inline: this runs once, outside any request
+        "password": generate_password_hash(admin_password, passwords.PASSWORD_HASH_METHOD),
+        "userType": "admin",
+        "isAdmin": True
+    }
+    db.users.insert_one(admin_doc)
+    stats.bump(db, users=1)
+    print(f"Seeded admin user: {admin_email}")
+    return True
+
+
+def run(db, check_plans=CHECK_QUERY_PLANS):
+    """Idempotent; safe to run on every deploy. Returns False if an index failed or a query plan regressed."""
+    created, errors = ensure_indexes(db)
+    for coll_name, names in created.items():
+        print(f'{coll_name}: {", ".join(names)}')
+    for coll_name, name, error in errors:
+        print(f'FAILED {coll_name}.{name}: {error}')
+    failures = check_query_plans(db) if check_plans else []
+    for endpoint, coll_name, query, stages in failures:
+        print(f'COLLSCAN {endpoint} on {coll_name}: {query} -> {" > ".join(stages)}')
+    slowlog.ensure_log_collection(db)
+    seed_admin_user(db)
+    written = stats.ensure_rollups(db)
+    if written is not None:
+        print(f'application_rollups: {written} documents')
+    for field, (stored, counted) in sorted(stats.reconcile_stats(db).items()):
+        print(f'stats.{field}: {stored} -> {counted}')
+    return not errors and not failures
+
+
+@click.command('bootstrap')
+@with_appcontext
+def bootstrap_command():
+    """Create indexes and capped collections, seed the admin user, backfill rollups and recount stats."""
+    from app import resources
+    if not run(resources().db):
+        raise SystemExit(1)
+
+
+def main():
+    # building the app configures the connection from the environment
+    from app import create_app, resources
+    return 0 if run(resources(create_app()).db) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
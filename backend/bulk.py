@@ -0,0 +1,143 @@
+"""Bulk status changes: many documents, one unordered bulk_write.
+
+The bulk endpoints take either {"items": [{"id": ..., "<field>": ...}, ...]} or the shorthand
+{"ids": [...], "<field>": ...}. Pre-images are read with one query so the counter deltas in
+stats.py can be computed, each update is conditional on the value that was read, and all of
+them are sent in a single unordered `bulk_write`. Every id gets its own result:
+
+  updated    the write was applied
+  unchanged  the document already had the target value (nothing written)
+  notFound   no document for this id
+  invalid    bad or duplicate id, or bad target value
+  conflict   the document changed between the read and the write; not applied
+  failed     the server rejected the write
+
+A bulk_write result only has totals, so when fewer updates matched than were sent, the touched
+documents are re-read to tell `updated` from `conflict`, and `exact` is False: the caller cannot
+know which counter deltas were applied by whom and should recount instead (stats.discard).
+"""
+import os
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '500'))
+
+
+class BulkRequestError(ValueError):
+    """The request body is not a usable bulk request (reported as 400)."""
+
+
+def parse_items(data, field):
+    """[(id, value), ...] in request order."""
+    if not isinstance(data, dict):
+        raise BulkRequestError('Expected a JSON object')
+    if 'items' in data:
+        items = data['items']
+        if not isinstance(items, list):
+            raise BulkRequestError('items must be a list')
+        pairs = [(i.get('id'), i.get(field, data.get(field))) if isinstance(i, dict) else (None, None) for i in items]
+    elif 'ids' in data:
+        if not isinstance(data['ids'], list):
+            raise BulkRequestError('ids must be a list')
+        pairs = [(i, data.get(field)) for i in data['ids']]
+    else:
+        raise BulkRequestError('Missing items or ids')
+    if not pairs:
+        raise BulkRequestError('Nothing to update')
+    if len(pairs) > BULK_MAX_ITEMS:
+        raise BulkRequestError(f'At most {BULK_MAX_ITEMS} items per request')
+    return pairs
+
+
+def _combined_filter(queries):
+    # plain _id lookups collapse into one $in; anything else (e.g. email matches) is OR-ed in
+    ids = [q['_id'] for q in queries if list(q) == ['_id']]
+    clauses = ([{'_id': {'$in': ids}}] if ids else []) + [q for q in queries if list(q) != ['_id']]
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+
+class BulkOutcome:
+    def __init__(self, results, changes, touched, exact):
+        self.results = results  # one dict per requested item, in request order
+        self.changes = changes  # [(before, after)] for applied writes
+        self.touched = touched  # [(before, after)] for every write sent
+        self.exact = exact
+
+    def response(self):
+        summary = {}
+        for r in self.results:
+            summary[r['result']] = summary.get(r['result'], 0) + 1
+        return {'msg': 'OK', 'results': self.results, 'summary': summary}
+
+
+def apply_updates(collection, pairs, field, resolve, keys, target, extra=None, projection=None,
+                  skip_unchanged=True):
+    """Set `field` on the documents named by `pairs`.
+
+    resolve(id) -> filter for that id, or None if the id is malformed
+    keys(doc) -> the ids a fetched document answers to
+    target(value) -> the new value of `field`, or None if the requested value is invalid; only
+        called for string values (anything else from the request JSON is invalid)
+    extra: further fields to $set on every written document
+    projection: fields of the pre-image the caller needs (the `before` documents it gets back)
+    """
+    results = [None] * len(pairs)
+    wanted = {}
+    for n, (item_id, value) in enumerate(pairs):
+        query = resolve(item_id) if isinstance(item_id, str) and item_id else None
+        new_value = target(value) if isinstance(value, str) else None
+        if query is None:
+            results[n] = {'id': item_id, 'result': 'invalid', 'error': 'Invalid id'}
+        elif item_id in wanted:
+            results[n] = {'id': item_id, 'result': 'invalid', 'error': 'Duplicate id'}
+        elif new_value is None:
+            results[n] = {'id': item_id, 'result': 'invalid', 'error': 'Invalid value'}
+        else:
+            wanted[item_id] = (n, query, new_value)
+
+    found = {}
+    if wanted:
+        if projection is not None:
+            projection = {**projection, field: 1}
+        for doc in collection.find(_combined_filter([q for _, q, _ in wanted.values()]), projection):
+            for key in keys(doc):
+                found.setdefault(key, doc)
+
+    ops, pending = [], []
+    for item_id, (n, _, new_value) in wanted.items():
+        before = found.get(item_id)
+        if before is None:
+            results[n] = {'id': item_id, 'result': 'notFound'}
+        elif skip_unchanged and before.get(field) == new_value:
+            results[n] = {'id': item_id, 'result': 'unchanged', field: new_value}
+        else:
+            update = {field: new_value, **(extra or {})}
+            ops.append(UpdateOne({'_id': before['_id'], field: before.get(field)}, {'$set': update}))
+            pending.append((n, item_id, before, {**before, **update}))
+
+    failed = {}
+    matched = len(ops)
+    if ops:
+        try:
+            matched = collection.bulk_write(ops, ordered=False).matched_count
+        except BulkWriteError as e:
+            failed = {err['index']: err.get('errmsg', 'Write failed') for err in e.details.get('writeErrors', [])}
+            matched = e.details.get('nMatched', 0)
+    exact = matched == len(ops) - len(failed)
+    current = {}
+    if not exact:
+        ids = [before['_id'] for _, _, before, _ in pending]
+        current = {d['_id']: d.get(field) for d in collection.find({'_id': {'$in': ids}}, {field: 1})}
+
+    changes = []
+    for i, (n, item_id, before, after) in enumerate(pending):
+        if i in failed:
+            results[n] = {'id': item_id, 'result': 'failed', 'error': failed[i]}
+        elif exact or current.get(before['_id']) == after[field]:
+            results[n] = {'id': item_id, 'result': 'updated', field: after[field]}
+            changes.append((before, after))
+        else:
+            results[n] = {'id': item_id, 'result': 'conflict'}
+    touched = [(before, after) for _, _, before, after in pending]
+    return BulkOutcome(results, changes, touched, exact)
@@ -0,0 +1,179 @@
+"""Small in-process caches shared by the API."""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe TTL cache with single-flight computation.
+
+    Concurrent `get_or_compute` calls for the same missing key share one call to the
+    compute function: the first caller computes, the others wait for its result.
+    `get_or_compute_async` joins the same in-flight computations from coroutines (asgi.py).
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = {}      # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Flight
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+        return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def _join(self, key, loop=None):
+        """(True, value) on a hit, else (False, flight, waiter): waiter is None for the caller that
+        must compute, else what to wait on (the flight's event, or a future on `loop`)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > time.monotonic():
+                return True, entry[1]
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                return False, flight, None
+            if loop is None:
+                return False, flight, flight.done
+            future = loop.create_future()
+            flight.futures.append((loop, future))
+            return False, flight, future
+
+    def _land(self, key, flight):
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.land()
+
+    def get_or_compute(self, key, compute):
+        while True:
+            joined = self._join(key)
+            if joined[0]:
+                return joined[1]
+            _, flight, waiter = joined
+            if waiter is not None:
+                waiter.wait()
+                # the leader either stored a value or failed; loop to read it or take over
+                continue
+            try:
+                value = compute()
+                self.set(key, value)
+                return value
+            finally:
+                self._land(key, flight)
+
+    async def get_or_compute_async(self, key, compute):
+        """get_or_compute for a coroutine function; waiting on another caller holds no thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            joined = self._join(key, loop)
+            if joined[0]:
+                return joined[1]
+            _, flight, waiter = joined
+            if waiter is not None:
+                await waiter
+                continue
+            try:
+                value = await compute()
+                self.set(key, value)
+                return value
+            finally:
+                self._land(key, flight)
+
+
+class _Flight:
+    """One computation in progress: threads wait on `done`, coroutines on their futures."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.futures = []  # (event loop, asyncio.Future)
+
+    def land(self):
+        self.done.set()
+        for loop, future in self.futures:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # loop closed: nobody is waiting any more
+                pass
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and/or total size, with an optional TTL.
+
+    `sizeof(value)` gives an entry's size when `max_bytes` is set. Hit/miss/eviction counters
+    are exposed through `stats()`.
+    """
+
+    def __init__(self, maxsize=None, max_bytes=None, ttl=None, sizeof=len):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._pop(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and ((self.maxsize is not None and len(self._data) > self.maxsize)
+                                  or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self._bytes = 0
+            elif key in self._data:
+                self._pop(key)
+
+    def _pop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._data), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'hitRate': round(self.hits / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,81 @@
+"""Per-process, lazily created MongoDB connection.
+
+PyMongo clients are not fork-safe: a client created in the gunicorn master (e.g. at import
+time) and inherited by the workers shares sockets and monitor threads across processes. The
+`db` object here creates its MongoClient on first use in each process, and again if it finds
+itself in a forked child, so importing or building the app never opens a connection.
+
+A LazyDatabase is used like a pymongo Database (`db.users`, `db['applications']`). Each app built
+by `app.create_app()` owns one; `adb` is the same for PyMongo's asyncio client, used by the ASGI
+mode (asgi.py).
+"""
+import os
+import threading
+
+from pymongo import MongoClient
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # PyMongo < 4.10; only the ASGI mode needs it
+    AsyncMongoClient = None
+
+
+class LazyDatabase:
+    def __init__(self, client_class=MongoClient):
+        self._client_class = client_class
+        self._lock = threading.Lock()
+        self._settings = None
+        self._client = None
+        self._database = None
+        self._pid = None
+
+    def configure(self, uri, name, **client_options):
+        """Set the connection settings; takes effect on the next use (closes any existing client)."""
+        with self._lock:
+            self._settings = (uri, name, client_options)
+            self._close()
+
+    def get_database(self):
+        database, pid = self._database, self._pid
+        if database is not None and pid == os.getpid():
+            return database
+        with self._lock:
+            if self._database is None or self._pid != os.getpid():
+                if self._settings is None:
+                    raise RuntimeError('Database not configured; call configure() first')
+                if self._client_class is None:
+                    raise RuntimeError('PyMongo >= 4.10 is required for the async client')
+                uri, name, client_options = self._settings
+                # a client inherited across fork is abandoned, not closed: closing it would
+                # tear down sockets the parent process still owns
+                self._client = self._client_class(uri, **client_options)
+                self._database = self._client[name]
+                self._pid = os.getpid()
+            return self._database
+
+    @property
+    def client(self):
+        self.get_database()
+        return self._client
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        # the async client is closed with `await adb.client.close()` by its owner
+        if self._client is not None and self._pid == os.getpid() and self._client_class is MongoClient:
+            self._client.close()
+        self._client = self._database = self._pid = None
+
+    def __getattr__(self, name):
+        # only reached for names not defined above: collections and Database attributes
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get_database(), name)
+
+    def __getitem__(self, name):
+        return self.get_database()[name]
+
+
+adb = LazyDatabase(AsyncMongoClient)
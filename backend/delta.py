@@ -0,0 +1,129 @@
+"""Delta sync for the list endpoints: `updatedAt` stamps, `since=` and tombstones.
+
+Every write to internships, applications, users and companies sets `updatedAt` (`stamp` /
+`now`). `GET /api/internships`, `/api/applications` and `/api/users` accept `since=<ISO-8601 or
+epoch milliseconds>` and then return only documents changed at or after it, plus `deleted`: the
+ids removed since, which `delete_application` / `delete_user` record in `tombstones` together
+with the fields the lists filter on, so a company's list only hears about its own deletions.
+A filter on a field writes change (an application's `status`) is handled the same way: a
+document changed since `since` that no longer matches it is listed under `deleted` too.
+
+Every list response carries `syncedAt`; pass it back as the next `since` (when paging, the one
+from the first page). It is taken before the list is read and moved back SYNC_OVERLAP_SECONDS,
+so writes in flight - or stamped by a worker whose clock is a little behind - are not missed. A
+document can therefore come back twice: apply deltas by id.
+
+Tombstones expire after TOMBSTONE_RETENTION_DAYS (TTL index); a `since` older than that is
+answered with 410 Gone and the client re-fetches the full list.
+"""
+import datetime
+import os
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', '30'))
+SYNC_OVERLAP_SECONDS = float(os.getenv('SYNC_OVERLAP_SECONDS', '5'))
+
+# the list filter fields a tombstone keeps, per collection
+TOMBSTONE_KEYS = {
+    'internships': (),
+    'applications': ('company', 'studentEmail', 'internshipId'),
+    'users': ('userType',),
+    'companies': (),
+}
+
+# list filter fields a write can change: documents that stop matching leave the list
+MUTABLE_FILTER_KEYS = {
+    'applications': ('status',),
+}
+
+
+class SinceError(ValueError):
+    """Bad `since` parameter (HTTP 400)."""
+    status = 400
+
+
+class SinceExpired(SinceError):
+    """`since` is older than the tombstones kept (HTTP 410): re-fetch everything."""
+    status = 410
+
+
+def now():
+    # naive UTC, like every other timestamp the API writes; stored as a BSON date
+    return datetime.datetime.utcnow()
+
+
+def stamp(update=None):
+    """`update` ($set fields) plus `updatedAt`."""
+    return {**(update or {}), 'updatedAt': now()}
+
+
+def parse_since(value):
+    """The `since` query parameter as a naive UTC datetime (None when absent)."""
+    if not value:
+        return None
+    try:
+        if value.isdigit():
+            since = datetime.datetime.utcfromtimestamp(int(value) / 1000)
+        else:
+            since = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if since.tzinfo is not None:
+                since = since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        raise SinceError('since must be an ISO-8601 timestamp or epoch milliseconds')
+    if since < now() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise SinceExpired(f'since is older than {TOMBSTONE_RETENTION_DAYS} days; fetch the full list')
+    return since
+
+
+def synced_at():
+    """The `since` to send next time, taken before the list is read."""
+    return now() - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+
+
+def since_filter(query, since):
+    return {**query, 'updatedAt': {'$gte': since}} if since else query
+
+
+def record_deletion(db, collection, doc):
+    """Leave a tombstone for a deleted document (`doc` must include the TOMBSTONE_KEYS fields)."""
+    tombstone = {'collection': collection, 'docId': str(doc['_id']), 'deletedAt': now()}
+    tombstone.update({k: doc[k] for k in TOMBSTONE_KEYS[collection] if k in doc})
+    db.tombstones.insert_one(tombstone)
+
+
+def tombstone_query(collection, since, list_query):
+    """Tombstones of `collection` since `since`, narrowed by the list's equality filters it records."""
+    query = {'collection': collection, 'deletedAt': {'$gte': since}}
+    query.update({k: v for k, v in list_query.items() if k in TOMBSTONE_KEYS.get(collection, ())})
+    return query
+
+
+def deleted_ids(tombstones):
+    return list(dict.fromkeys(t['docId'] for t in tombstones))
+
+
+def with_left_ids(ids, left_docs):
+    """The tombstoned `ids` plus those of the documents that left the list, without repeats."""
+    return list(dict.fromkeys(ids + [str(d['_id']) for d in left_docs]))
+
+
+def left_query(collection, since, list_query):
+    """Documents of `collection` changed since `since` that match the list's filters except a
+    MUTABLE_FILTER_KEYS one; None when the list filters on none of them.
+
+    Some may never have matched; a client applying `deleted` by id just has nothing to drop.
+    """
+    changed = [k for k in MUTABLE_FILTER_KEYS.get(collection, ()) if k in list_query]
+    if not changed:
+        return None
+    query = {k: v for k, v in list_query.items() if k not in changed}
+    query['updatedAt'] = {'$gte': since}
+    query['$or'] = [{k: {'$ne': list_query[k]}} for k in changed]
+    return query
+
+
+def deleted_since(db, collection, since, list_query):
+    ids = deleted_ids(db.tombstones.find(tombstone_query(collection, since, list_query), {'docId': 1}))
+    left = left_query(collection, since, list_query)
+    if left is not None:
+        ids = with_left_ids(ids, db[collection].find(left, {'_id': 1}))
+    return ids
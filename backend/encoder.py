@@ -0,0 +1,93 @@
+"""JSON encoding for API responses.
+
+Documents straight from MongoDB (ObjectId, datetime, Decimal128, ...) are encoded in one pass,
+so handlers no longer walk and copy every document first. orjson is used when installed;
+otherwise the stdlib encoder (C accelerated) with a `default` hook. Set JSON_ENCODER=json to
+force the fallback.
+
+Keys are sorted, as with Flask's default provider (`app.json.sort_keys = False` skips that).
+Unlike Flask's provider, datetimes are written as ISO 8601 rather than HTTP dates: the same
+format as the timestamps stored as strings, and what `since=` accepts back.
+"""
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+if os.getenv('JSON_ENCODER', '').lower() == 'json':
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def default(o):
+    """Encode the non-JSON types that come back from PyMongo."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, (datetime.datetime, datetime.date)):
+        return o.isoformat()
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    if isinstance(o, bytes):
+        return o.decode('utf-8', 'replace')
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+_stdlib_encoders = {sort_keys: json.JSONEncoder(default=default, ensure_ascii=False, separators=(',', ':'),
+                                                 sort_keys=sort_keys)
+                    for sort_keys in (False, True)}
+
+
+def _stdlib_dumps_bytes(obj, sort_keys=False):
+    return _stdlib_encoders[sort_keys].encode(obj).encode('utf-8')
+
+
+if orjson:
+    _ORJSON_OPTIONS = {False: orjson.OPT_NON_STR_KEYS, True: orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS}
+
+    def dumps_bytes(obj, sort_keys=False):
+        # orjson handles datetime natively (RFC 3339, same shape as isoformat())
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS[sort_keys])
+
+    def loads(s):
+        return orjson.loads(s)
+else:
+    dumps_bytes = _stdlib_dumps_bytes
+
+    def loads(s):
+        return json.loads(s)
+
+
+def dumps(obj, sort_keys=False):
+    return dumps_bytes(obj, sort_keys).decode('utf-8')
+
+
+class BSONJSONProvider(JSONProvider):
+    """Flask JSON provider (`app.json`) backed by `dumps_bytes`; used by `jsonify`."""
+
+    #: sort object keys, like Flask's DefaultJSONProvider
+    sort_keys = True
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, kwargs.get('sort_keys', self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys), mimetype='application/json')
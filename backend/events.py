@@ -0,0 +1,355 @@
+"""Server-Sent Events for the dashboards.
+
+`GET /api/events?company=<name or email>` (repeatable), `?studentEmail=<email>` or `?admin=1`
+keeps a `text/event-stream` open and pushes a small delta whenever something that dashboard
+shows changes, instead of it re-fetching on a timer:
+
+  application   {op: created|updated|deleted, id, company, studentEmail, internshipId, status}
+                (`created` also carries the whole `application`)
+  internship    {op: approved|rejected, id, company, companyEmail, status}
+  verification  {op: approved|rejected, id, email, companyName, verificationStatus}
+
+The write endpoints publish to an in-process bus, so a client hears about writes served by the
+worker it is connected to. With several workers, set EVENTS_SOURCE=changestream: each worker then
+tails one MongoDB change stream over applications, internships and companies and publishes what
+it reads (every worker's writes), and the endpoints stop publishing themselves. Change streams
+need a replica set (a single-node one will do); routing deletes to the company and student needs
+MongoDB 6.0+ with pre-images enabled on `applications`, otherwise they only reach admins.
+
+Every subscriber has its own bounded queue (EVENTS_QUEUE_SIZE): publishing never waits on a slow
+client, and one that falls that far behind gets a `reset` event telling it to re-fetch. So does
+a client reconnecting with a Last-Event-ID this worker no longer holds (the last EVENTS_REPLAY
+events are kept for reconnects). A comment is sent every EVENTS_HEARTBEAT seconds so proxies keep
+the connection open and closed connections are noticed.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import encoder
+
+EVENTS_SOURCE = os.getenv('EVENTS_SOURCE', 'local').lower()
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '256'))
+EVENTS_REPLAY = int(os.getenv('EVENTS_REPLAY', '1000'))
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', '15'))
+# how long browsers wait before reconnecting a dropped stream
+EVENTS_RETRY_MS = 3000
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+HEARTBEAT = b': keepalive\n\n'
+OPENING = f'retry: {EVENTS_RETRY_MS}\n\n'.encode()
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    __slots__ = ('seq', 'id', 'kind', 'topics', 'data', '_wire')
+
+    def __init__(self, seq, event_id, kind, topics, data):
+        self.seq = seq
+        self.id = event_id
+        self.kind = kind
+        self.topics = topics
+        self.data = data
+        self._wire = None
+
+    @property
+    def wire(self):
+        """The event in text/event-stream framing; encoded once however many clients receive it."""
+        if self._wire is None:
+            head = f'id: {self.id}\n' if self.id else ''
+            self._wire = f'{head}event: {self.kind}\ndata: '.encode() + encoder.dumps_bytes(self.data) + b'\n\n'
+        return self._wire
+
+
+RESET = Event(0, None, 'reset', frozenset(), {})
+
+
+def subscription_topics(args):
+    """Topics for the /api/events query parameters: company:<name or email>, student:<email>, admin."""
+    topics = {'company:' + c for c in args.getlist('company') + args.getlist('companyEmail') if c}
+    if args.get('studentEmail'):
+        topics.add('student:' + args['studentEmail'])
+    if args.get('admin') in ('1', 'true'):
+        topics.add('admin')
+    return topics
+
+
+class Subscription:
+    def __init__(self, topics, maxsize=EVENTS_QUEUE_SIZE):
+        self.topics = frozenset(topics)
+        self.maxsize = maxsize
+        self._events = deque()
+        self._ready = threading.Condition()
+
+    def push(self, event):
+        with self._ready:
+            if len(self._events) >= self.maxsize:
+                # too far behind: drop the backlog, the client re-fetches instead
+                self._events.clear()
+                self._events.append(RESET)
+            else:
+                self._events.append(event)
+            self._ready.notify()
+        self._wake()
+
+    def _wake(self):
+        pass
+
+    def _pop(self):
+        with self._ready:
+            return self._events.popleft() if self._events else None
+
+    def next(self, timeout):
+        """The next event, or None if there was none for `timeout` seconds."""
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+        return self._pop()
+
+
+class AsyncSubscription(Subscription):
+    """A subscription consumed from an asyncio event loop (the ASGI mode)."""
+
+    def __init__(self, topics, loop, maxsize=EVENTS_QUEUE_SIZE):
+        super().__init__(topics, maxsize)
+        self._loop = loop
+        self._pending = asyncio.Event()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._pending.set)
+        except RuntimeError:  # loop closed: the connection is gone
+            pass
+
+    def interrupt(self):
+        """Wake a pending `next_async` (it returns None), e.g. because the client disconnected."""
+        self._pending.set()
+
+    async def next_async(self, timeout):
+        """Like `next`, awaited on the subscription's event loop."""
+        self._pending.clear()
+        event = self._pop()
+        if event is None:
+            try:
+                await asyncio.wait_for(self._pending.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            event = self._pop()
+        return event
+
+
+class EventBus:
+    def __init__(self, replay=EVENTS_REPLAY, local=EVENTS_SOURCE != 'changestream'):
+        self.local = local  # False when a change stream publishes instead of the endpoints
+        self._lock = threading.Lock()
+        self._subscribers = {}  # topic -> {Subscription}
+        self._recent = deque(maxlen=replay)
+        self._seq = 0
+        self._pid = None
+        self.epoch = None
+
+    def _check_process(self):
+        # event ids only mean something to the process that issued them: a forked worker starts afresh
+        if self._pid != os.getpid():
+            self._pid, self.epoch = os.getpid(), uuid.uuid4().hex[:12]
+            self._subscribers, self._seq = {}, 0
+            self._recent.clear()
+
+    def publish(self, kind, topics, data):
+        with self._lock:
+            self._check_process()
+            self._seq += 1
+            event = Event(self._seq, f'{self.epoch}-{self._seq}', kind, frozenset(topics), data)
+            self._recent.append(event)
+            # pushed under the lock so every subscriber sees events in publish order
+            for subscription in {s for t in event.topics for s in self._subscribers.get(t, ())}:
+                subscription.push(event)
+        return event
+
+    def subscribe(self, subscription, last_event_id=None):
+        """Register `subscription`; events after `last_event_id` are queued first (or a reset if gone)."""
+        with self._lock:
+            self._check_process()
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            if last_event_id:
+                missed = self._since(last_event_id)
+                if missed is None:
+                    subscription.push(RESET)
+                else:
+                    for event in missed:
+                        if event.topics & subscription.topics:
+                            subscription.push(event)
+        return subscription
+
+    def _since(self, last_event_id):
+        epoch, _, seq = last_event_id.rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if self._recent and seq < self._recent[0].seq - 1:
+            return None
+        return [e for e in self._recent if e.seq > seq]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+
+bus = EventBus()
+
+
+def stream(subscription, event_bus=None, heartbeat=EVENTS_HEARTBEAT):
+    """text/event-stream body for a subscribed `subscription`; unsubscribes when the client goes."""
+    event_bus = event_bus or bus
+    try:
+        yield OPENING
+        while True:
+            event = subscription.next(heartbeat)
+            yield HEARTBEAT if event is None else event.wire
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+# --- what the write endpoints publish ---------------------------------------------------------
+
+APPLICATION_FIELDS = ('company', 'studentEmail', 'internshipId', 'status')
+INTERNSHIP_OPS = {'Active': 'approved', 'Rejected': 'rejected'}
+VERIFICATION_OPS = {'Verified': 'approved', 'Rejected': 'rejected'}
+
+
+def _company_topics(*keys):
+    return {'company:' + str(k) for k in keys if k}
+
+
+def application_event(op, doc):
+    """(topics, data) for an application created/updated/deleted; `doc` is the (post-)image."""
+    data = {'op': op, 'id': str(doc.get('_id') or doc.get('id') or ''),
+            **{k: doc[k] for k in APPLICATION_FIELDS if k in doc}}
+    if op == 'created':
+        data['application'] = {**{k: v for k, v in doc.items() if k != '_id'}, 'id': data['id']}
+    topics = _company_topics(doc.get('company')) | {'admin'}
+    if doc.get('studentEmail'):
+        topics.add('student:' + doc['studentEmail'])
+    return topics, data
+
+
+def internship_event(doc):
+    op = INTERNSHIP_OPS.get(doc.get('status'))
+    if op is None:
+        return None, None
+    data = {'op': op, 'id': str(doc['_id']), 'company': doc.get('company'),
+            'companyEmail': doc.get('companyEmail'), 'status': doc['status']}
+    return _company_topics(doc.get('company'), doc.get('companyEmail')) | {'admin'}, data
+
+
+def verification_event(doc):
+    op = VERIFICATION_OPS.get(doc.get('verificationStatus'))
+    if op is None:
+        return None, None
+    name = doc.get('companyName') or doc.get('company')
+    data = {'op': op, 'id': str(doc['_id']), 'email': doc.get('email'), 'companyName': name,
+            'verificationStatus': doc['verificationStatus']}
+    return _company_topics(doc.get('email'), name) | {'admin'}, data
+
+
+def _publish(kind, topics, data, event_bus=None, source=False):
+    event_bus = event_bus or bus
+    if topics and (source or event_bus.local):
+        event_bus.publish(kind, topics, data)
+
+
+def application_changed(op, doc):
+    _publish('application', *application_event(op, doc))
+
+
+def internship_status_changed(doc):
+    _publish('internship', *internship_event(doc))
+
+
+def verification_changed(doc):
+    _publish('verification', *verification_event(doc))
+
+
+# --- multi-worker source ----------------------------------------------------------------------
+
+WATCHED_COLLECTIONS = ['applications', 'internships', 'companies']
+CHANGE_STREAM_PIPELINE = [{'$match': {'ns.coll': {'$in': WATCHED_COLLECTIONS},
+                                      'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+
+
+# fullDocumentBeforeChange (pre-images) needs MongoDB 6.0; older servers reject the option
+PRE_IMAGES_WIRE_VERSION = 17
+
+
+class ChangeStreamSource:
+    """Publishes every worker's writes to this worker's bus from a MongoDB change stream."""
+
+    def __init__(self, db, event_bus=None, retry_seconds=5.0):
+        self.db = db
+        self.bus = event_bus or bus
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start tailing in this process (idempotent; called when the first client subscribes)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='events-change-stream', daemon=True)
+            self._thread.start()
+
+    def watch_options(self):
+        """Options for `watch`; pre-images only where the server supports them (else deletes reach admins only)."""
+        options = {'full_document': 'updateLookup'}
+        if self.db.client.admin.command('hello').get('maxWireVersion', 0) >= PRE_IMAGES_WIRE_VERSION:
+            options['full_document_before_change'] = 'whenAvailable'
+        return options
+
+    def _run(self):
+        resume_token = None
+        while True:
+            try:
+                with self.db.watch(CHANGE_STREAM_PIPELINE, resume_after=resume_token, **self.watch_options()) as changes:
+                    for change in changes:
+                        resume_token = changes.resume_token
+                        try:
+                            self.publish(change)
+                        except Exception as e:
+                            logger.warning('Could not publish change %s: %s', change.get('_id'), e)
+            except Exception as e:
+                logger.warning('Change stream interrupted (%s); resuming in %.0fs', e, self.retry_seconds)
+                time.sleep(self.retry_seconds)
+
+    def publish(self, change):
+        coll, op = change['ns']['coll'], change['operationType']
+        doc = change.get('fullDocument')
+        updated = (change.get('updateDescription') or {}).get('updatedFields') or {}
+        if coll == 'applications':
+            if op == 'delete':
+                doc = change.get('fullDocumentBeforeChange') or change['documentKey']
+                _publish('application', *application_event('deleted', doc), event_bus=self.bus, source=True)
+            elif doc is not None:
+                kind = 'created' if op == 'insert' else 'updated'
+                _publish('application', *application_event(kind, doc), event_bus=self.bus, source=True)
+        elif coll == 'internships' and doc is not None and (op == 'replace' or 'status' in updated):
+            _publish('internship', *internship_event(doc), event_bus=self.bus, source=True)
+        elif coll == 'companies' and doc is not None and (op == 'replace' or 'verificationStatus' in updated):
+            _publish('verification', *verification_event(doc), event_bus=self.bus, source=True)
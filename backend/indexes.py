@@ -0,0 +1,229 @@
+"""Declarative index registry.
+
+Every index the API relies on is declared in `INDEXES`, next to the query shape it serves.
+`ensure_indexes` builds them idempotently, `index_drift` compares the declaration with what
+the server has, and `check_query_plans` runs `explain()` for each endpoint's query and reports
+any whose winning plan is a collection scan.
+
+    python indexes.py            # build missing indexes and print drift
+    python indexes.py --check    # only report drift, exit 1 if any
+    python indexes.py --explain  # build, then exit 1 if any endpoint query plans a COLLSCAN
+"""
+import datetime
+import sys
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from delta import TOMBSTONE_RETENTION_DAYS
+
+from resume_text import RESUME_TEXT_FIELDS, RESUME_TEXT_INDEX_NAME
+from search import INTERNSHIP_TEXT_FIELDS, INTERNSHIP_TEXT_INDEX_NAME, INTERNSHIP_TEXT_WEIGHTS
+
+
+def _index(keys, **options):
+    # use the server's default naming so pre-existing indexes are recognised
+    options.setdefault('name', '_'.join(f'{field}_{direction}' for field, direction in keys))
+    return IndexModel(keys, **options)
+
+
+INDEXES = {
+    'users': [
+        # login, signup uniqueness, enrichment ($in on email)
+        _index([('email', ASCENDING)], unique=True),
+        # admin analytics: active students / top universities
+        _index([('userType', ASCENDING)]),
+        _index([('university', ASCENDING)]),
+        # list_users?since=
+        _index([('updatedAt', ASCENDING)]),
+    ],
+    'companies': [
+        _index([('email', ASCENDING)], unique=True),
+        # admin_list_verifications
+        _index([('verificationStatus', ASCENDING)]),
+    ],
+    'internships': [
+        # list_internships / company_overview: {$or: [{company}, {companyEmail}]}, paginated by _id
+        _index([('company', ASCENDING), ('_id', ASCENDING)]),
+        _index([('companyEmail', ASCENDING), ('_id', ASCENDING)]),
+        # pending approvals, status-sorted listings
+        _index([('status', ASCENDING), ('_id', ASCENDING)]),
+        _index([('posted', DESCENDING), ('_id', DESCENDING)]),
+        # list_internships?q=
+        IndexModel(INTERNSHIP_TEXT_FIELDS, name=INTERNSHIP_TEXT_INDEX_NAME,
+                   weights=INTERNSHIP_TEXT_WEIGHTS, default_language='english'),
+        # list_internships?since=
+        _index([('updatedAt', ASCENDING)]),
+    ],
+    'applications': [
+        # list_applications filters, paginated by _id; company+status also serves the overview rebuild
+        _index([('company', ASCENDING), ('_id', ASCENDING)]),
+        _index([('company', ASCENDING), ('status', ASCENDING)]),
+        # (studentEmail also serves search_company_applicants' $lookup of a resume's applications)
+        _index([('studentEmail', ASCENDING), ('_id', ASCENDING)]),
+        _index([('internshipId', ASCENDING), ('_id', ASCENDING)]),
+        # admin status breakdown
+        _index([('status', ASCENDING)]),
+        # list_applications?since=, alone or with the dashboards' company / student filter
+        _index([('updatedAt', ASCENDING)]),
+        _index([('company', ASCENDING), ('updatedAt', ASCENDING)]),
+        _index([('studentEmail', ASCENDING), ('updatedAt', ASCENDING)]),
+    ],
+    'resumes': [
+        # get_resume_by_email / upload upsert / delete_resume
+        _index([('email', ASCENDING)]),
+    ],
+    'resume_text': [
+        # search_company_applicants: $text, then each match's applications ($lookup on studentEmail)
+        IndexModel(RESUME_TEXT_FIELDS, name=RESUME_TEXT_INDEX_NAME, weights={'text': 1}, default_language='english'),
+        # index_resume: reuse the text of a file another student uploaded
+        _index([('sha256', ASCENDING), ('status', ASCENDING)]),
+    ],
+    'application_rollups': [
+        # application_trend / applications_this_month: one company (None = platform), a range of days
+        _index([('company', ASCENDING), ('day', ASCENDING)], unique=True),
+    ],
+    'tombstones': [
+        # deleted ids for ?since=; expired by the TTL index once a since that old is refused anyway
+        _index([('collection', ASCENDING), ('deletedAt', ASCENDING)]),
+        _index([('deletedAt', ASCENDING)], expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400),
+    ],
+}
+
+PROBE_SINCE = datetime.datetime(2024, 1, 1)
+
+# (endpoint, collection, filter, sort) for each hot query; used by check_query_plans
+QUERY_SHAPES = [
+    ('login', 'users', {'email': 'probe@example.com'}, None),
+    ('enrich_applications', 'users', {'email': {'$in': ['a@example.com', 'b@example.com']}}, None),
+    ('admin_analytics', 'users', {'userType': {'$in': [None, 'student', '']}}, None),
+    ('get_company_by_email', 'companies', {'email': 'probe@example.com'}, None),
+    ('admin_list_verifications', 'companies', {'verificationStatus': 'Pending'}, None),
+    ('list_internships', 'internships', {'$or': [{'company': 'probe'}, {'companyEmail': 'probe'}]}, [('_id', ASCENDING)]),
+    ('list_internships?q', 'internships', {'$text': {'$search': 'probe'}}, None),
+    ('admin_analytics', 'internships', {'status': 'Pending Approval'}, None),
+    ('list_applications?company', 'applications', {'company': 'probe'}, [('_id', ASCENDING)]),
+    ('list_applications?studentEmail', 'applications', {'studentEmail': 'probe@example.com'}, [('_id', ASCENDING)]),
+    ('list_applications?internshipId', 'applications', {'internshipId': 'probe'}, [('_id', ASCENDING)]),
+    ('company_overview', 'applications', {'company': 'probe', 'status': 'Selected'}, None),
+    ('admin_analytics', 'applications', {'status': 'Selected'}, None),
+    ('get_resume_by_email', 'resumes', {'email': 'probe@example.com'}, None),
+    ('search_company_applicants', 'resume_text', {'$text': {'$search': 'probe'}}, None),
+    ('index_resume', 'resume_text', {'sha256': 'probe', 'status': 'indexed'}, None),
+    ('list_internships?since', 'internships', {'updatedAt': {'$gte': PROBE_SINCE}}, [('_id', ASCENDING)]),
+    ('list_applications?company&since', 'applications', {'company': 'probe', 'updatedAt': {'$gte': PROBE_SINCE}},
+     [('_id', ASCENDING)]),
+    ('list_applications?studentEmail&since', 'applications',
+     {'studentEmail': 'probe@example.com', 'updatedAt': {'$gte': PROBE_SINCE}}, [('_id', ASCENDING)]),
+    ('list_applications?company&status&since left', 'applications',
+     {'company': 'probe', 'updatedAt': {'$gte': PROBE_SINCE}, '$or': [{'status': {'$ne': 'Selected'}}]}, None),
+    ('list_users?since', 'users', {'updatedAt': {'$gte': PROBE_SINCE}}, [('_id', ASCENDING)]),
+    ('application_trend', 'application_rollups', {'company': 'probe', 'day': {'$gte': '2024-01-01'}}, None),
+    ('list_applications?since deleted', 'tombstones',
+     {'collection': 'applications', 'deletedAt': {'$gte': PROBE_SINCE}}, None),
+]
+
+
+def ensure_indexes(db):
+    """Create every declared index (a no-op for those that already exist).
+
+    Each index is created on its own, so one that cannot be built (e.g. a unique index over
+    duplicate values) does not stop the others. Returns ({collection: [names]}, [(collection,
+    index_name, error)]).
+    """
+    created, errors = {}, []
+    for coll_name, models in INDEXES.items():
+        for model in models:
+            try:
+                created.setdefault(coll_name, []).extend(db[coll_name].create_indexes([model]))
+            except Exception as e:
+                errors.append((coll_name, model.document['name'], str(e)))
+    return created, errors
+
+
+def _normalise_key(key):
+    return [(field, direction) for field, direction in (key.items() if isinstance(key, dict) else key)]
+
+
+def index_drift(db):
+    """Compare declared and existing indexes.
+
+    Returns a list of (collection, index_name, problem) where problem is 'missing', 'undeclared'
+    or 'different definition'.
+    """
+    drift = []
+    for coll_name, models in INDEXES.items():
+        existing = db[coll_name].index_information()
+        declared = {m.document['name']: m.document for m in models}
+        for name, spec in declared.items():
+            info = existing.get(name)
+            if info is None:
+                drift.append((coll_name, name, 'missing'))
+                continue
+            if 'weights' in spec:
+                # text indexes are stored as _fts/_ftsx; compare the weights instead of the key
+                same = dict(info.get('weights') or {}) == dict(spec['weights'])
+            else:
+                same = _normalise_key(info['key']) == _normalise_key(spec['key'])
+            if (not same or bool(info.get('unique')) != bool(spec.get('unique'))
+                    or info.get('expireAfterSeconds') != spec.get('expireAfterSeconds')):
+                drift.append((coll_name, name, 'different definition'))
+        for name in existing:
+            if name != '_id_' and name not in declared:
+                drift.append((coll_name, name, 'undeclared'))
+    return drift
+
+
+def plan_stages(plan):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+def check_query_plans(db):
+    """Explain each query in QUERY_SHAPES; returns [(endpoint, collection, filter, stages)] for COLLSCAN plans."""
+    failures = []
+    for endpoint, coll_name, query, sort in QUERY_SHAPES:
+        cursor = db[coll_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        stages = list(plan_stages(winning))
+        if 'COLLSCAN' in stages:
+            failures.append((endpoint, coll_name, query, stages))
+    return failures
+
+
+def main(argv):
+    # building the app configures the connection from the environment, as bootstrap.py does
+    from app import create_app, resources
+    db = resources(create_app()).db
+    if '--check' not in argv:
+        created, errors = ensure_indexes(db)
+        for coll_name, names in created.items():
+            print(f'{coll_name}: {", ".join(names)}')
+        for coll_name, name, error in errors:
+            print(f'FAILED {coll_name}.{name}: {error}')
+        if errors:
+            return 1
+    drift = index_drift(db)
+    for coll_name, name, problem in drift:
+        print(f'DRIFT {coll_name}.{name}: {problem}')
+    if '--check' in argv:
+        return 1 if any(problem != 'undeclared' for _, _, problem in drift) else 0
+    if '--explain' in argv:
+        failures = check_query_plans(db)
+        for endpoint, coll_name, query, stages in failures:
+            print(f'COLLSCAN {endpoint} on {coll_name}: {query} -> {" > ".join(stages)}')
+        if failures:
+            return 1
+        print(f'OK: {len(QUERY_SHAPES)} endpoint queries use an index')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,222 @@
+"""Per-endpoint request and MongoDB command metrics in Prometheus text format.
+
+A `pymongo.monitoring.CommandListener` (registered on the MongoClient) attributes every command
+to the Flask request running on the same thread, so each endpoint gets its request latency
+histogram, the number and total duration of Mongo commands it issued, documents returned and
+response bytes. A request issuing more than MAX_QUERIES_PER_REQUEST commands is logged and
+counted in `internlink_query_budget_exceeded_total` - an N+1 loop shows up there.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+
+from flask import request
+from pymongo import monitoring
+
+MAX_QUERIES_PER_REQUEST = int(os.getenv('MAX_QUERIES_PER_REQUEST', '10'))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+_current = threading.local()
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'method', 'started', 'commands', 'command_seconds', 'documents', 'response_bytes')
+
+    def __init__(self, endpoint, method):
+        self.endpoint = endpoint
+        self.method = method
+        self.started = time.perf_counter()
+        self.commands = 0
+        self.command_seconds = 0.0
+        self.documents = 0
+        self.response_bytes = 0
+
+
+def _documents_in_reply(reply):
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or ())
+    if 'value' in reply:  # findAndModify
+        return int(reply['value'] is not None)
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Adds each command's duration and returned documents to the current request."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            stats.commands += 1
+            stats.command_seconds += event.duration_micros / 1e6
+            stats.documents += _documents_in_reply(event.reply)
+
+    def failed(self, event):
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            stats.commands += 1
+            stats.command_seconds += event.duration_micros / 1e6
+
+
+class Registry:
+    """Aggregated series, keyed by (endpoint, method)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, max_queries=MAX_QUERIES_PER_REQUEST):
+        self.buckets = buckets
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        self._series = {}
+        self._statuses = {}
+        self._startup = {}
+        self._caches = {}
+
+    def observe(self, stats, status, elapsed):
+        key = (stats.endpoint, stats.method)
+        over_budget = stats.commands > self.max_queries
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0, 'commands': 0,
+                                         'command_seconds': 0.0, 'documents': 0, 'bytes': 0, 'over_budget': 0}
+            i = bisect.bisect_left(self.buckets, elapsed)
+            if i < len(self.buckets):
+                s['buckets'][i] += 1
+            s['count'] += 1
+            s['sum'] += elapsed
+            s['commands'] += stats.commands
+            s['command_seconds'] += stats.command_seconds
+            s['documents'] += stats.documents
+            s['bytes'] += stats.response_bytes
+            s['over_budget'] += int(over_budget)
+            self._statuses[key + (status,)] = self._statuses.get(key + (status,), 0) + 1
+        if over_budget:
+            logger.warning('%s %s issued %d Mongo commands (budget %d)', stats.method, stats.endpoint,
+                           stats.commands, self.max_queries)
+
+    def set_startup(self, phase, seconds):
+        """Record how long a startup phase of this worker took (see app.create_app)."""
+        with self._lock:
+            self._startup[phase] = seconds
+        logger.info('startup %s: %.1f ms (pid %d)', phase, seconds * 1000, os.getpid())
+
+    def register_cache(self, name, stats):
+        """Export an in-process cache; `stats()` returns entries/hits/misses/evictions (cache.LRUCache)."""
+        self._caches[name] = stats
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            series = {k: dict(v, buckets=list(v['buckets'])) for k, v in self._series.items()}
+            statuses = dict(self._statuses)
+            startup = dict(self._startup)
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        family('internlink_http_requests_total', 'counter', 'Requests by endpoint, method and status.')
+        for (endpoint, method, status), n in sorted(statuses.items()):
+            lines.append(f'internlink_http_requests_total{{{_labels(endpoint, method)},status="{status}"}} {n}')
+        family('internlink_http_request_duration_seconds', 'histogram', 'Request latency, including streaming.')
+        for (endpoint, method), s in sorted(series.items()):
+            labels = _labels(endpoint, method)
+            cumulative = 0
+            for bound, n in zip(self.buckets, s['buckets']):
+                cumulative += n
+                lines.append(f'internlink_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'internlink_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s["count"]}')
+            lines.append(f'internlink_http_request_duration_seconds_sum{{{labels}}} {s["sum"]:.6f}')
+            lines.append(f'internlink_http_request_duration_seconds_count{{{labels}}} {s["count"]}')
+        for name, field, help_text in (
+                ('internlink_mongo_commands_total', 'commands', 'Mongo commands issued while serving the endpoint.'),
+                ('internlink_mongo_command_seconds_total', 'command_seconds', 'Time spent in those Mongo commands.'),
+                ('internlink_mongo_documents_returned_total', 'documents', 'Documents returned by cursors and findAndModify.'),
+                ('internlink_http_response_bytes_total', 'bytes', 'Response body bytes sent.'),
+                ('internlink_query_budget_exceeded_total', 'over_budget',
+                 f'Requests that issued more than {self.max_queries} Mongo commands.')):
+            family(name, 'counter', help_text)
+            for (endpoint, method), s in sorted(series.items()):
+                value = f'{s[field]:.6f}' if isinstance(s[field], float) else s[field]
+                lines.append(f'{name}{{{_labels(endpoint, method)}}} {value}')
+        family('internlink_worker_startup_seconds', 'gauge', 'Cold start of this worker process, by phase.')
+        for phase, seconds in sorted(startup.items()):
+            lines.append(f'internlink_worker_startup_seconds{{phase="{phase}"}} {seconds:.6f}')
+        caches = {name: stats() for name, stats in sorted(self._caches.items())}
+        for name, field, kind, help_text in (
+                ('internlink_cache_hits_total', 'hits', 'counter', 'In-process cache hits.'),
+                ('internlink_cache_misses_total', 'misses', 'counter', 'In-process cache misses.'),
+                ('internlink_cache_evictions_total', 'evictions', 'counter', 'Entries evicted to stay within size.'),
+                ('internlink_cache_entries', 'entries', 'gauge', 'Entries currently cached.')):
+            family(name, kind, help_text)
+            for cache, values in caches.items():
+                lines.append(f'{name}{{cache="{cache}"}} {values[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(endpoint, method):
+    endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+    return f'endpoint="{endpoint}",method="{method}"'
+
+
+def current_endpoint():
+    """Endpoint of the request being served on this thread (None outside requests)."""
+    stats = getattr(_current, 'stats', None)
+    return stats.endpoint if stats is not None else None
+
+
+listener = CommandMetrics()
+registry = Registry()
+
+
+class _CountingBody:
+    """Wraps a streamed response body to count the bytes actually sent."""
+
+    def __init__(self, body, stats):
+        self._body = body
+        self._stats = stats
+
+    def __iter__(self):
+        for chunk in self._body:
+            self._stats.response_bytes += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            yield chunk
+
+    def close(self):
+        # the server closes the response when the client goes; pass that on (e.g. an SSE stream unsubscribes)
+        close = getattr(self._body, 'close', None)
+        if close is not None:
+            close()
+
+
+def init_app(app):
+    """Track every request of `app`; the listener must also be passed to the MongoClient."""
+
+    @app.before_request
+    def _start_request_metrics():
+        _current.stats = RequestStats(request.endpoint or 'unmatched', request.method)
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        stats = getattr(_current, 'stats', None)
+        if stats is None:
+            return response
+        status = response.status_code
+        if response.is_streamed:
+            # streamed bodies (e.g. the export) run their queries after this hook; finish on close
+            response.response = _CountingBody(response.response, stats)
+        else:
+            stats.response_bytes = response.calculate_content_length() or 0
+
+        def finish():
+            if getattr(_current, 'stats', None) is stats:
+                _current.stats = None
+            registry.observe(stats, status, time.perf_counter() - stats.started)
+
+        response.call_on_close(finish)
+        return response
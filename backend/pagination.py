@@ -0,0 +1,129 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints.
+
+A page is requested with `limit`, continued with the opaque `after` cursor returned in
+`nextCursor` / `X-Next-Cursor`, and ordered with `sort=<field>` or `sort=-<field>`.
+Ties on the sort field are broken by `_id`, so every page is a single index range scan
+instead of a growing `skip()`.
+"""
+import base64
+
+from bson import json_util
+from pymongo import ASCENDING, DESCENDING
+
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised for malformed `limit`, `after` or `sort` parameters (mapped to HTTP 400)."""
+
+
+def encode_cursor(value, last_id):
+    raw = json_util.dumps({'v': value, 'id': last_id})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return data.get('v'), data['id']
+    except Exception:
+        raise PaginationError('Invalid cursor')
+
+
+def parse_sort(sort, allowed, default='_id'):
+    """Turn `field` / `-field` into (field, direction); only whitelisted fields are accepted."""
+    sort = (sort or default).strip()
+    direction = DESCENDING if sort.startswith('-') else ASCENDING
+    field = sort.lstrip('-+')
+    if field != '_id' and field not in allowed:
+        raise PaginationError(f'Unsupported sort field: {field}')
+    return field, direction
+
+
+def parse_limit(limit):
+    if limit in (None, ''):
+        return None
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError('Invalid limit')
+    if limit <= 0:
+        raise PaginationError('Invalid limit')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_filter(field, direction, value, last_id):
+    """Filter selecting documents strictly after (value, last_id) in (field, _id) order.
+
+    Missing/null sort values sort first ascending and last descending, matching MongoDB's sort order.
+    """
+    op = '$gt' if direction == ASCENDING else '$lt'
+    if field == '_id':
+        return {'_id': {op: last_id}}
+    tie = {field: value, '_id': {op: last_id}}
+    if value is None:
+        if direction == ASCENDING:
+            return {'$or': [tie, {field: {'$ne': None}}]}
+        return tie
+    clauses = [{field: {op: value}}, tie]
+    if direction == DESCENDING:
+        clauses.append({field: None})
+    return {'$or': clauses}
+
+
+def wants_count(args):
+    return str(args.get('withCount', '')).lower() in ('1', 'true', 'yes')
+
+
+def page_plan(query, args, allowed_sorts):
+    """Parse `limit`, `after` and `sort` from `args` into the query `paginate` runs.
+
+    Returns (query, sort_spec, limit, sort_field); shared with the async app, which issues the
+    same queries through its own driver.
+    """
+    field, direction = parse_sort(args.get('sort'), allowed_sorts)
+    limit = parse_limit(args.get('limit'))
+    after = args.get('after')
+
+    if after:
+        if limit is None:
+            raise PaginationError('after requires limit')
+        value, last_id = decode_cursor(after)
+        page_filter = keyset_filter(field, direction, value, last_id)
+        query = {'$and': [query, page_filter]} if query else page_filter
+
+    sort_spec = [(field, direction)] if field == '_id' else [(field, direction), ('_id', direction)]
+    return query, sort_spec, limit, field
+
+
+def page_result(docs, limit, field, headers):
+    """Trim the extra row fetched by `paginate` and work out the next cursor. Returns (docs, next_cursor)."""
+    if limit is None or len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    last = docs[-1]
+    next_cursor = encode_cursor(last.get(field) if field != '_id' else None, last['_id'])
+    headers['X-Next-Cursor'] = next_cursor
+    return docs, next_cursor
+
+
+def paginate(collection, query, args, allowed_sorts, projection=None):
+    """Run `query` against `collection` honouring `limit`, `after`, `sort` and `withCount` from `args`.
+
+    Returns (docs, headers, next_cursor). Without `limit` the whole (optionally sorted) result is
+    returned so existing clients keep working.
+    """
+    headers = {}
+    if wants_count(args):
+        total = collection.count_documents(query) if query else collection.estimated_document_count()
+        headers['X-Total-Count'] = str(total)
+
+    query, sort_spec, limit, field = page_plan(query, args, allowed_sorts)
+    cursor = collection.find(query, projection).sort(sort_spec)
+    if limit is None:
+        return list(cursor), headers, None
+
+    # fetch one extra row to learn whether another page exists
+    docs, next_cursor = page_result(list(cursor.limit(limit + 1)), limit, field, headers)
+    return docs, headers, next_cursor
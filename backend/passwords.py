@@ -0,0 +1,100 @@
+"""Password hashing off the request thread.
+
+PBKDF2/scrypt hashing is deliberately slow CPU work; done inline it holds the GIL and stalls
+every other request the worker is serving. Hashes are computed on a small process pool instead,
+while the request thread just waits on the result. The method and cost come from config, and
+`needs_rehash` tells `login` when a stored hash was made with older parameters.
+
+  PASSWORD_HASH_METHOD   werkzeug method string, e.g. `scrypt:32768:8:1` or `pbkdf2:sha256:600000`
+  PASSWORD_HASH_WORKERS  pool size; 0 hashes inline in the calling thread
+  PASSWORD_HASH_MAX_PENDING  hashes queued or running at once before callers wait
+  PASSWORD_HASH_TIMEOUT  seconds a caller waits for a slot before PasswordHashBusy
+"""
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(max(1, PASSWORD_HASH_WORKERS) * 8)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+
+class PasswordHashBusy(RuntimeError):
+    """Too many hashes already queued; the caller should answer 503."""
+
+
+@functools.lru_cache(maxsize=None)
+def method_prefix(method):
+    """The `method` part werkzeug writes into a hash, with its default costs filled in."""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def _pool_context():
+    # forkserver children start from a clean process, so they neither inherit the Flask
+    # worker's threads and locks nor re-import the app module; spawn is the portable fallback
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+class PasswordHasher:
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, timeout=PASSWORD_HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+            return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHashBusy('Too many password hashes pending')
+        try:
+            try:
+                return self._executor().submit(fn, *args).result()
+            except BrokenProcessPool:
+                # a worker died (e.g. OOM-killed); start a fresh pool once
+                self.shutdown()
+                return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        if not stored_hash or password is None:
+            return False
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != method_prefix(self.method)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+hasher = PasswordHasher()
+hash_password = hasher.hash
+verify_password = hasher.verify
+needs_rehash = hasher.needs_rehash
@@ -0,0 +1,81 @@
+"""Student profiles copied onto applications (name, phone, university, ...).
+
+Profiles are cached per process in an LRU keyed by email and read with a projection that only
+covers the copied fields, so listing applications does not pull whole user documents (password
+hashes included) and repeat students cost no read. Emails with no user are cached too, as
+"no profile". `add_user`, `update_user_by_email`, `delete_user`, `suspend_user` and
+`activate_user` invalidate the email in the worker that served the write; other workers see the
+change once their entry expires (STUDENT_PROFILE_TTL).
+"""
+import os
+
+from cache import LRUCache
+
+STUDENT_PROFILE_CACHE_SIZE = int(os.getenv('STUDENT_PROFILE_CACHE_SIZE', '20000'))
+STUDENT_PROFILE_TTL = float(os.getenv('STUDENT_PROFILE_TTL', '60'))
+
+# user fields copied onto applications; never pull the password hash just to enrich a row
+PROFILE_PROJECTION = {'_id': 0, 'email': 1, 'fullName': 1, 'name': 1, 'phone': 1, 'university': 1, 'course': 1,
+                      'yearOfStudy': 1, 'year': 1}
+
+_NO_PROFILE = False  # cached for emails without a user document
+
+
+def users_by_email_query(emails):
+    emails = list({e for e in emails if e})
+    return {'email': {'$in': emails}} if emails else None
+
+
+class StudentProfiles:
+    def __init__(self, db, maxsize=STUDENT_PROFILE_CACHE_SIZE, ttl=STUDENT_PROFILE_TTL):
+        self.db = db
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.invalidations = 0
+
+    def get(self, email):
+        """Profile for one email, or None if there is no such user."""
+        return self.get_many([email]).get(email)
+
+    def get_many(self, emails):
+        """{email: profile} for the emails that have a user; the misses are read with one query."""
+        found, missing = self.cached(emails)
+        if missing:
+            version = self.invalidations
+            rows = self.db.users.find(users_by_email_query(missing), PROFILE_PROJECTION)
+            found.update(self.store(missing, rows, version))
+        return found
+
+    def cached(self, emails):
+        """({email: profile} served from the cache, [emails still to read])."""
+        found, missing = {}, []
+        for email in dict.fromkeys(e for e in emails if e):
+            profile = self.cache.get(email)
+            if profile is None:
+                missing.append(email)
+            elif profile is not _NO_PROFILE:
+                found[email] = dict(profile)
+        return found, missing
+
+    def store(self, emails, rows, version):
+        """Cache the user `rows` read for `emails` when `invalidations` was `version`;
+        returns {email: profile}."""
+        out = {u['email']: u for u in rows if u.get('email')}
+        # an invalidation since the read may be for one of these emails: serve them, don't keep them
+        if version == self.invalidations:
+            for email in emails:
+                self.cache.set(email, dict(out[email]) if email in out else _NO_PROFILE)
+        return out
+
+    def invalidate(self, *emails):
+        self.invalidations += 1
+        for email in emails:
+            if email:
+                self.cache.invalidate(email)
+
+    def clear(self):
+        """Drop every profile: users changed through another worker, emails unknown."""
+        self.invalidations += 1
+        self.cache.invalidate()
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,279 @@
+"""Internship recommendations for students.
+
+Every internship is a row of a sparse 0/1 matrix over a vocabulary of terms: its tags/skills
+(`t:python`) and the parts of its location (`l:bangalore`). The matrix is kept column-wise,
+one array of row numbers per term, so scoring a student touches only the columns of the terms in
+their profile (skills, course, university, location; see PROFILE_WEIGHTS). A row's score is the
+sum of its matched term weights over sqrt(terms in the row), so postings tagged with everything
+do not win by default. Inactive and retired rows are masked out and the best k are picked with
+argpartition.
+
+The index is built from the internships collection on first use and then kept current by the
+write endpoints: a new or edited internship appends a row (its old row is retired), approve /
+reject only flip the active flag. Retired rows are compacted away in memory once they outnumber
+live ones. Writes served by other workers are picked up by a full rebuild every
+RECOMMENDATIONS_REBUILD_INTERVAL seconds, done in the background while the old index serves.
+
+NumPy is used when installed; otherwise the same index is scored in pure Python (slower, same
+results).
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+if os.getenv('RECOMMENDATIONS_BACKEND', '').lower() == 'python':
+    np = None
+
+import stats
+
+RECOMMENDATIONS_REBUILD_INTERVAL = float(os.getenv('RECOMMENDATIONS_REBUILD_INTERVAL', '300'))
+DEFAULT_RECOMMENDATIONS = 20
+
+# how much a profile term counts when it matches an internship term
+PROFILE_WEIGHTS = {'skills': 1.0, 'location': 0.75, 'course': 0.5, 'university': 0.25}
+INDEX_PROJECTION = {'tags': 1, 'skills': 1, 'location': 1, 'status': 1}
+PROFILE_PROJECTION = {'_id': 0, 'email': 1, 'skills': 1, 'course': 1, 'university': 1, 'location': 1, 'city': 1}
+
+
+def _normalize(term):
+    return ' '.join(str(term).lower().split())
+
+
+def _split(value):
+    """Terms of a list field, or of a comma-separated string (how the dashboard posts skills)."""
+    if not value:
+        return []
+    parts = value if isinstance(value, (list, tuple)) else str(value).split(',')
+    return [t for t in (_normalize(p) for p in parts) if t]
+
+
+def internship_terms(doc):
+    terms = {'t:' + t for t in _split(doc.get('tags')) + _split(doc.get('skills'))}
+    terms.update('l:' + t for t in _split(doc.get('location')))
+    return terms
+
+
+def profile_weights(user):
+    """{term: weight} for a student profile."""
+    weights = {}
+
+    def add(term, weight):
+        weights[term] = max(weights.get(term, 0.0), weight)
+
+    for t in _split(user.get('skills')):
+        add('t:' + t, PROFILE_WEIGHTS['skills'])
+    for field in ('course', 'university'):
+        # the whole phrase and its words, e.g. "mechanical engineering" and "mechanical"
+        phrase = _normalize(user.get(field) or '')
+        for t in ([phrase] + phrase.split()) if phrase else []:
+            add('t:' + t, PROFILE_WEIGHTS[field])
+    for t in _split(user.get('location') or user.get('city')):
+        add('l:' + t, PROFILE_WEIGHTS['location'])
+    return weights
+
+
+def is_active(status):
+    return stats.internship_status_bucket(status) == 'activeInternships'
+
+
+class TagIndex:
+    """The sparse internship x term matrix, stored as one row-number array per term."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vocabulary = {}  # term -> column
+        self._terms = []  # column -> term
+        self._postings = []  # column -> array('i') of rows
+        self._row_ids = []  # row -> internship _id (None once retired)
+        self._row_terms = []  # row -> columns, for compaction
+        self._row_of = {}  # str(_id) -> live row
+        self._active = array('b')
+        self._weight = array('f')  # 1 / sqrt(terms in row)
+        self._retired = 0
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def upsert(self, internship_id, doc):
+        """Index (or re-index) an internship from a document with tags/skills/location/status."""
+        terms = internship_terms(doc)
+        with self._lock:
+            key = str(internship_id)
+            row = self._row_of.get(key)
+            if row is not None:
+                if {self._terms[c] for c in self._row_terms[row]} == terms:
+                    self._active[row] = int(is_active(doc.get('status')))
+                    return
+                self._retire(row)
+            self._append(internship_id, terms, is_active(doc.get('status')))
+            self._maybe_compact()
+
+    def set_status(self, internship_id, status):
+        """Approve/reject: only the active flag changes. Returns False if the internship is not indexed."""
+        with self._lock:
+            row = self._row_of.get(str(internship_id))
+            if row is None:
+                return False
+            self._active[row] = int(is_active(status))
+            return True
+
+    def remove(self, internship_id):
+        with self._lock:
+            row = self._row_of.get(str(internship_id))
+            if row is not None:
+                self._retire(row)
+                self._maybe_compact()
+
+    def top_k(self, weights, k, exclude=()):
+        """[(internship _id, score)] best first, for active internships matching at least one term."""
+        with self._lock:
+            if not self._row_ids or k <= 0:
+                return []
+            columns = [(self.vocabulary[t], w) for t, w in weights.items() if t in self.vocabulary]
+            excluded = [self._row_of[str(i)] for i in exclude if str(i) in self._row_of]
+            if np is not None:
+                rows = self._top_k_numpy(columns, k, excluded)
+            else:
+                rows = self._top_k_python(columns, k, excluded)
+            return [(self._row_ids[row], score) for row, score in rows]
+
+    def _top_k_numpy(self, columns, k, excluded):
+        scores = np.zeros(len(self._row_ids))
+        for column, w in columns:
+            scores[np.frombuffer(self._postings[column], dtype=np.int32)] += w
+        scores *= np.frombuffer(self._weight, dtype=np.float32)
+        scores *= np.frombuffer(self._active, dtype=np.int8)
+        if excluded:
+            scores[excluded] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > k:
+            # the k-th best score, then every row reaching it, so ties at the cut go to the oldest rows
+            kth = scores[candidates[np.argpartition(scores[candidates], -k)[-k]]]
+            candidates = candidates[scores[candidates] >= kth]
+        # best first; ties in row (insertion) order
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+        return [(int(row), float(scores[row])) for row in candidates]
+
+    def _top_k_python(self, columns, k, excluded):
+        scores = {}
+        for column, w in columns:
+            for row in self._postings[column]:
+                scores[row] = scores.get(row, 0.0) + w
+        excluded = set(excluded)
+        ranked = ((s * self._weight[row], -row) for row, s in scores.items()
+                  if self._active[row] and row not in excluded)
+        return [(-neg_row, score) for score, neg_row in heapq.nlargest(k, ranked)]
+
+    def _append(self, internship_id, terms, active):
+        row = len(self._row_ids)
+        columns = []
+        for term in terms:
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = self.vocabulary[term] = len(self._postings)
+                self._terms.append(term)
+                self._postings.append(array('i'))
+            self._postings[column].append(row)
+            columns.append(column)
+        self._row_ids.append(internship_id)
+        self._row_terms.append(tuple(columns))
+        self._row_of[str(internship_id)] = row
+        self._active.append(int(active))
+        self._weight.append(1 / math.sqrt(len(columns)) if columns else 0.0)
+
+    def _retire(self, row):
+        self._row_of.pop(str(self._row_ids[row]), None)
+        self._row_ids[row] = None
+        self._active[row] = 0
+        self._weight[row] = 0.0
+        self._retired += 1
+
+    def _maybe_compact(self):
+        if self._retired <= max(1024, len(self._row_of)):
+            return
+        live = [(self._row_ids[r], self._row_terms[r], self._active[r]) for r in range(len(self._row_ids))
+                if self._row_ids[r] is not None]
+        terms = self._terms
+        self.vocabulary, self._terms, self._postings, self._row_ids, self._row_terms = {}, [], [], [], []
+        self._row_of, self._active, self._weight, self._retired = {}, array('b'), array('f'), 0
+        for internship_id, columns, active in live:
+            self._append(internship_id, {terms[c] for c in columns}, active)
+
+
+class Recommender:
+    def __init__(self, db, rebuild_interval=RECOMMENDATIONS_REBUILD_INTERVAL):
+        self.db = db
+        self.rebuild_interval = rebuild_interval
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._replay = []  # changes made while a rebuild was reading the collection
+
+    def build(self):
+        index = TagIndex()
+        for doc in self.db.internships.find({}, INDEX_PROJECTION):
+            index.upsert(doc['_id'], doc)
+        return index
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index, self._built_at = self.build(), time.monotonic()
+        elif time.monotonic() - self._built_at > self.rebuild_interval:
+            with self._lock:
+                start = not self._rebuilding
+                self._rebuilding = True
+            if start:
+                threading.Thread(target=self._rebuild, name='recommendations-rebuild', daemon=True).start()
+        return self._index
+
+    def _rebuild(self):
+        try:
+            index = self.build()
+            with self._lock:
+                # writes made while the collection was being read may be missing from `index`
+                for apply in self._replay:
+                    apply(index)
+                self._index, self._built_at = index, time.monotonic()
+        except Exception as e:
+            print('Failed to rebuild recommendations index:', e)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                self._replay = []
+
+    def _apply(self, apply):
+        with self._lock:
+            index = self._index
+            if self._rebuilding:
+                self._replay.append(apply)
+        if index is not None:
+            apply(index)
+
+    def internship_changed(self, internship_id, doc):
+        """After create/update: `doc` is the full internship (tags, skills, location, status)."""
+        self._apply(lambda index: index.upsert(internship_id, doc))
+
+    def status_changed(self, internship_id, status):
+        """After approve/reject."""
+        def apply(index):
+            if not index.set_status(internship_id, status):
+                # not indexed yet (created on another worker): read it once
+                doc = self.db.internships.find_one({'_id': internship_id}, INDEX_PROJECTION)
+                if doc:
+                    index.upsert(internship_id, doc)
+        self._apply(apply)
+
+    def recommend(self, user, k=DEFAULT_RECOMMENDATIONS, exclude=()):
+        """[(internship _id, score)] for a student profile, best first."""
+        return self.index().top_k(profile_weights(user), k, exclude)
@@ -0,0 +1,143 @@
+"""Write-invalidated cache for the dashboard listing endpoints.
+
+Each collection has a generation number in the `cache_generations` collection, bumped by the
+write endpoints that change it. A cached listing is keyed by the endpoint and its normalized
+query string and is valid only while the generations it was built from are unchanged, so there
+is no TTL to tune. The ETag is derived from the same key and generations: a poll whose
+If-None-Match still matches is answered with 304 before any listing query runs.
+
+Generations live in MongoDB so every worker sees every write. Each worker re-reads them at most
+once per RESPONSE_CACHE_SYNC_INTERVAL seconds (its own writes are visible immediately); that
+interval bounds how long a listing can lag a write made through another worker. Listings also
+embed per-process caches (internship snapshots, student profiles) that other workers' writes
+cannot invalidate directly; those are dropped via `Generations.on_advance` when the sync sees
+such a write, so the rebuilt listing cached under the new generation does not reuse them.
+"""
+import functools
+import hashlib
+import os
+import threading
+import time
+
+from flask import make_response, request
+from pymongo import ReturnDocument
+
+from cache import LRUCache
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+RESPONSE_CACHE_SYNC_INTERVAL = float(os.getenv('RESPONSE_CACHE_SYNC_INTERVAL', '1'))
+
+
+class Generations:
+    """Per-collection write generations shared through MongoDB."""
+
+    def __init__(self, db, sync_interval=RESPONSE_CACHE_SYNC_INTERVAL):
+        self.db = db
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._values = {}
+        self._synced_at = None
+        self._watchers = {}  # name -> callbacks run when another worker's write is seen
+
+    def on_advance(self, name, callback):
+        """Call `callback()` when a sync finds `name` bumped by another worker, before the new
+        generation is served, so per-process caches a listing is built from can be dropped too."""
+        self._watchers.setdefault(name, []).append(callback)
+
+    def bump(self, *names):
+        for name in names:
+            doc = self.db.cache_generations.find_one_and_update({'_id': name}, {'$inc': {'generation': 1}}, upsert=True,
+                                                              return_document=ReturnDocument.AFTER)
+            with self._lock:
+                self._values[name] = max(self._values.get(name, 0), doc['generation'])
+
+    def current(self, names):
+        now = time.monotonic()
+        if self._synced_at is None or now - self._synced_at >= self.sync_interval:
+            values = {d['_id']: d.get('generation', 0) for d in self.db.cache_generations.find()}
+            with self._lock:
+                advanced = [name for name, value in values.items() if value > self._values.get(name, 0)]
+            # before the new generations are served: a listing cached under them is built afresh
+            for name in advanced:
+                for callback in self._watchers.get(name, ()):
+                    callback()
+            with self._lock:
+                for name, value in values.items():
+                    self._values[name] = max(self._values.get(name, 0), value)
+                self._synced_at = now
+        with self._lock:
+            return tuple(self._values.get(name, 0) for name in names)
+
+
+class ResponseCache:
+    """LRU of rendered listing responses, bounded by total body size."""
+
+    def __init__(self, db, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.generations = Generations(db)
+        self.entries = LRUCache(max_bytes=max_bytes, sizeof=lambda entry: len(entry[0]))
+
+    def bump(self, *collections):
+        """Record a write; listings built from these collections stop matching."""
+        self.generations.bump(*collections)
+
+    @staticmethod
+    def request_key(path, args):
+        return (path, tuple(sorted(args.items(multi=True))))
+
+    @staticmethod
+    def etag(key, generations):
+        return hashlib.sha1(repr((key, generations)).encode('utf-8')).hexdigest()
+
+    def get(self, key, generations):
+        """(body, headers) cached for `key` at these generations, or None."""
+        # entries from older generations are never looked up again and age out of the LRU
+        return self.entries.get((key, generations))
+
+    def put(self, key, generations, body, headers):
+        self.entries.set((key, generations), (body, [(k, v) for k, v in headers if k.lower() in CACHED_HEADERS]))
+
+    def cached(self, *collections):
+        """Decorator for GET views whose response depends only on the query string and `collections`."""
+        return cached_view(self, *collections)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+def cached_view(cache, *collections):
+    """ResponseCache.cached for a cache looked up per request (e.g. a proxy to the current app's cache)."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = cache.request_key(request.path, request.args)
+            generations = cache.generations.current(collections)
+            etag = cache.etag(key, generations)
+            if request.if_none_match.contains_weak(etag):
+                resp = make_response('', 304)
+                return _validators(resp, etag)
+            entry = cache.get(key, generations)
+            if entry is not None:
+                body, headers = entry
+                resp = make_response(body, 200, headers)
+                return _validators(resp, etag)
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code == 200 and not resp.is_streamed:
+                cache.put(key, generations, resp.get_data(), resp.headers.items())
+                _validators(resp, etag)
+            return resp
+        return wrapper
+    return decorator
+
+
+# response headers replayed on a cache hit
+CACHED_HEADERS = {'content-type', 'x-total-count', 'x-next-cursor'}
+
+
+def validator_headers(etag):
+    # weak: the tag names a data version, not a byte-exact body
+    return {'ETag': f'W/"{etag}"', 'Cache-Control': 'no-cache'}
+
+
+def _validators(resp, etag):
+    resp.headers.update(validator_headers(etag))
+    return resp
@@ -0,0 +1,316 @@
+"""Resume text extraction and applicant search.
+
+Uploaded resumes are opaque files (see storage.py). Once `upload_resume` has answered, the
+stored PDF/DOCX is handed to a small background pool that extracts its text; the result goes to
+the `resume_text` collection (one document per student email) whose text index makes applicants
+searchable by skill. `search_applicants` ranks a company's applicants - the students with an
+application to it - by `textScore`.
+
+Extraction is CPU work on untrusted files, so each runs in a child process of its own (forked
+from a forkserver, as with password hashing) that a thread per worker waits on; one that runs
+past RESUME_TEXT_TIMEOUT is killed without disturbing the others. Uploads arriving while RESUME_TEXT_MAX_PENDING are
+queued are not waited for, they are left to the next reindex. Each `resume_text` document
+records the sha256 of the file its text came from and is only written while that is still the
+student's resume (and no newer upload's text is stored), so results of a replaced upload are
+dropped. Re-running is a no-op for resumes already indexed; files shared by several students are
+extracted once:
+
+  python resume_text.py reindex [--force]    (from backend/)
+
+  RESUME_TEXT_WORKERS      extraction processes; 0 disables background extraction (reindex only)
+  RESUME_TEXT_MAX_PENDING  uploads queued or extracting at once before new ones are left to reindex
+  RESUME_TEXT_MAX_CHARS    text kept per resume
+  RESUME_TEXT_TIMEOUT      seconds one file may take; a stuck extraction is killed and recorded as failed
+
+PDF text needs `pypdf`; DOCX is read with the standard library.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from pymongo import TEXT
+from pymongo.errors import DuplicateKeyError
+
+import storage
+from search import SCORE_PROJECTION
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional dependency; PDFs are recorded as unsupported without it
+    PdfReader = None
+
+RESUME_TEXT_WORKERS = int(os.getenv('RESUME_TEXT_WORKERS', str(min(2, os.cpu_count() or 1))))
+RESUME_TEXT_MAX_PENDING = int(os.getenv('RESUME_TEXT_MAX_PENDING', '64'))
+RESUME_TEXT_MAX_CHARS = int(os.getenv('RESUME_TEXT_MAX_CHARS', '100000'))
+RESUME_TEXT_TIMEOUT = float(os.getenv('RESUME_TEXT_TIMEOUT', '60'))
+DEFAULT_APPLICANT_RESULTS = 20
+
+RESUME_TEXT_INDEX_NAME = 'resume_text_search'
+RESUME_TEXT_FIELDS = [('text', TEXT)]
+
+# statuses a reindex does not retry without --force; 'failed' is retried
+FINAL_STATUSES = ['indexed', 'unsupported']
+RESUME_PROJECTION = {'_id': 0, 'email': 1, 'sha256': 1, 'storedFilename': 1, 'resumeUrl': 1, 'uploadedAt': 1}
+
+# a DOCX is a zip: refuse document.xml parts that inflate past this
+_MAX_DOCX_XML = 64 * 1024 * 1024
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedResume(ValueError):
+    """The file is not a format text can be extracted from (recorded, not retried)."""
+
+
+class ExtractionTimeout(RuntimeError):
+    """Extraction ran past RESUME_TEXT_TIMEOUT (recorded as failed; its process is killed)."""
+
+
+def _pdf_text(path):
+    if PdfReader is None:
+        raise UnsupportedResume('PDF text extraction needs pypdf')
+    parts, size = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        size += len(text)
+        if size >= RESUME_TEXT_MAX_CHARS:
+            break
+    return '\n'.join(parts)
+
+
+def _docx_text(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            if archive.getinfo('word/document.xml').file_size > _MAX_DOCX_XML:
+                raise UnsupportedResume('DOCX document part too large')
+            with archive.open('word/document.xml') as fh:
+                parts, size = [], 0
+                for _, element in ElementTree.iterparse(fh):
+                    if element.tag == _W + 't':
+                        parts.append(element.text or '')
+                        size += len(parts[-1])
+                    elif element.tag in (_W + 'tab', _W + 'br', _W + 'p'):
+                        parts.append('\n' if element.tag == _W + 'p' else ' ')
+                        if element.tag == _W + 'p':
+                            element.clear()
+                            if size >= RESUME_TEXT_MAX_CHARS:
+                                break
+                return ''.join(parts)
+    except (zipfile.BadZipFile, KeyError):
+        raise UnsupportedResume('Not a DOCX document')
+
+
+def extract_text(path):
+    """Text of a stored resume (PDF, DOCX or plain text), whitespace-collapsed, at most RESUME_TEXT_MAX_CHARS."""
+    with open(path, 'rb') as fh:
+        head = fh.read(5)
+    if head.startswith(b'%PDF'):
+        text = _pdf_text(path)
+    elif head.startswith(b'PK'):
+        text = _docx_text(path)
+    elif path.lower().endswith('.txt'):
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            text = fh.read(RESUME_TEXT_MAX_CHARS * 2)
+    else:
+        raise UnsupportedResume('Unsupported resume format')
+    return ' '.join(text.split())[:RESUME_TEXT_MAX_CHARS]
+
+
+def _pool_context():
+    # same reasoning as passwords._pool_context: children must not inherit the worker's threads
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+def _extract_to(conn, path):
+    """Child side of ResumeIndexer._extract: send back (status, text or error message)."""
+    try:
+        conn.send(('indexed', extract_text(path)))
+    except FileNotFoundError as e:
+        conn.send(('missing', str(e)))
+    except UnsupportedResume as e:
+        conn.send(('unsupported', str(e)))
+    except Exception as e:
+        # as text: not every exception a parser raises can be pickled
+        conn.send(('failed', f'{type(e).__name__}: {e}'))
+    finally:
+        conn.close()
+
+
+class ResumeIndexer:
+    def __init__(self, db, workers=RESUME_TEXT_WORKERS, max_pending=RESUME_TEXT_MAX_PENDING,
+                 timeout=RESUME_TEXT_TIMEOUT):
+        self.db = db
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._threads = None
+        self._context = None
+
+    def _executor(self):
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='resume-text')
+            return self._threads
+
+    def _extract(self, path):
+        if self.workers <= 0:
+            return extract_text(path)
+        if self._context is None:
+            self._context = _pool_context()
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_extract_to, args=(sender, path), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(self.timeout):
+                process.kill()
+                raise ExtractionTimeout(f'Text extraction took longer than {self.timeout:g}s')
+            status, value = receiver.recv()
+        except EOFError:
+            # the child died without answering (e.g. OOM-killed on a hostile PDF)
+            process.join()
+            raise RuntimeError(f'Text extraction exited with code {process.exitcode}')
+        finally:
+            receiver.close()
+            process.join()
+        if status == 'missing':
+            raise FileNotFoundError(value)
+        if status == 'unsupported':
+            raise UnsupportedResume(value)
+        if status == 'failed':
+            raise RuntimeError(value)
+        return value
+
+    def submit(self, resume_doc):
+        """Index a just-stored `resumes` document in the background; never waits.
+
+        Returns False when it was not queued (no workers, or too many pending): reindex picks it up.
+        """
+        if self.workers <= 0 or not self._slots.acquire(blocking=False):
+            return False
+        try:
+            self._executor().submit(self._background, dict(resume_doc))
+        except Exception:
+            self._slots.release()
+            raise
+        return True
+
+    def _background(self, resume_doc):
+        try:
+            self.index_resume(resume_doc)
+        except Exception as e:
+            logger.warning('Failed to index resume text for %s: %s', resume_doc.get('email'), e)
+        finally:
+            self._slots.release()
+
+    def index_resume(self, resume_doc, force=False):
+        """Extract and store the text of one `resumes` document. Returns the status stored, None if skipped."""
+        email, sha = resume_doc.get('email'), resume_doc.get('sha256')
+        filename = resume_doc.get('storedFilename') or storage.filename_from_url(resume_doc.get('resumeUrl'))
+        if not email or not filename:
+            return None
+        if not force and self.db.resume_text.find_one(
+                {'_id': email, 'sha256': sha, 'status': {'$in': FINAL_STATUSES}}, {'_id': 1}):
+            return None
+        # the same file uploaded by another student: reuse its text
+        same = sha and self.db.resume_text.find_one({'sha256': sha, 'status': 'indexed'}, {'text': 1})
+        if same and not force:
+            fields = {'status': 'indexed', 'text': same['text']}
+        else:
+            try:
+                fields = {'status': 'indexed', 'text': self._extract(os.path.join(storage.UPLOADS_DIR,
+                                                                                  os.path.basename(filename)))}
+            except FileNotFoundError:
+                return None  # replaced or deleted since; that write indexes (or removes) it
+            except UnsupportedResume as e:
+                fields = {'status': 'unsupported', 'text': '', 'error': str(e)}
+            except Exception as e:
+                fields = {'status': 'failed', 'text': '', 'error': str(e)}
+        return self._store(resume_doc, filename, fields)
+
+    def _store(self, resume_doc, filename, fields):
+        email, uploaded_at = resume_doc['email'], resume_doc.get('uploadedAt') or ''
+        # the student may have uploaded another resume, or deleted theirs, while this one was extracted
+        if not self.db.resumes.find_one({'email': email, 'sha256': resume_doc.get('sha256')}, {'_id': 1}):
+            return None
+        doc = {'email': email, 'sha256': resume_doc.get('sha256'), 'storedFilename': filename,
+               'uploadedAt': uploaded_at, 'words': len(fields['text'].split()), 'error': None,
+               'extractedAt': datetime.datetime.utcnow().isoformat(), **fields}
+        try:
+            # no match (text of a newer upload is stored) makes the upsert collide on _id
+            self.db.resume_text.replace_one({'_id': email, 'uploadedAt': {'$lte': uploaded_at}}, doc, upsert=True)
+        except DuplicateKeyError:
+            return None
+        return fields['status']
+
+    def remove(self, email):
+        self.db.resume_text.delete_one({'_id': email})
+
+    def reindex(self, force=False):
+        """Index every resume without current text and drop text of deleted resumes. Returns {status: count}."""
+        counts, emails = {}, set()
+        for resume_doc in self.db.resumes.find({}, RESUME_PROJECTION):
+            emails.add(resume_doc.get('email'))
+            status = self.index_resume(resume_doc, force=force) or 'skipped'
+            counts[status] = counts.get(status, 0) + 1
+        removed = self.db.resume_text.delete_many({'_id': {'$nin': [e for e in emails if e]}}).deleted_count
+        if removed:
+            counts['removed'] = removed
+        return counts
+
+    def shutdown(self):
+        with self._lock:
+            if self._threads is not None:
+                self._threads.shutdown()
+            self._threads = None
+
+
+def search_applicants(db, company, q, limit=DEFAULT_APPLICANT_RESULTS):
+    """[{'_id': email, 'score'}] of the company's applicants whose resume text matches `q`, best first.
+
+    The matches are joined to their applications best first, only until `limit` of them have one
+    to `company`; the company's applicant list is never materialised.
+    """
+    return list(db.resume_text.aggregate([
+        {'$match': {'$text': {'$search': q}, 'status': 'indexed'}},
+        {'$addFields': SCORE_PROJECTION},
+        {'$sort': {'score': -1}},
+        # the student's applications, by the studentEmail index
+        {'$lookup': {'from': 'applications', 'localField': '_id', 'foreignField': 'studentEmail',
+                     'as': 'applications'}},
+        {'$match': {'applications.company': company}},
+        {'$limit': limit},
+        {'$project': {'score': 1}},
+    ]))
+
+
+def main(argv):
+    if not argv or argv[0] != 'reindex':
+        print('usage: python resume_text.py reindex [--force]')
+        return 2
+    # building the app configures the connection from the environment, as bootstrap.py does
+    from app import create_app, resources
+    indexer = resources(create_app()).resume_indexer
+    try:
+        counts = indexer.reindex(force='--force' in argv)
+    finally:
+        indexer.shutdown()
+    print(', '.join(f'{n} {status}' for status, n in sorted(counts.items())) or 'no resumes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
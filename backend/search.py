@@ -0,0 +1,49 @@
+"""Internship search backed by a weighted MongoDB text index.
+
+`$text` queries are served by the index (no collection scan), the user string is treated as
+search terms rather than a regex, and results can be ranked by `textScore`. The index is
+maintained by MongoDB itself, so inserts and updates through `create_internship` /
+`update_internship` are searchable immediately on every worker. The index itself is declared
+in indexes.py.
+
+Matching is by word (stemmed, case-insensitive), not by substring: `q=dev` no longer finds
+"developer". Relevance-ranked results are a top-N list: `limit` applies, but cursors and counts
+need an explicit `sort`.
+"""
+from pymongo import TEXT
+
+from pagination import PaginationError, wants_count
+
+INTERNSHIP_TEXT_INDEX_NAME = 'internship_text_search'
+INTERNSHIP_TEXT_FIELDS = [('title', TEXT), ('position', TEXT), ('tags', TEXT), ('skills', TEXT), ('company', TEXT)]
+# a hit in the title outranks one in the tags, which outranks a company-name match
+INTERNSHIP_TEXT_WEIGHTS = {'title': 10, 'position': 8, 'tags': 5, 'skills': 5, 'company': 3}
+
+SCORE_PROJECTION = {'score': {'$meta': 'textScore'}}
+SCORE_SORT = [('score', {'$meta': 'textScore'})]
+
+
+def internship_search_filter(q, base_query=None):
+    """Combine a free-text query with an existing filter (e.g. the `company` $or)."""
+    query = {'$text': {'$search': q}}
+    if base_query:
+        query.update(base_query)
+    return query
+
+
+def check_relevance_args(args):
+    """Reject the pagination parameters a relevance-ranked search cannot honour (PaginationError -> 400)."""
+    if args.get('after') or wants_count(args):
+        raise PaginationError('after and withCount need sort= when searching with q; '
+                              'relevance-ranked results only support limit')
+
+
+def search_internships(collection, q, base_query=None, limit=None):
+    """Return internships matching `q`, best matches first."""
+    cursor = collection.find(internship_search_filter(q, base_query), SCORE_PROJECTION).sort(SCORE_SORT)
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = list(cursor)
+    for d in docs:
+        d.pop('score', None)
+    return docs
@@ -0,0 +1,222 @@
+"""Slow-query log with captured explain plans.
+
+Every `find`, `aggregate` and `count` the app issues that takes longer than SLOW_QUERY_MS is
+recorded in the capped `slow_queries` collection with its filter (or pipeline), the Flask
+endpoint that issued it, its query shape (the filter with values replaced by `?`) and a summary
+of `explain` in executionStats verbosity. Explains run on a background thread so the request
+that was slow is not made slower, and at most once per shape every SLOW_QUERY_EXPLAIN_INTERVAL
+seconds. `top_offenders` groups the log by shape for /api/admin/slow-queries.
+"""
+import datetime
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+
+import metrics
+from indexes import plan_stages
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', str(16 * 1024 * 1024)))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '60'))
+
+RECORDED_COMMANDS = {'find': 'filter', 'aggregate': 'pipeline', 'count': 'query'}
+# command fields that are not part of the query itself and cannot be passed to explain
+_SESSION_FIELDS = {'lsid', '$db', '$clusterTime', 'txnNumber', '$readPreference', 'readConcern', 'writeConcern',
+                   'apiVersion', 'apiStrict', 'apiDeprecationErrors', 'maxTimeMS'}
+
+
+def query_shape(value):
+    """`value` with literals replaced by '?'; operators, field names and `$field` paths are kept."""
+    if isinstance(value, dict):
+        return {k: ('?' if k in ('$in', '$nin', '$all') else query_shape(v)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return [query_shape(v) for v in value]
+        return '?'
+    if isinstance(value, str) and value.startswith('$'):
+        return value
+    return '?'
+
+
+def explain_summary(explain):
+    """The parts of an explain("executionStats") result worth keeping."""
+    stats = _find_key(explain, 'executionStats') or {}
+    planner = _find_key(explain, 'queryPlanner') or {}
+    winning = planner.get('winningPlan', {})
+    return {
+        'stages': list(plan_stages(winning)),
+        'indexes': sorted({name for name in _find_all(winning, 'indexName')}),
+        'nReturned': stats.get('nReturned'),
+        'totalKeysExamined': stats.get('totalKeysExamined'),
+        'totalDocsExamined': stats.get('totalDocsExamined'),
+        'executionTimeMillis': stats.get('executionTimeMillis'),
+    }
+
+
+def _find_key(obj, key):
+    # aggregate explains nest the find-layer plan under stages[0].$cursor
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        for item in obj:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _find_all(obj, key):
+    if isinstance(obj, dict):
+        if key in obj:
+            yield obj[key]
+        for value in obj.values():
+            yield from _find_all(value, key)
+    elif isinstance(obj, list):
+        for item in obj:
+            yield from _find_all(item, key)
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """CommandListener that queues slow reads for the background recorder thread.
+
+    Each app owns one (app.AppResources), passed to its MongoClient and attached to its database.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, explain_interval=SLOW_QUERY_EXPLAIN_INTERVAL):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.db = None
+        self._pending = {}  # (connection_id, request_id) -> (command_name, command, endpoint)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._explained_at = {}  # shape id -> monotonic time of the last explain
+        self._collection_ready = False
+
+    def attach(self, db):
+        """Record slow commands issued against `db` (the listener is shared by the whole client)."""
+        self.db = db
+
+    def started(self, event):
+        if event.command_name in RECORDED_COMMANDS and self.db is not None and event.database_name == self.db.name:
+            with self._lock:
+                self._pending[(event.connection_id, event.request_id)] = (
+                    event.command_name, event.command, metrics.current_endpoint())
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        if event.command_name not in RECORDED_COMMANDS:
+            return
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < self.threshold_ms:
+            return
+        command_name, command, endpoint = pending
+        if command.get(command_name) == 'slow_queries':
+            return
+        try:
+            self._queue.put_nowait((command_name, command, endpoint, duration_ms, datetime.datetime.utcnow()))
+        except queue.Full:
+            return  # the recorder is behind; dropping beats slowing requests down
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='slow-query-recorder', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self.record(*item)
+            except Exception as e:
+                print('Failed to record slow query:', e)
+
+    def _ensure_collection(self):
+        if not self._collection_ready:
+            ensure_log_collection(self.db)
+            self._collection_ready = True
+
+    def record(self, command_name, command, endpoint, duration_ms, at):
+        collection = command[command_name]
+        query = command.get(RECORDED_COMMANDS[command_name]) or ({} if command_name != 'aggregate' else [])
+        shape = {'query': query_shape(query)}
+        if command.get('sort'):
+            shape['sort'] = list(command['sort'].items())
+        shape_key = f'{collection}.{command_name} {json.dumps(shape, sort_keys=True)}'
+        shape_id = hashlib.sha1(shape_key.encode('utf-8')).hexdigest()[:16]
+
+        explain = None
+        now = time.monotonic()
+        last = self._explained_at.get(shape_id)
+        if last is None or now - last >= self.explain_interval:
+            self._explained_at[shape_id] = now
+            cmd = {k: v for k, v in command.items() if k not in _SESSION_FIELDS}
+            try:
+                explain = explain_summary(self.db.command({'explain': cmd, 'verbosity': 'executionStats'}))
+            except Exception as e:
+                explain = {'error': str(e)}
+
+        self._ensure_collection()
+        self.db.slow_queries.insert_one({
+            'at': at,
+            'endpoint': endpoint,
+            'collection': collection,
+            'command': command_name,
+            'durationMs': round(duration_ms, 3),
+            # stored as JSON text: filters contain $-prefixed keys
+            'filter': json_util.dumps(query),
+            'shapeId': shape_id,
+            'shape': shape_key,
+            'explain': explain,
+        })
+
+
+def ensure_log_collection(db):
+    """Create the capped `slow_queries` collection unless it exists."""
+    try:
+        db.create_collection('slow_queries', capped=True, size=SLOW_QUERY_LOG_BYTES)
+    except CollectionInvalid:
+        pass  # already exists
+
+
+def top_offenders(db, limit=20):
+    """Slow queries grouped by shape, worst total time first."""
+    pipeline = [
+        {'$group': {
+            '_id': '$shapeId',
+            'shape': {'$last': '$shape'},
+            'count': {'$sum': 1},
+            'totalMs': {'$sum': '$durationMs'},
+            'maxMs': {'$max': '$durationMs'},
+            'avgMs': {'$avg': '$durationMs'},
+            'endpoints': {'$addToSet': '$endpoint'},
+            'lastSeen': {'$max': '$at'},
+            'sampleFilter': {'$last': '$filter'},
+            # latest record that carries a plan (explains are rate-limited per shape)
+            'latestExplain': {'$max': {'$cond': [{'$gt': ['$explain', None]}, {'at': '$at', 'plan': '$explain'}, None]}},
+        }},
+        {'$addFields': {'explain': '$latestExplain.plan'}},
+        {'$project': {'latestExplain': 0}},
+        {'$sort': {'totalMs': -1}},
+        {'$limit': limit},
+    ]
+    return list(db.slow_queries.aggregate(pipeline))
@@ -0,0 +1,139 @@
+"""Internship snapshots: the small internship summary embedded in / attached to applications.
+
+Snapshots are cached per process in an LRU keyed by the `internshipId` value applications
+carry, so applying to (or listing applications of) a popular posting does not read the
+internship again. `update_internship`, `approve_internship` and `reject_internship` invalidate
+the entry in the worker that served the write; other workers see the change once their entry
+expires (INTERNSHIP_SNAPSHOT_TTL). Internships that do not exist are not cached.
+"""
+import os
+
+from bson.objectid import ObjectId
+
+from cache import LRUCache
+
+INTERNSHIP_SNAPSHOT_CACHE_SIZE = int(os.getenv('INTERNSHIP_SNAPSHOT_CACHE_SIZE', '10000'))
+INTERNSHIP_SNAPSHOT_TTL = float(os.getenv('INTERNSHIP_SNAPSHOT_TTL', '60'))
+
+
+def internship_snapshot(internship_doc: dict):
+    """Build the small internship snapshot that is embedded in / attached to application documents."""
+    return {
+        'id': str(internship_doc.get('_id') or internship_doc.get('id') or ''),
+        'position': internship_doc.get('position') or internship_doc.get('title') or '',
+        'title': internship_doc.get('title') or '',
+        'company': internship_doc.get('company') or internship_doc.get('companyName') or '',
+        'stipend': internship_doc.get('stipend') or internship_doc.get('salary') or internship_doc.get('remuneration') or '',
+        'location': internship_doc.get('location') or internship_doc.get('city') or '',
+        'duration': internship_doc.get('duration') or internship_doc.get('period') or '',
+        'deadline': internship_doc.get('deadline') or '',
+        'tags': internship_doc.get('tags') or internship_doc.get('skills') or []
+    }
+
+
+def to_object_id(value):
+    try:
+        return value if isinstance(value, ObjectId) else ObjectId(str(value))
+    except Exception:
+        return None
+
+
+def internships_by_ids_query(internship_ids):
+    """One query matching many internshipId values: ObjectId/raw `_id`, or the legacy `id` field."""
+    oids, raw_ids = [], []
+    for iid in internship_ids:
+        oid = to_object_id(iid)
+        if oid is not None:
+            oids.append(oid)
+        else:
+            raw_ids.append(iid)
+    query = {'_id': {'$in': oids + raw_ids}}
+    if raw_ids:
+        query = {'$or': [query, {'id': {'$in': [str(i) for i in raw_ids]}}]}
+    return query
+
+
+def match_internships(internship_ids, docs):
+    """Map each internshipId to its document, keeping the per-row fallback order
+    (ObjectId `_id`, then raw `_id`, then legacy `id` field)."""
+    by_id, by_legacy_id = {}, {}
+    for doc in docs:
+        by_id[doc.get('_id')] = doc
+        if doc.get('id') is not None:
+            by_legacy_id.setdefault(str(doc['id']), doc)
+    out = {}
+    for iid in internship_ids:
+        oid = to_object_id(iid)
+        if oid is not None:
+            doc = by_id.get(oid)
+        else:
+            doc = by_id.get(iid) or by_legacy_id.get(str(iid))
+        if doc:
+            out[iid] = doc
+    return out
+
+
+def snapshot_keys(internship_doc):
+    """Every internshipId value that can refer to this internship."""
+    return {str(v) for v in (internship_doc.get('_id'), internship_doc.get('id')) if v is not None}
+
+
+class InternshipSnapshots:
+    def __init__(self, db, maxsize=INTERNSHIP_SNAPSHOT_CACHE_SIZE, ttl=INTERNSHIP_SNAPSHOT_TTL):
+        self.db = db
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.invalidations = 0
+
+    def get(self, internship_id):
+        """Snapshot for one internshipId, or None if there is no such internship."""
+        return self.get_many([internship_id]).get(internship_id)
+
+    def get_many(self, internship_ids):
+        """{internshipId: snapshot} for the ids that exist; the misses are read with one query."""
+        found, missing = self.cached(internship_ids)
+        if missing:
+            version = self.invalidations
+            docs = self.db.internships.find(internships_by_ids_query(missing))
+            found.update(self.store(match_internships(missing, docs), version))
+        return found
+
+    def cached(self, internship_ids):
+        """({internshipId: snapshot} served from the cache, [ids still to read])."""
+        found, missing = {}, []
+        for iid in dict.fromkeys(i for i in internship_ids if i):
+            snap = self.cache.get(str(iid))
+            if snap is not None:
+                # copies: callers embed these in documents they go on to modify
+                found[iid] = dict(snap)
+            else:
+                missing.append(iid)
+        return found, missing
+
+    def store(self, docs, version):
+        """Cache the snapshots of {internshipId: internship_doc} read when `invalidations` was `version`;
+        returns {internshipId: snapshot}."""
+        out = {}
+        # an invalidation since the read may be for one of these documents: serve them, don't keep them
+        keep = version == self.invalidations
+        for iid, doc in docs.items():
+            snap = internship_snapshot(doc)
+            if keep:
+                self.cache.set(str(iid), snap)
+            out[iid] = dict(snap)
+        return out
+
+    def invalidate(self, *internship_ids):
+        self.invalidations += 1
+        for iid in internship_ids:
+            self.cache.invalidate(str(iid))
+
+    def invalidate_doc(self, internship_doc):
+        self.invalidate(*snapshot_keys(internship_doc))
+
+    def clear(self):
+        """Drop every snapshot: internships changed through another worker, ids unknown."""
+        self.invalidations += 1
+        self.cache.invalidate()
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,595 @@
+"""Materialized counters for the admin and company dashboards.
+
+Platform-wide counts live in a single document (`stats` collection, `_id: 'global'`) and
+per-company counts in `company_stats` (one document per company name / email). Application
+counts per day, for the platform and per company, live in `application_rollups`. The write
+endpoints keep all of them current with `$inc` through `application_changed` /
+`internship_changed`. Missing documents are rebuilt from the source collections on first read.
+A recount races the writes it runs alongside; `reconcile_stats` (run by bootstrap, and by
+`python stats.py reconcile`, e.g. from cron) recounts the platform counters to correct any drift.
+`admin_analytics` reads the counters through a short TTL cache that writes invalidate, and the
+top-N lists (two aggregations) through a longer one that writes do not, so a busy platform's
+dashboard does not rerun the aggregations on every load.
+"""
+import datetime
+import os
+import re
+import sys
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from cache import TTLCache
+
+STATS_ID = 'global'
+COUNTER_FIELDS = ('users', 'companies', 'activeStudents', 'internships', 'pendingApprovals',
+                  'applications', 'selected', 'inReview', 'rejected')
+
+STUDENT_USER_TYPES = (None, 'student', '')
+PENDING_INTERNSHIP_STATUS = 'Pending Approval'
+
+# recounts that raced a write are repeated up to this many times before being stored anyway
+STATS_REBUILD_ATTEMPTS = int(os.getenv('STATS_REBUILD_ATTEMPTS', '3'))
+
+analytics_cache = TTLCache(float(os.getenv('ANALYTICS_CACHE_TTL', '5')))
+top_lists_cache = TTLCache(float(os.getenv('ANALYTICS_TOP_CACHE_TTL', '60')))
+COUNTERS_KEY = 'counters'
+TOP_LISTS_KEY = 'top'
+
+
+def application_status_bucket(status):
+    """Map an application status onto the counter it is reported under (or None)."""
+    if status == 'Selected':
+        return 'selected'
+    if status in ('In Review', 'Pending', None):
+        return 'inReview'
+    if status == 'Rejected':
+        return 'rejected'
+    return None
+
+
+def is_student(user_type):
+    return user_type in STUDENT_USER_TYPES
+
+
+def bump(db, **deltas):
+    """Apply counter deltas to the stats document; zero deltas are dropped.
+
+    Each bump also increments `seq` and upserts, so one landing while the document is missing or
+    being recounted is seen by `rebuild_stats`. A document created by a bump has no `builtAt`
+    and its counters are partial: readers treat it as missing (`is_built`).
+    """
+    inc = {k: v for k, v in deltas.items() if v}
+    if not inc:
+        return
+    try:
+        db.stats.update_one({'_id': STATS_ID}, {'$inc': {**inc, 'seq': 1}}, upsert=True)
+    except Exception as e:
+        print('Failed to update stats:', e)
+    analytics_cache.invalidate(COUNTERS_KEY)
+
+
+def _application_deltas(doc, sign):
+    deltas = {'applications': sign}
+    bucket = application_status_bucket(doc.get('status'))
+    if bucket:
+        deltas[bucket] = sign
+    return deltas
+
+
+def _internship_deltas(doc, sign):
+    return {'internships': sign, 'pendingApprovals': sign * int(doc.get('status') == PENDING_INTERNSHIP_STATUS)}
+
+
+def _merge(*deltas):
+    out = {}
+    for d in deltas:
+        for k, v in d.items():
+            out[k] = out.get(k, 0) + v
+    return out
+
+
+def application_changed(db, before, after):
+    """Update global, per-company and per-day counters for an application insert (before=None),
+    delete (after=None) or status change. `before`/`after` need `_id`, `status`, `company` and
+    `appliedDate`."""
+    applications_changed(db, [(before, after)])
+
+
+def applications_changed(db, changes):
+    """`application_changed` for many (before, after) pairs with one update per counter document."""
+    bump(db, **_merge(*(_merge(_application_deltas(before, -1) if before else {},
+                               _application_deltas(after, 1) if after else {}) for before, after in changes)))
+    company_changes, rollup_changes = [], []
+    for before, after in changes:
+        if before:
+            company_changes.append((company_application_keys(before), _company_application_deltas(before, -1)))
+            rollup_changes.append((rollup_keys(before), _rollup_deltas(before, -1)))
+        if after:
+            company_changes.append((company_application_keys(after), _company_application_deltas(after, 1)))
+            rollup_changes.append((rollup_keys(after), _rollup_deltas(after, 1)))
+    bump_company(db, company_changes)
+    bump_rollups(db, rollup_changes)
+
+
+def internship_changed(db, before, after):
+    """Same as `application_changed` for internships; documents need `status`, `company`, `companyEmail`."""
+    internships_changed(db, [(before, after)])
+
+
+def internships_changed(db, changes):
+    bump(db, **_merge(*(_merge(_internship_deltas(before, -1) if before else {},
+                               _internship_deltas(after, 1) if after else {}) for before, after in changes)))
+    company_changes = []
+    for before, after in changes:
+        if before:
+            company_changes.append((company_internship_keys(before), _company_internship_deltas(before, -1)))
+        if after:
+            company_changes.append((company_internship_keys(after), _company_internship_deltas(after, 1)))
+    bump_company(db, company_changes)
+
+
+def discard(db, company_keys=()):
+    """Drop the global and the given per-company counter documents so the next read recounts them.
+
+    For writes whose exact effect on the counters is unknown (see bulk.py).
+    """
+    try:
+        db.stats.delete_one({'_id': STATS_ID})
+        if company_keys:
+            db.company_stats.delete_many({'_id': {'$in': list(company_keys)}})
+    except Exception as e:
+        print('Failed to discard stats:', e)
+    analytics_cache.invalidate(COUNTERS_KEY)
+
+
+# --- per-company counters -------------------------------------------------------------------
+#
+# `/api/company/overview?company=X` matches internships whose `company` OR `companyEmail` is X and
+# applications whose `company` is X. Each internship therefore counts towards the counter document
+# of both its company name and its company email (once if they are equal), and each application
+# towards its `company`, so reading the document for X gives exactly the $or counts.
+
+COMPANY_COUNTER_FIELDS = ('totalInternships', 'activeInternships', 'pendingInternships',
+                          'totalApplications', 'selected', 'inReview', 'rejected')
+
+
+def internship_status_bucket(status):
+    status = (status or '').lower()
+    if status == 'active':
+        return 'activeInternships'
+    if status in ('pending approval', 'pending'):
+        return 'pendingInternships'
+    return None
+
+
+def company_internship_keys(doc):
+    return {k for k in (doc.get('company'), doc.get('companyEmail')) if k}
+
+
+def company_application_keys(doc):
+    return {doc['company']} if doc.get('company') else set()
+
+
+def _company_internship_deltas(doc, sign):
+    deltas = {'totalInternships': sign}
+    bucket = internship_status_bucket(doc.get('status'))
+    if bucket:
+        deltas[bucket] = sign
+    return deltas
+
+
+def _company_application_deltas(doc, sign):
+    deltas = {'totalApplications': sign}
+    bucket = application_status_bucket(doc.get('status'))
+    if bucket:
+        deltas[bucket] = sign
+    return deltas
+
+
+def bump_company(db, changes):
+    """Apply [(company_keys, deltas), ...] to the `company_stats` documents.
+
+    Like `bump`, only existing documents are incremented; missing ones are built on first read.
+    """
+    per_key = {}
+    for keys, deltas in changes:
+        for key in keys:
+            per_key[key] = _merge(per_key.get(key, {}), deltas)
+    for key, deltas in per_key.items():
+        inc = {k: v for k, v in deltas.items() if v}
+        if not inc:
+            continue
+        try:
+            db.company_stats.update_one({'_id': key}, {'$inc': inc})
+        except Exception as e:
+            print('Failed to update company stats:', e)
+
+
+def rebuild_company_stats(db, company):
+    """Recount one company with a single $group aggregation per collection and store the result."""
+    counters = dict.fromkeys(COMPANY_COUNTER_FIELDS, 0)
+    internship_rows = db.internships.aggregate([
+        {'$match': {'$or': [{'company': company}, {'companyEmail': company}]}},
+        {'$group': {'_id': {'$toLower': {'$ifNull': ['$status', '']}}, 'n': {'$sum': 1}}}
+    ])
+    for row in internship_rows:
+        counters['totalInternships'] += row['n']
+        bucket = internship_status_bucket(row['_id'])
+        if bucket:
+            counters[bucket] += row['n']
+    # application buckets are case-sensitive (see application_status_bucket), so group on the raw status
+    application_rows = db.applications.aggregate([
+        {'$match': {'company': company}},
+        {'$group': {'_id': '$status', 'n': {'$sum': 1}}}
+    ])
+    for row in application_rows:
+        counters['totalApplications'] += row['n']
+        bucket = application_status_bucket(row['_id'])
+        if bucket:
+            counters[bucket] += row['n']
+    db.company_stats.update_one({'_id': company}, {'$set': counters}, upsert=True)
+    return counters
+
+
+def get_company_overview(db, company):
+    doc = db.company_stats.find_one({'_id': company})
+    counters = {k: doc.get(k, 0) for k in COMPANY_COUNTER_FIELDS} if doc else rebuild_company_stats(db, company)
+    return company_overview_response(company, counters)
+
+
+def company_overview_response(company, counters):
+    return {
+        'company': company,
+        'totalInternships': counters['totalInternships'],
+        'activeInternships': counters['activeInternships'],
+        'pendingInternships': counters['pendingInternships'],
+        'totalApplications': counters['totalApplications'],
+        'applicationStatusCounts': {
+            'selected': counters['selected'],
+            'inReview': counters['inReview'],
+            'rejected': counters['rejected'],
+            'total': counters['totalApplications']
+        }
+    }
+
+
+# --- per-day application rollups -------------------------------------------------------------
+#
+# One document per (company, UTC day) in `application_rollups` counts the applications of that
+# company applied for on that day by status bucket, plus one per day with `company: None` for the
+# whole platform, so "last 30 days for company X" reads 30 small documents instead of scanning
+# `applications`. The day is the date part of `appliedDate` (an ISO string), or of the `_id`
+# timestamp for applications without one. Unlike the counters above, increments upsert: a day
+# nobody applied on has no document. The one-time backfill (`rebuild_rollups`) runs from
+# bootstrap.py (or on the first read) under a lease in the `stats` marker document, so only one
+# worker rebuilds at a time, and records `builtAt` there; `discard_rollups` makes the next read
+# recount.
+
+ROLLUP_FIELDS = ('total', 'selected', 'inReview', 'rejected')
+ROLLUPS_ID = 'application_rollups'
+ROLLUP_REBUILD_LEASE_SECONDS = 600
+MAX_TREND_DAYS = 366
+DEFAULT_TREND_DAYS = 30
+
+_ISO_DAY = re.compile(r'^[0-9]{4}-[0-9]{2}-[0-9]{2}')
+# the date part of an ISO `appliedDate`, computed server-side by the backfill
+_DAY_EXPRESSION = {'$substrCP': ['$appliedDate', 0, 10]}
+
+
+def application_day(doc):
+    """'YYYY-MM-DD' (UTC) an application counts towards, or None."""
+    applied = doc.get('appliedDate')
+    if isinstance(applied, str) and _ISO_DAY.match(applied):
+        return applied[:10]
+    if isinstance(applied, datetime.datetime):
+        return applied.strftime('%Y-%m-%d')
+    if isinstance(doc.get('_id'), ObjectId):
+        return doc['_id'].generation_time.strftime('%Y-%m-%d')
+    return None
+
+
+def rollup_keys(doc):
+    """{(company, day)} rollup documents an application counts towards; company None is the platform."""
+    day = application_day(doc)
+    if day is None:
+        return set()
+    return {(None, day), (doc['company'], day)} if doc.get('company') else {(None, day)}
+
+
+def _rollup_deltas(doc, sign):
+    deltas = {'total': sign}
+    bucket = application_status_bucket(doc.get('status'))
+    if bucket:
+        deltas[bucket] = sign
+    return deltas
+
+
+def bump_rollups(db, changes):
+    """Apply [(rollup_keys, deltas), ...] to `application_rollups` in one unordered bulk write."""
+    per_key = {}
+    for keys, deltas in changes:
+        for key in keys:
+            per_key[key] = _merge(per_key.get(key, {}), deltas)
+    ops = []
+    for (company, day), deltas in per_key.items():
+        inc = {k: v for k, v in deltas.items() if v}
+        if inc:
+            ops.append(UpdateOne({'company': company, 'day': day}, {'$inc': inc}, upsert=True))
+    if not ops:
+        return
+    try:
+        db.application_rollups.bulk_write(ops, ordered=False)
+    except Exception as e:
+        print('Failed to update application rollups:', e)
+
+
+def _claim_rollup_rebuild(db, now):
+    """Take the rebuild lease; False while another (unexpired) rebuild holds it."""
+    try:
+        # an existing marker with a live lease does not match, so the upsert collides on _id
+        db.stats.update_one(
+            {'_id': ROLLUPS_ID, '$or': [{'rebuildingUntil': {'$exists': False}}, {'rebuildingUntil': {'$lt': now}}]},
+            {'$set': {'rebuildingUntil': now + datetime.timedelta(seconds=ROLLUP_REBUILD_LEASE_SECONDS)}},
+            upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def rebuild_rollups(db):
+    """Recount `application_rollups` from `applications` with one $group aggregation.
+
+    Returns the documents written, or None when another rebuild is running. Counts applied
+    concurrently may be lost or doubled, as with `rebuild_stats`; run it again to correct.
+    """
+    built_at = datetime.datetime.utcnow()
+    if not _claim_rollup_rebuild(db, built_at):
+        return None
+    try:
+        counts = {}
+
+        def add(company, day, status, n):
+            deltas = {k: v * n for k, v in _rollup_deltas({'status': status}, 1).items()}
+            for key in rollup_keys({'company': company, 'appliedDate': day}):
+                counts[key] = _merge(counts.get(key, {}), deltas)
+
+        rows = db.applications.aggregate([
+            {'$match': {'appliedDate': {'$regex': _ISO_DAY.pattern}}},
+            {'$group': {'_id': {'day': _DAY_EXPRESSION, 'company': '$company', 'status': '$status'},
+                        'n': {'$sum': 1}}}
+        ])
+        for row in rows:
+            add(row['_id'].get('company'), row['_id']['day'], row['_id'].get('status'), row['n'])
+        # created outside the API without an ISO appliedDate: few, dated by their _id
+        for doc in db.applications.find({'appliedDate': {'$not': _ISO_DAY}},
+                                        {'appliedDate': 1, 'company': 1, 'status': 1}):
+            add(doc.get('company'), application_day(doc), doc.get('status'), 1)
+
+        ops = [ReplaceOne({'company': company, 'day': day},
+                          {'company': company, 'day': day, 'builtAt': built_at,
+                           **{k: deltas.get(k, 0) for k in ROLLUP_FIELDS}}, upsert=True)
+               for (company, day), deltas in counts.items() if day]
+        if ops:
+            db.application_rollups.bulk_write(ops, ordered=False)
+        # days whose applications have all been deleted; never documents of a later rebuild
+        db.application_rollups.delete_many({'$or': [{'builtAt': {'$lt': built_at}},
+                                                     {'builtAt': {'$exists': False}}]})
+        db.stats.update_one({'_id': ROLLUPS_ID}, {'$set': {'builtAt': built_at}})
+        return len(ops)
+    finally:
+        db.stats.update_one({'_id': ROLLUPS_ID}, {'$unset': {'rebuildingUntil': ''}})
+
+
+def discard_rollups(db):
+    """Make the next rollup read recount (bulk writes whose effect is unknown, see bulk.py)."""
+    try:
+        db.stats.update_one({'_id': ROLLUPS_ID}, {'$unset': {'builtAt': ''}})
+    except Exception as e:
+        print('Failed to discard application rollups:', e)
+    analytics_cache.invalidate(COUNTERS_KEY)
+
+
+def ensure_rollups(db):
+    """Backfill the rollups unless built; readers do not wait for a rebuild running elsewhere."""
+    doc = db.stats.find_one({'_id': ROLLUPS_ID}, {'builtAt': 1})
+    if not doc or 'builtAt' not in doc:
+        return rebuild_rollups(db)
+    return None
+
+
+def application_trend(db, company=None, days=DEFAULT_TREND_DAYS, today=None):
+    """Per-day counters for the `days` days up to `today` (UTC), oldest first, days without applications as zeros."""
+    ensure_rollups(db)
+    today = today or datetime.datetime.utcnow().date()
+    first = today - datetime.timedelta(days=days - 1)
+    rows = db.application_rollups.find(
+        {'company': company, 'day': {'$gte': first.isoformat(), '$lte': today.isoformat()}},
+        {'_id': 0, 'day': 1, **dict.fromkeys(ROLLUP_FIELDS, 1)})
+    by_day = {row['day']: row for row in rows}
+    trend = []
+    for n in range(days):
+        day = (first + datetime.timedelta(days=n)).isoformat()
+        row = by_day.get(day, {})
+        trend.append({'day': day, **{k: row.get(k, 0) for k in ROLLUP_FIELDS}})
+    return trend
+
+
+def applications_this_month(db, today=None):
+    """Applications dated in the current UTC month, from the platform rollups (at most 31 documents)."""
+    ensure_rollups(db)
+    today = today or datetime.datetime.utcnow().date()
+    rows = db.application_rollups.find(
+        {'company': None, 'day': {'$gte': today.replace(day=1).isoformat(), '$lte': today.isoformat()}},
+        {'_id': 0, 'total': 1})
+    return sum(row.get('total', 0) for row in rows)
+
+
+def top_pipeline(field, limit=6):
+    return [
+        {'$match': {field: {'$exists': True, '$ne': ''}}},
+        {'$group': {'_id': '$' + field, 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': limit}
+    ]
+
+
+def _facet_count(facet_result, name):
+    rows = facet_result.get(name) or []
+    return rows[0]['n'] if rows else 0
+
+
+def _run_facet(collection, facets):
+    result = list(collection.aggregate([{'$facet': facets}]))
+    return result[0] if result else {}
+
+
+def users_facet(db):
+    return _run_facet(db.users, {
+        'total': [{'$count': 'n'}],
+        'activeStudents': [{'$match': {'userType': {'$in': list(STUDENT_USER_TYPES)}}}, {'$count': 'n'}],
+        'topUniversities': top_pipeline('university'),
+    })
+
+
+def internships_facet(db):
+    return _run_facet(db.internships, {
+        'total': [{'$count': 'n'}],
+        'pendingApprovals': [{'$match': {'status': PENDING_INTERNSHIP_STATUS}}, {'$count': 'n'}],
+        'topCompanies': top_pipeline('company'),
+    })
+
+
+def applications_facet(db):
+    return _run_facet(db.applications, {
+        'total': [{'$count': 'n'}],
+        'byStatus': [{'$group': {'_id': '$status', 'n': {'$sum': 1}}}],
+    })
+
+
+def is_built(stats_doc):
+    """Whether the stats document holds complete counters (not missing, nor only bumped since a discard)."""
+    return stats_doc is not None and 'builtAt' in stats_doc
+
+
+def rebuild_stats(db, attempts=STATS_REBUILD_ATTEMPTS):
+    """Recount everything with one $facet aggregation per collection and store the stats document.
+
+    The recount is stored only if no `bump` landed meanwhile (`seq` unchanged); otherwise it is
+    repeated, and after `attempts` the last one is stored anyway. Returns (counters,
+    users_facet_result, internships_facet_result).
+    """
+    for attempt in range(1, attempts + 1):
+        seq = (db.stats.find_one({'_id': STATS_ID}, {'seq': 1}) or {}).get('seq')
+        counters, users, internships = count_stats(db)
+        update = {'$set': {**counters, 'builtAt': datetime.datetime.utcnow()}}
+        if attempt == attempts:
+            db.stats.update_one({'_id': STATS_ID}, update, upsert=True)
+            break
+        update['$set']['seq'] = seq or 0
+        try:
+            # no match (seq moved on) makes the upsert collide on _id
+            db.stats.update_one({'_id': STATS_ID, 'seq': seq}, update, upsert=True)
+            break
+        except DuplicateKeyError:
+            continue
+    return counters, users, internships
+
+
+def count_stats(db):
+    """(counters, users_facet_result, internships_facet_result) counted from the source collections."""
+    users = users_facet(db)
+    internships = internships_facet(db)
+    applications = applications_facet(db)
+    counters = dict.fromkeys(COUNTER_FIELDS, 0)
+    counters['users'] = _facet_count(users, 'total')
+    counters['activeStudents'] = _facet_count(users, 'activeStudents')
+    counters['companies'] = db.companies.estimated_document_count()
+    counters['internships'] = _facet_count(internships, 'total')
+    counters['pendingApprovals'] = _facet_count(internships, 'pendingApprovals')
+    counters['applications'] = _facet_count(applications, 'total')
+    for row in applications.get('byStatus') or []:
+        bucket = application_status_bucket(row['_id'])
+        if bucket:
+            counters[bucket] += row['n']
+    return counters, users, internships
+
+
+def reconcile_stats(db):
+    """Recount the platform counters and store them. Returns {field: (stored, counted)} for those that differed."""
+    stored = db.stats.find_one({'_id': STATS_ID}) or {}
+    counters = rebuild_stats(db)[0]
+    analytics_cache.invalidate(COUNTERS_KEY)
+    return {k: (stored.get(k, 0), v) for k, v in counters.items() if stored.get(k, 0) != v}
+
+
+def top_list(rows, label):
+    return [{label: r['_id'], 'count': r['count']} for r in rows or []]
+
+
+def admin_counters(db):
+    """(counters, thisMonthApplications); a missing stats document is rebuilt, which yields the top lists too."""
+    doc = db.stats.find_one({'_id': STATS_ID})
+    if not is_built(doc):
+        counters, users, internships = rebuild_stats(db)
+        top_lists_cache.set(TOP_LISTS_KEY, (top_list(users.get('topUniversities'), 'university'),
+                                            top_list(internships.get('topCompanies'), 'company')))
+    else:
+        counters = {k: doc.get(k, 0) for k in COUNTER_FIELDS}
+    return counters, applications_this_month(db)
+
+
+def top_lists(db):
+    """(top universities, top companies)."""
+    try:
+        top_universities = top_list(db.users.aggregate(top_pipeline('university')), 'university')
+    except Exception:
+        top_universities = []
+    try:
+        top_companies = top_list(db.internships.aggregate(top_pipeline('company')), 'company')
+    except Exception:
+        top_companies = []
+    return top_universities, top_companies
+
+
+def get_admin_analytics(db):
+    counters, this_month = analytics_cache.get_or_compute(COUNTERS_KEY, lambda: admin_counters(db))
+    top_universities, top_companies = top_lists_cache.get_or_compute(TOP_LISTS_KEY, lambda: top_lists(db))
+    return analytics_response(counters, top_universities, top_companies, this_month)
+
+
+def analytics_response(counters, top_universities, top_companies, this_month_applications):
+    return {
+        'totalUsers': counters['users'] + counters['companies'],
+        'activeStudents': counters['activeStudents'],
+        'activeCompanies': counters['companies'],
+        'totalInternships': counters['internships'],
+        'pendingApprovals': counters['pendingApprovals'],
+        'thisMonthApplications': this_month_applications,
+        'applicationStatusCounts': {
+            'selected': counters['selected'],
+            'inReview': counters['inReview'],
+            'rejected': counters['rejected'],
+            'total': counters['applications']
+        },
+        'topUniversities': top_universities,
+        'topCompanies': top_companies
+    }
+
+
+def main(argv):
+    if not argv or argv[0] != 'reconcile':
+        print('usage: python stats.py reconcile')
+        return 2
+    # building the app configures the connection from the environment, as bootstrap.py does
+    from app import create_app, resources
+    drift = reconcile_stats(resources(create_app()).db)
+    for field, (stored, counted) in sorted(drift.items()):
+        print(f'{field}: {stored} -> {counted}')
+    print(f'{len(drift)} counters corrected' if drift else 'counters match')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,528 @@
+"""Upload pipeline and content-addressed store for resumes and company verification documents.
+
+Bodies are never held in memory as a whole: multipart files are copied from werkzeug's spooled
+part in `UPLOAD_CHUNK_SIZE` pieces, and the JSON/base64 fallback is parsed straight off the
+request stream and decoded incrementally. Bytes go to a temporary file in the uploads directory
+while their SHA-256 is computed; the size limit is enforced as they arrive (and up front from
+Content-Length), so memory per upload is bounded by the chunk size.
+
+Finished uploads are stored as `<sha256><ext>`, so identical files are kept once. The `blobs`
+collection holds a refcount per hash: `retain` / `release` are called whenever a resume or
+verification document starts / stops pointing at a file, and a file is removed only when its
+entry is deleted at refcount 0. `collect_garbage` (also `python storage.py gc`) reconciles the
+refcounts with the documents and removes the files that end up unreferenced. Legacy uploads
+(`<timestamp>_<name>`, from before the content-addressed store) have no refcount, may be
+referenced by more than one document, and are never deleted here.
+"""
+import base64
+import binascii
+import codecs
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import uuid
+
+from pymongo import ReturnDocument
+
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), 'uploads')
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(64 * 1024)))
+
+# room for the other form fields / JSON keys around the file itself
+_ENVELOPE_BYTES = 64 * 1024
+_MAX_SMALL_FIELD = 64 * 1024
+_MAX_DATA_URL_META = 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeds MAX_UPLOAD_BYTES (mapped to HTTP 413)."""
+
+
+class InvalidUpload(ValueError):
+    """The upload body could not be parsed or decoded (mapped to HTTP 400)."""
+
+
+def max_request_bytes(base64_encoded=False):
+    """Largest request body that can carry a MAX_UPLOAD_BYTES file."""
+    payload = MAX_UPLOAD_BYTES * 4 // 3 + 4 if base64_encoded else MAX_UPLOAD_BYTES
+    return payload + _ENVELOPE_BYTES
+
+
+def check_content_length(content_length, base64_encoded=False):
+    """Reject an oversized request before reading its body."""
+    if content_length is not None and content_length > max_request_bytes(base64_encoded):
+        raise UploadTooLarge()
+
+
+def limit_request_body(request, base64_encoded=False):
+    """Reject an oversized request up front and cap how much of its body werkzeug will read.
+
+    Chunked uploads carry no Content-Length, so the cap is also set on the request: reading
+    past it raises werkzeug's RequestEntityTooLarge (handled like UploadTooLarge).
+    """
+    check_content_length(request.content_length, base64_encoded)
+    request.max_content_length = max_request_bytes(base64_encoded)
+
+
+class PendingUpload:
+    """Bytes written to a temporary file in UPLOADS_DIR, hashed and size-checked as they arrive.
+
+    Call `commit(filename)` to move the file into place or `discard()` to delete it.
+    """
+
+    def __init__(self, max_bytes=None):
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(prefix='.upload-', dir=UPLOADS_DIR)
+        self._fh = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+        self.size = 0
+        self.meta = None
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def write(self, data):
+        if not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise UploadTooLarge()
+        self._hash.update(data)
+        self._fh.write(data)
+
+    def commit(self, filename):
+        self._fh.close()
+        os.replace(self.temp_path, os.path.join(UPLOADS_DIR, filename))
+        self.temp_path = None
+        return filename
+
+    def discard(self):
+        if not self._fh.closed:
+            self._fh.close()
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+def spool_file_storage(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Copy a werkzeug FileStorage into a PendingUpload chunk by chunk."""
+    pending = PendingUpload()
+    try:
+        while True:
+            chunk = file.stream.read(chunk_size)
+            if not chunk:
+                break
+            pending.write(chunk)
+    except Exception:
+        pending.discard()
+        raise
+    return pending
+
+
+class _Base64Decoder:
+    """Incremental base64 decoder; like b64decode, characters outside the alphabet are ignored."""
+
+    _NOT_B64 = re.compile(r'[^A-Za-z0-9+/=]')
+
+    def __init__(self):
+        self._rest = ''
+
+    def feed(self, text):
+        text = self._rest + self._NOT_B64.sub('', text)
+        usable = len(text) - len(text) % 4
+        self._rest = text[usable:]
+        return self._decode(text[:usable])
+
+    def finish(self):
+        rest, self._rest = self._rest, ''
+        if rest:
+            # tolerate missing padding the same way the data-URL producers do
+            return self._decode(rest + '=' * (-len(rest) % 4))
+        return b''
+
+    @staticmethod
+    def _decode(text):
+        if not text:
+            return b''
+        try:
+            return base64.b64decode(text)
+        except (binascii.Error, ValueError):
+            raise InvalidUpload('Invalid base64 data')
+
+
+class _DataUrlSink:
+    """Consume the pieces of a `data:<meta>;base64,<payload>` string into a PendingUpload."""
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.meta = None
+        self._head = ''
+        self._decoder = _Base64Decoder()
+
+    def feed(self, piece):
+        if self.meta is None:
+            self._head += piece
+            if ',' not in self._head:
+                if len(self._head) > _MAX_DATA_URL_META:
+                    raise InvalidUpload('Unsupported data format')
+                return
+            meta, piece = self._head.split(',', 1)
+            if not meta.startswith('data:'):
+                raise InvalidUpload('Unsupported data format')
+            self.meta, self._head = meta, ''
+        self.pending.write(self._decoder.feed(piece))
+
+    def finish(self):
+        if self.meta is None:
+            raise InvalidUpload('Unsupported data format')
+        self.pending.write(self._decoder.finish())
+
+
+class _JsonStream:
+    """Minimal pull parser for a flat JSON object read from a byte stream."""
+
+    _SPECIAL = re.compile(r'["\\]')
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf, self.pos = '', 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    def _more(self):
+        while self.pos >= len(self.buf):
+            if self.eof:
+                return False
+            raw = self.stream.read(self.chunk_size)
+            if not raw:
+                self.eof = True
+                self.buf, self.pos = self._utf8.decode(b'', final=True), 0
+            else:
+                self.buf, self.pos = self._utf8.decode(raw), 0
+        return True
+
+    def next_char(self, skip_ws=True):
+        while self._more():
+            ch = self.buf[self.pos]
+            self.pos += 1
+            if skip_ws and ch in ' \t\r\n':
+                continue
+            return ch
+        raise InvalidUpload('Invalid JSON body')
+
+    def unread(self):
+        self.pos -= 1
+
+    def string_pieces(self):
+        """Yield decoded pieces of a JSON string whose opening quote was just read."""
+        while True:
+            if not self._more():
+                raise InvalidUpload('Invalid JSON body')
+            start = self.pos
+            m = self._SPECIAL.search(self.buf, start)
+            if m is None:
+                self.pos = len(self.buf)
+                yield self.buf[start:]
+                continue
+            if m.start() > start:
+                yield self.buf[start:m.start()]
+            self.pos = m.end()
+            if m.group() == '"':
+                return
+            esc = self.next_char(skip_ws=False)
+            if esc == 'u':
+                yield chr(int(''.join(self.next_char(skip_ws=False) for _ in range(4)), 16))
+            elif esc in self._ESCAPES:
+                yield self._ESCAPES[esc]
+            else:
+                raise InvalidUpload('Invalid JSON body')
+
+    def small_string(self):
+        out, size = [], 0
+        for piece in self.string_pieces():
+            size += len(piece)
+            if size > _MAX_SMALL_FIELD:
+                raise UploadTooLarge()
+            out.append(piece)
+        return ''.join(out)
+
+    def raw_value(self, first):
+        """Read a non-string value (number, literal, nested object/array) and json-decode it."""
+        out, depth, in_string, escaped, ch = [], 0, False, False, first
+        while True:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in '[{':
+                depth += 1
+            elif ch in ']}' and depth:
+                depth -= 1
+            elif ch in ',}' and depth == 0:
+                self.unread()
+                break
+            out.append(ch)
+            if len(out) > _MAX_SMALL_FIELD:
+                raise UploadTooLarge()
+            ch = self.next_char(skip_ws=False)
+        try:
+            return json.loads(''.join(out))
+        except ValueError:
+            raise InvalidUpload('Invalid JSON body')
+
+
+def receive_json_data_url(stream, file_fields=('dataUrl', 'data'), chunk_size=UPLOAD_CHUNK_SIZE):
+    """Parse a JSON upload body such as `{"email": ..., "dataUrl": "data:...;base64,..."}` off `stream`.
+
+    The first non-empty field named in `file_fields` is decoded into a PendingUpload as it is
+    read; all other fields are returned. Returns (fields, pending) where pending is None when no
+    file field was present. `pending.meta` holds the data-URL header (e.g. `data:application/pdf;base64`).
+    """
+    parser = _JsonStream(stream, chunk_size)
+    fields, pending, candidate = {}, None, None
+    try:
+        if parser.next_char() != '{':
+            raise InvalidUpload('Invalid JSON body')
+        ch = parser.next_char()
+        while ch != '}':
+            if ch != '"':
+                raise InvalidUpload('Invalid JSON body')
+            key = parser.small_string()
+            if parser.next_char() != ':':
+                raise InvalidUpload('Invalid JSON body')
+            ch = parser.next_char()
+            if ch == '"' and key in file_fields and pending is None:
+                candidate = PendingUpload()
+                sink = _DataUrlSink(candidate)
+                empty = True
+                for piece in parser.string_pieces():
+                    if piece:
+                        empty = False
+                        sink.feed(piece)
+                if empty:
+                    candidate.discard()
+                else:
+                    sink.finish()
+                    candidate.meta = sink.meta
+                    pending = candidate
+            elif ch == '"':
+                fields[key] = parser.small_string()
+            else:
+                fields[key] = parser.raw_value(ch)
+            ch = parser.next_char()
+            if ch == ',':
+                ch = parser.next_char()
+            elif ch != '}':
+                raise InvalidUpload('Invalid JSON body')
+    except Exception:
+        for upload in (candidate, pending):
+            if upload is not None:
+                upload.discard()
+        raise
+    return fields, pending
+
+
+# --- content-addressed store ----------------------------------------------------------------
+
+_CONTENT_ADDRESSED = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+_SAFE_EXT = re.compile(r'^\.[a-z0-9]{1,10}$')
+GC_GRACE_SECONDS = int(os.getenv('UPLOAD_GC_GRACE_SECONDS', '600'))
+
+
+def extension_for(filename, default=''):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return ext if _SAFE_EXT.match(ext) else default
+
+
+def content_hash(filename):
+    """The SHA-256 a content-addressed filename was stored under (None for legacy names)."""
+    m = _CONTENT_ADDRESSED.match(os.path.basename(filename or ''))
+    return m.group(1) if m else None
+
+
+def filename_from_url(url):
+    """The stored filename behind an `/uploads/<name>` URL (None for external URLs)."""
+    if url and '/uploads/' in url:
+        return url.split('/uploads/')[-1]
+    return None
+
+
+def retain(db, pending, ext=''):
+    """Store a PendingUpload under its content hash and take a reference to it. Returns the filename.
+
+    The refcount is taken before the file is placed so a concurrent `release` of the same
+    content cannot remove it afterwards.
+    """
+    sha = pending.sha256
+    now = _utcnow()
+    doc = db.blobs.find_one_and_update(
+        {'_id': sha},
+        {'$inc': {'refs': 1}, '$set': {'retainedAt': now},
+         '$setOnInsert': {'filename': sha + ext, 'size': pending.size, 'createdAt': now}},
+        upsert=True, return_document=ReturnDocument.AFTER)
+    filename = doc['filename']
+    if os.path.exists(os.path.join(UPLOADS_DIR, filename)):
+        # already stored: drop the duplicate bytes
+        pending.discard()
+    else:
+        pending.commit(filename)
+    return filename
+
+
+def retain_stored(db, filename):
+    """Take another reference to an already stored upload named by a client (e.g. a URL sent back).
+
+    Only content-addressed files with a `blobs` entry can be shared; legacy names belong to the
+    one document that uploaded them. Returns False when no reference was taken.
+    """
+    sha = content_hash(filename)
+    if not sha:
+        return False
+    return db.blobs.update_one({'_id': sha, 'filename': os.path.basename(filename)},
+                               {'$inc': {'refs': 1}, '$set': {'retainedAt': _utcnow()}}).matched_count == 1
+
+
+def release(db, filename):
+    """Drop one reference to a stored file, deleting it when nothing references it any more."""
+    sha = content_hash(filename)
+    if not sha:
+        # legacy `<timestamp>_<name>` uploads have no refcount and other documents may point at them
+        return
+    db.blobs.update_one({'_id': sha}, {'$inc': {'refs': -1}})
+    if db.blobs.delete_one({'_id': sha, 'refs': {'$lte': 0}}).deleted_count:
+        _unlink_blob(db, sha, os.path.basename(filename))
+
+
+def _utcnow():
+    return datetime.datetime.utcnow().isoformat()
+
+
+def _unlink_blob(db, sha, filename):
+    """Delete a stored file whose `blobs` entry is gone, unless a concurrent `retain` re-created it.
+
+    The file is moved aside first and the entry re-checked: a `retain` that found the file in
+    place (and so dropped its own copy) before the move gets it put back.
+    """
+    path = os.path.join(UPLOADS_DIR, filename)
+    trash = f'{path}.trash-{uuid.uuid4().hex}'
+    try:
+        os.replace(path, trash)
+    except FileNotFoundError:
+        return
+    if db.blobs.count_documents({'_id': sha}) and not os.path.exists(path):
+        os.replace(trash, path)
+    else:
+        os.remove(trash)
+
+
+def referenced_filenames(db):
+    """{filename: reference count} for every upload referenced by a resume or verification document."""
+    refs = {}
+
+    def add(name):
+        if name:
+            refs[name] = refs.get(name, 0) + 1
+
+    for doc in db.resumes.find({}, {'storedFilename': 1, 'resumeUrl': 1}):
+        add(doc.get('storedFilename') or filename_from_url(doc.get('resumeUrl')))
+    # verification requests fall back to the users collection when no company matches
+    for coll in (db.companies, db.users):
+        for doc in coll.find({'verificationDocumentUrl': {'$exists': True}}, {'verificationDocumentUrl': 1}):
+            add(filename_from_url(doc.get('verificationDocumentUrl')))
+    return refs
+
+
+def collect_garbage(db, dry_run=True, grace_seconds=None):
+    """Reconcile `blobs` refcounts with the documents that reference each file; delete what is left unreferenced.
+
+    Entries retained within `grace_seconds` are skipped: the document taking the reference may
+    not be written yet. Every correction is conditional on the refcount read, so a reference taken
+    meanwhile makes it a no-op, and a file is deleted only with its entry. Content-addressed files
+    without an entry are removed the way `release` removes them. Legacy uploads are only counted.
+    Returns a report dict; with dry_run=True nothing is changed.
+    """
+    grace_seconds = GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(seconds=grace_seconds)).isoformat()
+    # entries before documents: a reference taken in between changes `refs`, failing the update below
+    blobs = list(db.blobs.find({}, {'filename': 1, 'refs': 1, 'size': 1, 'createdAt': 1, 'retainedAt': 1}))
+    refs = referenced_filenames(db)
+    report = {'scanned': 0, 'referenced': 0, 'legacy': 0, 'orphans': [], 'orphanBytes': 0, 'refcountFixes': 0,
+              'dryRun': dry_run}
+
+    def orphan(filename, size):
+        report['orphans'].append({'filename': filename, 'size': size or 0})
+        report['orphanBytes'] += size or 0
+
+    for blob in blobs:
+        actual = refs.get(blob.get('filename'), 0)
+        if blob.get('refs') == actual and actual:
+            continue
+        if (blob.get('retainedAt') or blob.get('createdAt') or '') > cutoff:
+            continue
+        query = {'_id': blob['_id'], 'refs': blob.get('refs')}
+        if actual:
+            report['refcountFixes'] += 1
+            if not dry_run:
+                db.blobs.update_one(query, {'$set': {'refs': actual}})
+        else:
+            orphan(blob['filename'], blob.get('size'))
+            if not dry_run and db.blobs.delete_one(query).deleted_count:
+                _unlink_blob(db, blob['_id'], blob['filename'])
+
+    # e.g. a release that stopped between deleting the entry and the file
+    known = {blob.get('filename') for blob in blobs}
+    names = os.listdir(UPLOADS_DIR) if os.path.isdir(UPLOADS_DIR) else []
+    for name in sorted(names):
+        path = os.path.join(UPLOADS_DIR, name)
+        if not os.path.isfile(path) or name.startswith('.'):
+            # in-flight uploads (.upload-*) and files being released (*.trash-*) are not ours to judge
+            continue
+        report['scanned'] += 1
+        sha = content_hash(name)
+        if name in refs:
+            report['referenced'] += 1
+        elif not sha:
+            report['legacy'] += 1
+        elif name not in known:
+            orphan(name, os.path.getsize(path))
+            if not dry_run:
+                _unlink_blob(db, sha, name)
+    return report
+
+
+def main(argv):
+    if not argv or argv[0] != 'gc':
+        print('usage: python storage.py gc [--apply] [--grace SECONDS]')
+        return 2
+    grace = None
+    if '--grace' in argv:
+        grace = int(argv[argv.index('--grace') + 1])
+    # building the app configures the connection from the environment, as bootstrap.py does
+    from app import create_app, resources
+    db = resources(create_app()).db
+    report = collect_garbage(db, dry_run='--apply' not in argv, grace_seconds=grace)
+    for orphan in report['orphans']:
+        print(f"{'would delete' if report['dryRun'] else 'deleted'} {orphan['filename']} ({orphan['size']} bytes)")
+    print(f"scanned {report['scanned']} files, {report['referenced']} referenced, "
+          f"{len(report['orphans'])} orphaned ({report['orphanBytes']} bytes), "
+          f"{report['legacy']} unreferenced legacy uploads kept, "
+          f"{report['refcountFixes']} refcount corrections" + (' [dry run]' if report['dryRun'] else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
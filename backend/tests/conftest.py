@@ -0,0 +1,180 @@
+"""Shared fixtures: the Flask and ASGI apps on an in-memory MongoDB (mongomock).
+
+mongomock stands in for the server on both sides: pymongo.MongoClient is replaced before the app
+is imported, and the ASGI handlers' async client (`asgi.adb`) is replaced by AsyncDatabase, a thin
+coroutine wrapper over the same mongomock database. Every request is answered from the same data.
+
+mongomock has no capped collections and no `$text`, so the reset skips the slow-query log
+collection and the tests leave relevance-ranked search out; its bulk API is patched to accept
+the `sort` argument newer PyMongo versions pass.
+"""
+import asyncio
+import json
+import os
+import sys
+
+import mongomock
+import mongomock.collection
+import pymongo
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+pymongo.MongoClient = mongomock.MongoClient
+# PyMongo 4.11+ passes `sort` to bulk update ops; mongomock does not take it yet
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+mongomock.collection.BulkOperationBuilder.add_update = \
+    lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1')
+
+import app as sync_app  # noqa: E402
+import asgi  # noqa: E402
+import indexes  # noqa: E402
+import stats  # noqa: E402
+
+
+class AsyncCursor:
+    """The slice of PyMongo's async cursor API the ASGI handlers use."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    def __aiter__(self):
+        self._iterator = iter(self._cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class AsyncCollection:
+    def __init__(self, collection, calls):
+        self._collection = collection
+        self._calls = calls
+
+    def find(self, *args, **kwargs):
+        self._calls.append((self._collection.name, 'find'))
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline):
+        self._calls.append((self._collection.name, 'aggregate'))
+        return AsyncCursor(list(self._collection.aggregate(pipeline)))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            self._calls.append((self._collection.name, name))
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    """`asgi.adb` for the tests: coroutine methods over a mongomock database; records each call."""
+
+    _client = None
+
+    def __init__(self, db):
+        self._db = db
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return AsyncCollection(self._db[name], self.calls)
+
+
+class Apps:
+    """Both serving modes over one fresh database; `reset()` starts again from the seed data."""
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.flask = asgi.flask_app
+        self.client = self.flask.test_client()
+        self.reset()
+
+    def reset(self):
+        """A new database (mongomock keeps one per client) with empty caches, then the seed data."""
+        owned = sync_app.AppResources(self.flask.config)
+        self.flask.extensions['internlink'] = owned
+        self.adb = AsyncDatabase(owned.db)
+        for name, value in (('owned', owned), ('db', owned.db), ('listing_cache', owned.listing_cache),
+                            ('adb', self.adb)):
+            self.monkeypatch.setattr(asgi, name, value)
+        stats.analytics_cache.invalidate()
+        stats.top_lists_cache.invalidate()
+        indexes.ensure_indexes(owned.db)
+        stats.ensure_rollups(owned.db)
+        self.ids = seed(self.flask_call)
+        self.db = owned.db
+
+    def flask_call(self, method, path, query='', body=None, headers=()):
+        resp = self.client.open(path, method=method, query_string=query, json=body, headers=dict(headers))
+        try:
+            return resp.status_code, {k.lower(): v for k, v in resp.headers.items()}, resp.get_data()
+        finally:
+            resp.close()
+
+    def asgi_call(self, method, path, query='', body=None, headers=()):
+        return asyncio.run(call_asgi(method, path, query, body, headers))
+
+
+async def call_asgi(method, path, query='', body=None, headers=()):
+    payload = json.dumps(body).encode() if body is not None else b''
+    headers = list(headers) + ([('content-type', 'application/json')] if body is not None else [])
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    response = {'body': b''}
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode().lower(): v.decode() for k, v in message['headers']}
+        else:
+            response['body'] += message.get('body', b'')
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': [(k.lower().encode(), v.encode()) for k, v in headers]}
+    await asgi.app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+def seed(call):
+    """Internships, students, a company and applications, created through the API; returns their ids."""
+    ids = {}
+    for n, (company, status) in enumerate([('Acme', 'Active'), ('Acme', 'Pending Approval'), ('Globex', 'Active')]):
+        _, _, body = call('POST', '/api/internships', body={
+            'title': f'Backend intern {n}', 'company': company, 'companyEmail': f'{company.lower()}@example.com',
+            'status': status, 'tags': ['python', 'mongodb'][: n + 1], 'location': 'Remote'})
+        ids[f'internship{n}'] = json.loads(body)['internship']['id']
+    call('POST', '/api/users', body={'fullName': 'Acme HR', 'email': 'acme@example.com', 'password': 'secret123',
+                                     'userType': 'company', 'companyName': 'Acme'})
+    for n in range(5):
+        call('POST', '/api/users', body={
+            'fullName': f'Student {n}', 'email': f'student{n}@example.com', 'password': 'secret123',
+            'userType': 'student', 'university': ['MIT', 'IIT'][n % 2], 'skills': ['python']})
+        _, _, body = call('POST', '/api/applications', body={
+            'internshipId': ids[f'internship{n % 3}'], 'studentEmail': f'student{n}@example.com',
+            'studentName': f'Student {n}', 'company': ['Acme', 'Globex'][n % 2]})
+        ids[f'application{n}'] = json.loads(body)['application']['id']
+    _, _, body = call('GET', '/api/users', 'limit=1&sort=email')
+    ids['user'] = json.loads(body)['users'][0]['id']
+    return ids
+
+
+@pytest.fixture
+def apps(monkeypatch):
+    return Apps(monkeypatch)
@@ -0,0 +1,38 @@
+"""The application list and export routes share their filters (app.application_filter)."""
+import json
+import time
+
+import delta
+
+
+def listed(apps, query):
+    status, _, body = apps.flask_call('GET', '/api/applications', query)
+    assert status == 200
+    return json.loads(body)
+
+
+def exported(apps, query):
+    _, _, body = apps.flask_call('GET', '/api/applications/export', query)
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_status_filters_the_list_and_the_export(apps):
+    apps.flask_call('PUT', f"/api/applications/{apps.ids['application1']}", body={'status': 'Selected'})
+    for query in ('status=Selected', 'status=Selected&company=Globex'):
+        assert [a['id'] for a in listed(apps, query)['applications']] == [apps.ids['application1']]
+        assert [a['id'] for a in exported(apps, query)] == [apps.ids['application1']]
+    assert listed(apps, 'status=Selected&company=Acme')['applications'] == []
+    assert len(listed(apps, 'status=In Review')['applications']) == 4
+
+
+def test_since_lists_applications_that_left_the_status_filter_as_deleted(apps, monkeypatch):
+    monkeypatch.setattr(delta, 'SYNC_OVERLAP_SECONDS', 0)
+    time.sleep(0.01)
+    synced = listed(apps, 'status=In Review')['syncedAt']
+    apps.flask_call('PUT', f"/api/applications/{apps.ids['application1']}", body={'status': 'Selected'})
+    apps.flask_call('PUT', f"/api/applications/{apps.ids['application2']}", body={'status': 'In Review'})
+    for call in (apps.flask_call, apps.asgi_call):
+        _, _, body = call('GET', '/api/applications', f'status=In Review&since={synced}')
+        changes = json.loads(body)
+        assert [a['id'] for a in changes['applications']] == [apps.ids['application2']]
+        assert changes['deleted'] == [apps.ids['application1']]
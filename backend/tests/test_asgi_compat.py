@@ -0,0 +1,173 @@
+"""The ASGI app (asgi.py) must answer every /api route exactly like the Flask app.
+
+Each case runs once per mode, each time on a freshly seeded database, so writes are compared too.
+Ids and timestamps differ between the two runs and are masked before the bodies are compared.
+"""
+import asyncio
+import base64
+import json
+import re
+
+import pytest
+
+import stats
+
+# (route rule, method, path, query string, JSON body); {name} in the path is a seeded id
+CASES = [
+    ('/api/internships', 'GET', '/api/internships', '', None),
+    ('/api/internships', 'GET', '/api/internships', 'company=Acme', None),
+    ('/api/internships', 'GET', '/api/internships', 'limit=2&withCount=1', None),
+    ('/api/internships', 'GET', '/api/internships', 'limit=2&sort=title', None),
+    ('/api/internships', 'GET', '/api/internships', 'limit=0', None),
+    ('/api/internships', 'GET', '/api/internships', 'since=bogus', None),
+    ('/api/internships', 'GET', '/api/internships', 'q=backend&after=x', None),
+    ('/api/internships', 'POST', '/api/internships', '', {'title': 'Data intern', 'company': 'Acme',
+                                                          'companyEmail': 'acme@example.com'}),
+    ('/api/internships', 'POST', '/api/internships', '', {'title': 'No company'}),
+    ('/api/internships/<internship_id>', 'PUT', '/api/internships/{internship0}', '', {'stipend': '1000'}),
+    ('/api/internships/<internship_id>', 'PUT', '/api/internships/{internship0}', '', {'bogus': 1}),
+    ('/api/internships/<internship_id>/approve', 'POST', '/api/internships/{internship1}/approve', '', None),
+    ('/api/internships/<internship_id>/reject', 'POST', '/api/internships/{internship1}/reject', '', None),
+    ('/api/internships/moderation', 'POST', '/api/internships/moderation', '',
+     {'ids': ['{internship1}'], 'action': 'approve'}),
+    ('/api/applications', 'GET', '/api/applications', '', None),
+    ('/api/applications', 'GET', '/api/applications', 'company=Globex&withCount=1', None),
+    ('/api/applications', 'GET', '/api/applications', 'limit=2&sort=studentName', None),
+    ('/api/applications', 'GET', '/api/applications', 'studentEmail=student1@example.com', None),
+    ('/api/applications', 'GET', '/api/applications', 'sort=bogus', None),
+    ('/api/applications', 'GET', '/api/applications', 'since=not-a-date', None),
+    ('/api/applications', 'GET', '/api/applications', 'since=2000-01-01', None),
+    ('/api/applications', 'POST', '/api/applications', '', {'internshipId': '{internship0}', 'company': 'Acme',
+                                                            'studentEmail': 'student0@example.com',
+                                                            'studentName': 'Student 0'}),
+    ('/api/applications', 'POST', '/api/applications', '', {'company': 'Acme'}),
+    ('/api/applications/<app_id>', 'GET', '/api/applications/{application0}', '', None),
+    ('/api/applications/<app_id>', 'GET', '/api/applications/000000000000000000000000', '', None),
+    ('/api/applications/<app_id>', 'PUT', '/api/applications/{application0}', '', {'status': 'Selected'}),
+    ('/api/applications/<app_id>', 'DELETE', '/api/applications/{application0}', '', None),
+    ('/api/applications/export', 'GET', '/api/applications/export', 'company=Acme', None),
+    ('/api/applications/export', 'GET', '/api/applications/export', 'format=csv', None),
+    ('/api/applications/status', 'POST', '/api/applications/status', '',
+     {'items': [{'id': '{application1}', 'status': 'Rejected'}]}),
+    ('/api/users', 'GET', '/api/users', '', None),
+    ('/api/users', 'GET', '/api/users', 'q=student&limit=2&withCount=1', None),
+    ('/api/users', 'POST', '/api/users', '', {'fullName': 'New', 'email': 'new@example.com', 'password': 'pw123456'}),
+    ('/api/users', 'POST', '/api/users', '', {'email': 'student0@example.com', 'password': 'pw123456'}),
+    ('/api/users/<user_id>', 'DELETE', '/api/users/{user}', '', None),
+    ('/api/users/<user_id>/suspend', 'POST', '/api/users/{user}/suspend', '', None),
+    ('/api/users/<user_id>/activate', 'POST', '/api/users/{user}/activate', '', None),
+    ('/api/users/by-email', 'PUT', '/api/users/by-email', '', {'email': 'student2@example.com', 'phone': '555'}),
+    ('/api/login', 'POST', '/api/login', '', {'email': 'student0@example.com', 'password': 'secret123'}),
+    ('/api/login', 'POST', '/api/login', '', {'email': 'student0@example.com', 'password': 'wrong'}),
+    ('/api/recommendations', 'GET', '/api/recommendations', 'email=student0@example.com', None),
+    ('/api/recommendations', 'GET', '/api/recommendations', '', None),
+    ('/api/admin/analytics', 'GET', '/api/admin/analytics', '', None),
+    ('/api/admin/metrics', 'GET', '/api/admin/metrics', '', None),
+    ('/api/admin/slow-queries', 'GET', '/api/admin/slow-queries', '', None),
+    ('/api/admin/verifications', 'GET', '/api/admin/verifications', '', None),
+    ('/api/admin/verifications/<company_id>/<action>', 'POST',
+     '/api/admin/verifications/acme@example.com/approve', '', None),
+    ('/api/admin/verifications/bulk', 'POST', '/api/admin/verifications/bulk', '',
+     {'ids': ['acme@example.com'], 'action': 'reject'}),
+    ('/api/analytics/applications', 'GET', '/api/analytics/applications', 'days=7', None),
+    ('/api/analytics/applications', 'GET', '/api/analytics/applications', 'days=0', None),
+    ('/api/company/overview', 'GET', '/api/company/overview', 'company=Acme', None),
+    ('/api/company/overview', 'GET', '/api/company/overview', '', None),
+    ('/api/company/applicants/search', 'GET', '/api/company/applicants/search', 'company=Acme', None),
+    ('/api/company/verify', 'POST', '/api/company/verify', '', {'email': 'acme@example.com',
+                                                                'linkedin': 'https://linkedin.com/company/acme'}),
+    ('/api/company/verify', 'POST', '/api/company/verify', '', {'email': 'acme@example.com'}),
+    ('/api/companies/by-email', 'GET', '/api/companies/by-email', 'email=acme@example.com', None),
+    ('/api/events', 'GET', '/api/events', '', None),
+    ('/api/resume', 'GET', '/api/resume', 'email=student0@example.com', None),
+    ('/api/upload_resume', 'POST', '/api/upload_resume', '', {'email': 'student0@example.com'}),
+    ('/api/upload_resume', 'DELETE', '/api/upload_resume', '', {'email': 'student0@example.com'}),
+    ('/api/upload_resume', 'OPTIONS', '/api/upload_resume', '', None),
+]
+COMPARED_HEADERS = ('content-type', 'x-total-count', 'etag', 'cache-control', 'content-disposition',
+                    'access-control-allow-origin', 'access-control-expose-headers', 'vary')
+
+_MASKS = [
+    (re.compile(rb'\b[0-9a-f]{24}\b'), b'<id>'),
+    (re.compile(rb'\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(\.\d+)?(Z|[+-]\d\d:\d\d)?'), b'<time>'),
+    (re.compile(rb'\w{3}, \d\d \w{3} \d{4} \d\d:\d\d:\d\d GMT'), b'<time>'),
+    # salted password hashes (the user and company lookups return them)
+    (re.compile(rb'(pbkdf2|scrypt):[^$"]+\$[^$"]+\$[0-9a-f]+'), b'<hash>'),
+]
+
+
+def masked(body):
+    for pattern, replacement in _MASKS:
+        body = pattern.sub(replacement, body)
+    try:
+        body = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(body, dict) and body.get('nextCursor'):
+        # the cursor encodes the last row's id
+        body['nextCursor'] = masked(base64.urlsafe_b64decode(body['nextCursor'] + '=='))
+    return body
+
+
+def resolve(value, ids):
+    """The case's path or body with {name} placeholders replaced by this run's seeded ids."""
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {k: resolve(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, ids) for v in value]
+    return value
+
+
+def run_case(apps, call, method, path, query, body):
+    apps.reset()
+    return call(method, resolve(path, apps.ids), query, resolve(body, apps.ids), [('Origin', 'http://localhost')])
+
+
+def assert_same(sync_result, async_result):
+    assert async_result[0] == sync_result[0]
+    for name in COMPARED_HEADERS:
+        assert async_result[1].get(name) == sync_result[1].get(name), name
+    assert masked(async_result[2]) == masked(sync_result[2])
+
+
+@pytest.mark.parametrize('rule, method, path, query, body', CASES,
+                         ids=[f'{c[1]} {c[2]}?{c[3]}' for c in CASES])
+def test_same_response(apps, rule, method, path, query, body):
+    sync_result = run_case(apps, apps.flask_call, method, path, query, body)
+    async_result = run_case(apps, apps.asgi_call, method, path, query, body)
+    assert_same(sync_result, async_result)
+
+
+def test_every_api_route_is_compared(apps):
+    routes = {(rule.rule, method) for rule in apps.flask.url_map.iter_rules() if rule.rule.startswith('/api/')
+              for method in rule.methods - {'HEAD'}}
+    compared = {(rule, method) for rule, method, *_ in CASES}
+    # preflights are answered by flask-cors, the same for every route
+    assert {r for r in routes if r[1] != 'OPTIONS'} - compared == set()
+
+
+@pytest.mark.parametrize('path, query', [('/api/internships', ''), ('/api/applications', 'limit=2')])
+def test_validators_are_shared(apps, path, query):
+    """An ETag from one mode is honoured by the other: both read the same cache generations."""
+    etag = apps.flask_call('GET', path, query)[1]['etag']
+    assert apps.asgi_call('GET', path, query, headers=[('If-None-Match', etag)])[0] == 304
+    etag = apps.asgi_call('GET', path, query)[1]['etag']
+    assert apps.flask_call('GET', path, query, headers=[('If-None-Match', etag)])[0] == 304
+
+
+def test_concurrent_analytics_misses_share_one_recount(apps):
+    stats.analytics_cache.invalidate()
+    stats.top_lists_cache.invalidate()
+    apps.adb.calls.clear()
+
+    async def burst():
+        from conftest import call_asgi
+        return await asyncio.gather(*[call_asgi('GET', '/api/admin/analytics') for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert {r[0] for r in results} == {200}
+    assert len({r[2] for r in results}) == 1
+    assert apps.adb.calls.count(('stats', 'find_one')) == 1
+    assert apps.adb.calls.count(('users', 'aggregate')) == 1
@@ -0,0 +1,27 @@
+"""Response JSON keeps Flask's key order; datetimes are ISO 8601 (see encoder.py)."""
+import datetime
+import re
+
+import encoder
+
+SYNCED_AT = re.compile(rb'"syncedAt":"[^"]*"')
+
+
+def test_keys_are_sorted_like_flask(apps):
+    with apps.flask.app_context():
+        body = apps.flask.json.response({'b': 1, 'a': {'d': 2, 'c': 3}}).get_data()
+    assert body == b'{"a":{"c":3,"d":2},"b":1}'
+    assert apps.flask.json.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+
+
+def test_both_modes_answer_byte_for_byte_alike(apps):
+    sync_body, async_body = (call('GET', '/api/applications', 'limit=2')[2]
+                             for call in (apps.flask_call, apps.asgi_call))
+    assert sync_body.index(b'"applications"') < sync_body.index(b'"nextCursor"') < sync_body.index(b'"syncedAt"')
+    # the same rows; only the time the list was read differs
+    assert SYNCED_AT.sub(b'', async_body) == SYNCED_AT.sub(b'', sync_body)
+
+
+def test_datetimes_are_iso_8601():
+    when = datetime.datetime(2024, 5, 1, 9, 30, 0, 123456)
+    assert encoder.dumps({'at': when}) == '{"at":"2024-05-01T09:30:00.123456"}'
@@ -0,0 +1,21 @@
+"""Listings cached by one worker after another worker's write must not embed stale per-process caches."""
+import app as sync_app
+
+
+def test_write_seen_through_generations_drops_snapshots_and_profiles(apps):
+    # a second worker on the same database, with its own per-process caches
+    other = sync_app.AppResources(apps.flask.config)
+    other.db = apps.db
+    other.listing_cache.generations.db = apps.db
+    other.internship_snapshots.db = apps.db
+    other.student_profiles.db = apps.db
+    assert other.internship_snapshots.get(apps.ids['internship0'])
+    assert other.student_profiles.get('student0@example.com')
+
+    apps.flask_call('PUT', f"/api/internships/{apps.ids['internship0']}", body={'stipend': '1000'})
+    apps.flask_call('PUT', '/api/users/by-email', body={'email': 'student0@example.com', 'phone': '555'})
+    other.listing_cache.generations._synced_at = None
+    other.listing_cache.generations.current(['internships', 'users'])
+
+    assert other.internship_snapshots.cached([apps.ids['internship0']]) == ({}, [apps.ids['internship0']])
+    assert other.student_profiles.cached(['student0@example.com']) == ({}, ['student0@example.com'])
@@ -0,0 +1,42 @@
+"""The platform counters survive writes racing a recount (stats.rebuild_stats / reconcile_stats)."""
+import stats
+
+
+def counted(apps):
+    return stats.count_stats(apps.db)[0]
+
+
+def test_bump_while_the_document_is_missing_is_kept_for_the_rebuild(apps):
+    stats.discard(apps.db)
+    apps.flask_call('POST', '/api/users', body={'fullName': 'New', 'email': 'new@example.com', 'password': 'pw123456'})
+    doc = apps.db.stats.find_one({'_id': stats.STATS_ID})
+    assert doc['users'] == 1 and not stats.is_built(doc)
+    assert stats.admin_counters(apps.db)[0] == counted(apps)
+
+
+def test_recount_that_raced_a_write_is_repeated(apps, monkeypatch):
+    stats.discard(apps.db)
+    count_stats, runs = stats.count_stats, []
+
+    def racing(db):
+        result = count_stats(db)
+        if not runs:
+            # a user signs up after the users were counted
+            apps.flask_call('POST', '/api/users', body={'fullName': 'New', 'email': 'new@example.com',
+                                                        'password': 'pw123456'})
+        runs.append(1)
+        return result
+    monkeypatch.setattr(stats, 'count_stats', racing)
+    stats.rebuild_stats(apps.db)
+    assert len(runs) == 2
+    monkeypatch.undo()
+    stored = apps.db.stats.find_one({'_id': stats.STATS_ID})
+    assert {k: stored[k] for k in stats.COUNTER_FIELDS} == counted(apps)
+
+
+def test_reconcile_corrects_drift(apps):
+    stats.admin_counters(apps.db)
+    apps.db.stats.update_one({'_id': stats.STATS_ID}, {'$inc': {'applications': 7}})
+    expected = counted(apps)['applications']
+    assert stats.reconcile_stats(apps.db) == {'applications': (expected + 7, expected)}
+    assert stats.reconcile_stats(apps.db) == {}
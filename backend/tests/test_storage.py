@@ -0,0 +1,94 @@
+"""Stored uploads are deleted only with their `blobs` entry at refcount 0; legacy uploads are never deleted."""
+import os
+
+import mongomock
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'UPLOADS_DIR', str(tmp_path))
+    return mongomock.MongoClient().db
+
+
+def store(db, data=b'%PDF-1.4 resume'):
+    pending = storage.PendingUpload()
+    pending.write(data)
+    return storage.retain(db, pending, '.pdf')
+
+
+def path(name):
+    return os.path.join(storage.UPLOADS_DIR, name)
+
+
+def test_release_deletes_the_file_with_the_last_reference(db):
+    name = store(db)
+    assert store(db) == name
+    storage.release(db, name)
+    assert os.path.exists(path(name))
+    storage.release(db, name)
+    assert not os.path.exists(path(name))
+    assert db.blobs.count_documents({}) == 0
+
+
+def test_release_keeps_legacy_uploads(db):
+    open(path('1700000000_cv.pdf'), 'wb').close()
+    storage.release(db, '1700000000_cv.pdf')
+    assert os.path.exists(path('1700000000_cv.pdf'))
+
+
+def test_release_without_an_entry_keeps_the_file(db):
+    name = store(db)
+    db.blobs.delete_many({})
+    storage.release(db, name)
+    assert os.path.exists(path(name))
+
+
+def test_gc_deletes_only_unreferenced_entries_past_the_grace_period(db):
+    kept, dropped, recent = store(db, b'kept'), store(db, b'dropped'), store(db, b'recent')
+    db.resumes.insert_one({'email': 's@example.com', 'storedFilename': kept})
+    open(path('1700000000_cv.pdf'), 'wb').close()
+    db.blobs.update_one({'filename': recent}, {'$set': {'retainedAt': '9999-01-01T00:00:00'}})
+
+    report = storage.collect_garbage(db, dry_run=True, grace_seconds=0)
+    assert [o['filename'] for o in report['orphans']] == [dropped]
+    assert report['legacy'] == 1
+    assert os.path.exists(path(dropped))
+
+    storage.collect_garbage(db, dry_run=False, grace_seconds=0)
+    assert sorted(os.listdir(storage.UPLOADS_DIR)) == sorted(['1700000000_cv.pdf', kept, recent])
+    assert {b['filename'] for b in db.blobs.find()} == {kept, recent}
+
+
+def test_gc_does_not_overwrite_a_reference_taken_while_it_runs(db, monkeypatch):
+    name = store(db)
+    db.blobs.update_one({'filename': name}, {'$set': {'refs': 3, 'retainedAt': ''}})
+    db.resumes.insert_one({'email': 's@example.com', 'storedFilename': name})
+    referenced = storage.referenced_filenames
+
+    def racing(db_):
+        # another request retains the file after GC read the entry
+        storage.retain_stored(db_, name)
+        return referenced(db_)
+    monkeypatch.setattr(storage, 'referenced_filenames', racing)
+    storage.collect_garbage(db, dry_run=False, grace_seconds=0)
+    assert db.blobs.find_one({'filename': name})['refs'] == 4
+
+
+def test_pending_upload_is_not_collected(db):
+    pending = storage.PendingUpload()
+    pending.write(b'in flight')
+    storage.collect_garbage(db, dry_run=False, grace_seconds=0)
+    assert os.path.exists(pending.temp_path)
+    pending.discard()
+
+
+def test_verification_keeps_a_legacy_document_url(apps):
+    url = 'http://localhost/uploads/1700000000_registration.pdf'
+    status, _, _ = apps.flask_call('POST', '/api/company/verify', body={
+        'email': 'acme@example.com', 'linkedin': 'https://linkedin.com/company/acme', 'documentUrl': url})
+    assert status == 200
+    assert apps.db.companies.find_one({'email': 'acme@example.com'})['verificationDocumentUrl'] == url
+    assert apps.db.blobs.count_documents({}) == 0
@@ -0,0 +1,4 @@
+"""WSGI entry point: `gunicorn -w 4 -b 0.0.0.0:5000 wsgi:app` (from backend/)."""
+from app import create_app
+
+app = create_app()
@@ -76,7 +76,7 @@ export function CompanyDashboard({ user, onLogout }: CompanyDashboardProps) {
   useEffect(() => {
     async function load() {
       try {
-        const res = await fetch('http://localhost:5000/api/internships');
+        const res = await fetch(`http://localhost:5000/api/internships?companyEmail=${encodeURIComponent(user.email || '')}`);
         if (res.ok) {
           const data = await res.json();
           setPostedInternshipsState(data.internships || []);
@@ -624,10 +624,46 @@ export function CompanyDashboard({ user, onLogout }: CompanyDashboardProps) {
     const handler = () => refresh();
     window.addEventListener('verification_updated', handler as EventListener);
 
-    // poll fallback
-    const iv = setInterval(refresh, 30000);
+    // poll fallback, only for browsers without Server-Sent Events (pushed below otherwise)
+    const iv = typeof EventSource === 'undefined' ? setInterval(refresh, 30000) : null;
 
-    return () => { window.removeEventListener('verification_updated', handler as EventListener); clearInterval(iv); };
+    return () => { window.removeEventListener('verification_updated', handler as EventListener); if (iv) clearInterval(iv); };
+  }, [user]);
+
+  // live updates: application and verification changes are pushed by the backend (/api/events)
+  useEffect(() => {
+    if (!user || typeof EventSource === 'undefined') return;
+    const keys = [user.companyName, user.email].filter(Boolean).map((k: string) => `company=${encodeURIComponent(k)}`);
+    if (!keys.length) return;
+    const source = new EventSource(`http://localhost:5000/api/events?${keys.join('&')}`);
+    source.addEventListener('application', (e) => {
+      const d = JSON.parse((e as MessageEvent).data || '{}');
+      if (d.op === 'created' && d.application) {
+        const norm = normalizeApplication(d.application);
+        setApplicationsState(prev => prev.some(a => String(a.id) === String(norm.id)) ? prev : [norm, ...prev]);
+      } else if (d.op === 'updated') {
+        setApplicationsState(prev => prev.map(a => String(a.id) === String(d.id) ? { ...a, status: d.status ?? a.status } : a));
+      } else if (d.op === 'deleted') {
+        setApplicationsState(prev => prev.filter(a => String(a.id) !== String(d.id)));
+      }
+    });
+    source.addEventListener('internship', (e) => {
+      const d = JSON.parse((e as MessageEvent).data || '{}');
+      setPostedInternshipsState(prev => prev.map((i: any) => String(i.id) === String(d.id) ? { ...i, status: d.status } : i));
+    });
+    source.addEventListener('verification', () => window.dispatchEvent(new Event('verification_updated')));
+    // missed events (slow connection, another server worker): re-fetch instead
+    source.addEventListener('reset', async () => {
+      window.dispatchEvent(new Event('verification_updated'));
+      try {
+        const res = await fetch(`http://localhost:5000/api/applications?company=${encodeURIComponent(user.companyName || user.email || '')}`);
+        if (res.ok) {
+          const d = await res.json();
+          setApplicationsState((d.applications || []).map((a:any) => normalizeApplication(a)));
+        }
+      } catch (e) {}
+    });
+    return () => source.close();
   }, [user]);
 
   return (